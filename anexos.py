@@ -0,0 +1,205 @@
+"""
+Anexos do termo (apólice do seguro e outros documentos).
+
+O upload chega pelo Gradio (já gravado em disco, em partes); aqui o arquivo é
+conferido (tamanho e tipo real, pelos primeiros bytes) e copiado em blocos
+para o diretório de spool. No envio, o e-mail é escrito direto no socket SMTP
+(comando DATA), codificando cada anexo em base64 bloco a bloco a partir do
+arquivo do spool: nem o PDF nem a mensagem inteira ficam em memória.
+
+Configuração:
+- ANEXOS_DIR:       diretório de spool (padrão: <tmp>/tce_anexos)
+- ANEXO_MAX_MB:     tamanho máximo por arquivo (padrão 10)
+- ANEXOS_MAX_MB:    soma máxima dos anexos de um termo (padrão 20)
+- ANEXOS_TTL_HORAS: spool não enviado é apagado depois disso (padrão 24)
+"""
+import base64
+import hashlib
+import os
+import smtplib
+import tempfile
+import threading
+import time
+import uuid
+from email import policy
+from email.message import EmailMessage
+from typing import NamedTuple
+
+ANEXOS_DIR = os.getenv("ANEXOS_DIR") or os.path.join(tempfile.gettempdir(), "tce_anexos")
+ANEXO_MAX_BYTES = int(float(os.getenv("ANEXO_MAX_MB", 10)) * 1024 * 1024)
+ANEXOS_MAX_BYTES = int(float(os.getenv("ANEXOS_MAX_MB", 20)) * 1024 * 1024)
+ANEXOS_TTL = float(os.getenv("ANEXOS_TTL_HORAS", 24)) * 3600
+
+# assinatura (primeiros bytes) -> (tipo MIME, extensão)
+TIPOS = [
+    (b"%PDF-", ("application/pdf", ".pdf")),
+    (b"\x89PNG\r\n\x1a\n", ("image/png", ".png")),
+    (b"\xff\xd8\xff", ("image/jpeg", ".jpg")),
+]
+
+_BLOCO = 57 * 1024          # múltiplo de 57: linhas base64 completas (76 colunas)
+_COPIA = 1024 * 1024
+
+
+class Anexo(NamedTuple):
+    caminho: str      # arquivo no spool
+    nome: str         # nome original (vai no e-mail)
+    tipo: str         # tipo MIME conferido
+    tamanho: int
+    sha256: str
+
+
+class AnexoInvalido(ValueError):
+    pass
+
+
+def _tipo_real(caminho: str) -> tuple[str, str] | None:
+    with open(caminho, "rb") as f:
+        inicio = f.read(16)
+    for assinatura, tipo in TIPOS:
+        if inicio.startswith(assinatura):
+            return tipo
+    return None
+
+
+_limpeza_lock = threading.Lock()
+_limpo_em = 0.0
+
+def limpar_spool(agora: float | None = None):
+    """Apaga do spool o que passou de ANEXOS_TTL (termos nunca enviados)."""
+    global _limpo_em
+    agora = agora or time.time()
+    with _limpeza_lock:
+        if agora - _limpo_em < 600:
+            return
+        _limpo_em = agora
+    try:
+        with os.scandir(ANEXOS_DIR) as it:
+            for e in it:
+                if e.is_file() and agora - e.stat().st_mtime > ANEXOS_TTL:
+                    os.remove(e.path)
+    except OSError:
+        pass
+
+
+def guardar_anexo(origem: str, nome: str | None = None) -> Anexo:
+    """
+    Confere o arquivo enviado e copia para o spool (em blocos, calculando o
+    SHA-256 no caminho). Levanta AnexoInvalido com a mensagem para o usuário.
+    """
+    nome = os.path.basename(nome or origem)
+    tamanho = os.path.getsize(origem)
+    if tamanho == 0:
+        raise AnexoInvalido(f"⚠️ O arquivo '{nome}' está vazio.")
+    if tamanho > ANEXO_MAX_BYTES:
+        raise AnexoInvalido(f"⚠️ O arquivo '{nome}' passa de {ANEXO_MAX_BYTES // (1024 * 1024)} MB.")
+    tipo = _tipo_real(origem)
+    if tipo is None:
+        raise AnexoInvalido(f"⚠️ O arquivo '{nome}' não é PDF, JPG ou PNG.")
+
+    limpar_spool()
+    os.makedirs(ANEXOS_DIR, exist_ok=True)
+    destino = os.path.join(ANEXOS_DIR, uuid.uuid4().hex + tipo[1])
+    h = hashlib.sha256()
+    with open(origem, "rb") as src, open(destino, "wb") as dst:
+        while bloco := src.read(_COPIA):
+            h.update(bloco)
+            dst.write(bloco)
+    return Anexo(destino, nome, tipo[0], tamanho, h.hexdigest())
+
+
+def conferir_total(tamanhos: list[int]):
+    """Soma dos anexos de um termo (em bytes) dentro de ANEXOS_MAX_BYTES."""
+    if sum(tamanhos) > ANEXOS_MAX_BYTES:
+        raise AnexoInvalido(
+            f"⚠️ Os anexos somam mais de {ANEXOS_MAX_BYTES // (1024 * 1024)} MB; envie menos arquivos."
+        )
+
+
+def descartar(anexos: list[Anexo]):
+    for a in anexos:
+        try:
+            os.remove(a.caminho)
+        except OSError:
+            pass
+
+
+# --- escrita da mensagem direto no socket ---
+
+class _EscritorData:
+    """Envia bytes na fase DATA do SMTP, com dot-stuffing no início de linha."""
+
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.inicio_de_linha = True
+
+    def write(self, dados: bytes):
+        if not dados:
+            return
+        if self.inicio_de_linha and dados.startswith(b"."):
+            dados = b"." + dados
+        dados = dados.replace(b"\r\n.", b"\r\n..")
+        self.server.send(dados)
+        self.inicio_de_linha = dados.endswith(b"\r\n")
+
+
+def _cabecalhos(itens) -> bytes:
+    return b"".join(policy.SMTP.fold_binary(k, v) for k, v in itens)
+
+
+def _escrever_mensagem(saida, msg: EmailMessage, anexos: list[Anexo]):
+    fronteira = f"=_tce_{uuid.uuid4().hex}"
+    conteudo = {"content-type", "content-transfer-encoding", "mime-version"}
+    saida.write(_cabecalhos((k, v) for k, v in msg.items() if k.lower() not in conteudo))
+    saida.write(_cabecalhos([
+        ("MIME-Version", "1.0"),
+        ("Content-Type", f'multipart/mixed; boundary="{fronteira}"'),
+    ]))
+    saida.write(b"\r\n")
+
+    corpo = EmailMessage(policy=policy.SMTP)
+    corpo.set_content(msg.get_content(), cte="quoted-printable")
+    saida.write(f"--{fronteira}\r\n".encode())
+    saida.write(corpo.as_bytes())
+    saida.write(b"\r\n")
+
+    for a in anexos:
+        parte = EmailMessage(policy=policy.SMTP)
+        parte["Content-Type"] = a.tipo
+        parte["Content-Transfer-Encoding"] = "base64"
+        parte.add_header("Content-Disposition", "attachment", filename=a.nome)
+        saida.write(f"--{fronteira}\r\n".encode())
+        saida.write(_cabecalhos(parte.items()) + b"\r\n")
+        with open(a.caminho, "rb") as f:
+            while bloco := f.read(_BLOCO):
+                saida.write(base64.encodebytes(bloco).replace(b"\n", b"\r\n"))
+    saida.write(f"--{fronteira}--\r\n".encode())
+
+
+def enviar_com_anexos(server: smtplib.SMTP, msg: EmailMessage, anexos: list[Anexo]):
+    """Equivalente a server.send_message(msg) acrescentando os anexos do spool."""
+    server.ehlo_or_helo_if_needed()
+    remetente = msg["From"]
+    destinatarios = [d.strip() for d in str(msg["To"]).split(",") if d.strip()]
+    code, resp = server.mail(remetente)
+    if code != 250:
+        server._rset()
+        raise smtplib.SMTPSenderRefused(code, resp, remetente)
+    recusados = {}
+    for d in destinatarios:
+        code, resp = server.rcpt(d)
+        if code not in (250, 251):
+            recusados[d] = (code, resp)
+    if len(recusados) == len(destinatarios):
+        server._rset()
+        raise smtplib.SMTPRecipientsRefused(recusados)
+
+    code, resp = server.docmd("DATA")
+    if code != 354:
+        server._rset()
+        raise smtplib.SMTPDataError(code, resp)
+    _escrever_mensagem(_EscritorData(server), msg, anexos)
+    server.send(b".\r\n")
+    code, resp = server.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, resp)
@@ -1,39 +1,59 @@
 import gradio as gr
-from datetime import datetime, timedelta, date
-from num2words import num2words
-import re, time, httpx, unicodedata
+from datetime import datetime, timedelta
+import re, time, threading
 from textwrap import dedent
-from decimal import Decimal, InvalidOperation
+from functools import wraps
 # gradio==5.34.2
-# num2words==0.5.14
 
-from email_validator import validate_email, EmailNotValidError
-import dns.resolver
+import dns.exception, dns.resolver
 
 import os
 from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+import uvicorn
+import hashlib, inspect, json, hmac, tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from cache import abrir_cache
+from historico import abrir_historico, CAMPOS_CONCEDENTE, STATUS
+from estudantes import abrir_indice_estudantes
+from municipios import abrir_indice_municipios
+from relays import abrir_relays
+from disjuntores import abrir_disjuntor
+from dominios import dominio_conhecido
+from provedores_cep import abrir_resolvedor_cep
+from sondas import Monitor, SAUDE_TIMEOUT
+from anexos import AnexoInvalido, ANEXO_MAX_BYTES, guardar_anexo, conferir_total, descartar
+from importacao import ler_planilha, limitar_linhas, validar_em_lote, relatorio_csv, registro_de_json
+import lote
+import rascunhos
+import validacao
+from validacao import (
+    UF_OPCOES, CURSO_OPCOES, MIN_ATIVIDADES, NOMES_FIXOS, NOMES_FINAIS,
+    nomes_do_termo, _cep8, _parse_valor_brl, valor_por_extenso,
+)
 
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
 from email.message import EmailMessage
 
 
 # Carregar variáveis do .env
 load_dotenv()
 
-SMTP_HOST = os.getenv("SMTP_HOST")
-SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
-SMTP_USER = os.getenv("SMTP_USER")
-SMTP_PASS = os.getenv("SMTP_PASS")
-SMTP_TLS  = os.getenv("SMTP_TLS", "true").lower() == "true"
+# SMTP_HOST/SMTP_PORT/SMTP_USER/SMTP_PASS/SMTP_TLS ou SMTP_RELAYS (vários
+# relays com failover e limite de taxa): ver relays.py
+RELAYS = abrir_relays()
 FROM_EMAIL = os.getenv("FROM_EMAIL")
+ENVIO_TTL = int(os.getenv("ENVIO_TTL", 600))  # janela (s) em que um termo idêntico não é reenviado
+COORDENACAO_SENHA = os.getenv("COORDENACAO_SENHA", "")  # libera as telas da coordenação
 
 
-def enviar_email(destinatario: str, assunto: str, corpo: str, reply_to: str | None = None) -> tuple[bool, str]:
+def enviar_email(destinatario: str, assunto: str, corpo: str, reply_to: str | None = None,
+                 anexos=()) -> tuple[bool, str]:
     """
-    Envia um e-mail texto (sem anexos).
+    Envia um e-mail texto, com os anexos já no spool (ver anexos.py).
     Retorna (status, mensagem):
         - (True, "[EMAIL] OK: destinatário") em caso de sucesso
         - (False, "[EMAIL][ERRO] TipoErro: descrição") em caso de falha
@@ -51,14 +71,11 @@ def enviar_email(destinatario: str, assunto: str, corpo: str, reply_to: str | No
         msg["Auto-Submitted"] = "auto-generated"
         msg["Precedence"] = "bulk"
 
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30) as server:
-            if SMTP_TLS:
-                server.starttls()
-            if SMTP_USER and SMTP_PASS:
-                server.login(SMTP_USER, SMTP_PASS)
-            server.send_message(msg)
+        ok, relay = RELAYS.enviar(msg, anexos)
+        if not ok:
+            raise smtplib.SMTPException(relay)
 
-        msg_ok = f"[EMAIL] OK: {destinatario}"
+        msg_ok = f"[EMAIL] OK: {destinatario} (via {relay})"
         print(msg_ok)
         return True, msg_ok
 
@@ -69,337 +86,75 @@ def enviar_email(destinatario: str, assunto: str, corpo: str, reply_to: str | No
 
         
 
-UF_OPCOES = [
-    "AC","AL","AM","AP","BA","CE","DF","ES","GO","MA",
-    "MG","MS","MT","PA","PB","PE","PI","PR","RJ","RN",
-    "RO","RR","RS","SC","SE","SP","TO"
-]
-UF_OPCOES_SET = set(UF_OPCOES)  # membership rápido
-
-from datetime import date
-
-def _parse_iso_date(s: str):
-    try:
-        return date.fromisoformat((s or "").strip())
-    except Exception:
-        return None
-
-def validar_nascimento_estudante(valor: str):
-    raw = (valor or "").strip()
-    if not raw:
-        return gr.update(value="", elem_classes=[])
-    d = _parse_iso_date(raw)
-    if not d:
-        gr.Warning("⚠️ Data inválida.")
-        return gr.update(value=raw, elem_classes=["erro"])
-    if d > date.today():
-        gr.Warning("⚠️ A data de nascimento não pode ser futura.")
-        return gr.update(value=raw, elem_classes=["erro"])
-    return gr.update(value=raw, elem_classes=[])
-
-
-def validar_nascimento_representante(valor: str):
-    raw = (valor or "").strip()
-    if not raw:
-        return gr.update(value="", elem_classes=[])
-    d = _parse_iso_date(raw)
-    if not d:
-        gr.Warning("⚠️ Data inválida.")
-        return gr.update(value=raw, elem_classes=["erro"])
-    hoje = date.today()
-    if d > hoje:
-        gr.Warning("⚠️ A data de nascimento não pode ser futura.")
-        return gr.update(value=raw, elem_classes=["erro"])
-    try:
-        limite_18 = hoje.replace(year=hoje.year - 18)
-    except ValueError:
-        limite_18 = hoje.replace(month=2, day=28, year=hoje.year - 18)
-    if d > limite_18:
-        gr.Warning("⚠️ O Representante deve ter pelo menos 18 anos.")
-        return gr.update(value=raw, elem_classes=["erro"])
-    return gr.update(value=raw, elem_classes=[])
-
-
-VIACEP_URL = "https://viacep.com.br/ws/{cep}/json/"
 CEP_TIMEOUT = 4.0    # segundos
-CEP_TTL = 3600       # 1h de cache simples em memória
-__cep_cache = {}     # cep8 -> (ts, data|None)
-
-def _only_digits(s: str) -> str:
-    return re.sub(r"\D", "", s or "")
+CEP_TTL = 3600       # 1h de cache (memória ou SQLite compartilhado, ver cache.py)
+CACHE = abrir_cache()
+HISTORICO = abrir_historico()
+ESTUDANTES = abrir_indice_estudantes()
+MUNICIPIOS = abrir_indice_municipios()
+_FALTA = object()    # distingue "não está no cache" de "CEP inexistente" (None)
 
-def _cep8(raw: str) -> str:
-    return _only_digits(raw)[:8]
+# Disjuntor do DNS (ver disjuntores.py; os provedores de CEP têm cada um o
+# seu): com os resolvers fora, a consulta falha na hora e o validador cai no
+# "não foi possível validar agora", sem esperar o timeout a cada interação.
+DISJUNTOR_DNS = abrir_disjuntor("dns")
 
-def _cep_fmt(d: str) -> str:
-    return f"{d[:5]}-{d[5:]}" if len(d) == 8 else d
+# CEP: ViaCEP e demais provedores com hedge (ver provedores_cep.py)
+PROVEDORES_CEP = abrir_resolvedor_cep(CEP_TIMEOUT)
 
-def _cache_get(cep8): 
-    hit = __cep_cache.get(cep8)
-    if not hit: return None
-    ts, data = hit
-    if time.time() - ts > CEP_TTL:
-        __cep_cache.pop(cep8, None)
-        return None
-    return data
+def _cache_get(cep8):
+    return CACHE.get("cep", cep8, _FALTA)
 
 def _cache_set(cep8, data):
-    __cep_cache[cep8] = (time.time(), data)
+    CACHE.set("cep", cep8, data, CEP_TTL)
 
 def viacep_lookup(cep8: str):
+    """Endereço do CEP no formato do ViaCEP (None = inexistente), com cache."""
     c = _cache_get(cep8)
-    if c is not None:
+    if c is not _FALTA:
         return c
-    with httpx.Client(timeout=CEP_TIMEOUT) as client:
-        r = client.get(VIACEP_URL.format(cep=cep8))
-        r.raise_for_status()
-        data = r.json()
-        if data.get("erro"):
-            _cache_set(cep8, None)
-            return None
-        _cache_set(cep8, data)
-        return data
-
-def validar_cep(valor: str):
-    """
-    Valida CEP brasileiro localmente (sem API).
-    - Aceita entrada com/sem hífen e outros separadores.
-    - Exige 8 dígitos numéricos.
-    - Rejeita 00000-000.
-    - Devolve formatado como 00000-000.
-    - Integra com CSS .erro (já existente no app).
-    """
-    if not valor:  # campo vazio: não marca erro aqui (obrigatoriedade é na submissão)
-        return gr.update(value="", elem_classes=[])
+    data = PROVEDORES_CEP.consultar(cep8)
+    _cache_set(cep8, data)
+    return data
 
-    # Mantém só dígitos
-    cep = re.sub(r"\D", "", str(valor))
+# === Adaptadores Gradio das regras de validacao.py ===
+# As regras ficam em validacao.py (sem Gradio); aqui só se traduz o
+# Resultado em gr.update e a mensagem em gr.Warning (erro) ou gr.Info.
+def _para_update(res: validacao.Resultado, atual=_FALTA):
+    if res.mensagem:
+        (gr.Warning if res.erro else gr.Info)(res.mensagem)
+    classes = ["erro"] if res.erro else []
+    # com o valor atual em mãos, só ecoa o valor quando ele muda
+    if atual is not _FALTA and (atual or None) == (res.valor or None):
+        return gr.update(elem_classes=classes)
+    return gr.update(value=res.valor, elem_classes=classes)
+
+def _para_updates(r: validacao.ResultadoCampos, nomes: list, atuais: list):
+    if r.mensagem:
+        (gr.Warning if r.erro else gr.Info)(r.mensagem)
+    return tuple(
+        _para_update(r.campos[n], atual) if n in r.campos else gr.skip()
+        for n, atual in zip(nomes, atuais)
+    )
 
-    # 8 dígitos?
-    if len(cep) != 8:
-        gr.Warning("⚠️ CEP inválido. Use o formato 00000-000.")
-        return gr.update(value="", elem_classes=["erro"])
+def validar_nascimento_estudante(valor: str):
+    return _para_update(validacao.validar_nascimento_estudante(valor))
 
-    # Evita CEP nulo
-    if cep == "00000000":
-        gr.Warning("⚠️ CEP inválido.")
-        return gr.update(value="", elem_classes=["erro"])
+def validar_nascimento_representante(valor: str):
+    return _para_update(validacao.validar_nascimento_representante(valor))
 
-    # Formata
-    cep_fmt = f"{cep[:5]}-{cep[5:]}"
-    return gr.update(value=cep_fmt, elem_classes=[])
+def validar_cep(valor: str):
+    return _para_update(validacao.validar_cep(valor))
 
 def validar_cep_com_api(cep_val, end_val, bairro_val, cidade_val, uf_val):
-    # 1) validação local (sua função atual)
-    upd_local = validar_cep(cep_val)  # gr.update(...)
-    cep_fmt = upd_local.get("value") or ""
-    cep_ok = bool(cep_fmt) and (upd_local.get("elem_classes") in ([], None))
-
-    # base: refletir resultado local
-    out = [
-        upd_local,
-        gr.update(value=end_val or ""),     # endereço
-        gr.update(value=bairro_val or ""),  # bairro
-        gr.update(value=cidade_val or ""),  # cidade
-        gr.update(value=uf_val or None),    # uf (dropdown)
-    ]
-    if not cep_ok:
-        return tuple(out)
-
-    # 2) CEP local ok → consulta ViaCEP
-    d = re.sub(r"\D", "", cep_fmt)[:8]
-    try:
-        info = viacep_lookup(d)
-    except Exception:
-        gr.Warning("⚠️ Falha ao consultar o ViaCEP agora. Tente novamente.")
-        return tuple(out)
-
-    if not info:
-        gr.Warning("⚠️ CEP não encontrado na base ViaCEP.")
-        out[0] = gr.update(value=cep_fmt, elem_classes=["erro"])
-        return tuple(out)
-
-    # 3) sucesso: extrair campos
-    end_api    = (info.get("logradouro")  or "").strip()
-    bairro_api = (info.get("bairro")      or "").strip()
-    cidade_api = (info.get("localidade")  or "").strip()
-    uf_api     = (info.get("uf")          or "").strip().upper() or None
-
-    # helper: manter o que o usuário pôs; senão, preencher com API
-    def keep_or_fill(cur, api):
-        return cur if (cur or "").strip() else (api or "")
-
-    # 4) aplicar política
-    # CEP: ok
-    out[0] = gr.update(value=cep_fmt, elem_classes=[])
-
-    # Endereço/Bairro: só preenche se estiverem vazios; não inventa quando API vier vazia
-    novo_end    = keep_or_fill(end_val,    end_api)
-    novo_bairro = keep_or_fill(bairro_val, bairro_api)
-    out[1] = gr.update(value=novo_end,    elem_classes=[])
-    out[2] = gr.update(value=novo_bairro, elem_classes=[])
-
-    # Cidade/UF: SEMPRE sobrescrever pelos dados da API (mais confiáveis)
-    out[3] = gr.update(value=cidade_api, elem_classes=[])
-
-    # UF: garantir que existe nas opções do dropdown
-    if uf_api in UF_OPCOES:
-        out[4] = gr.update(value=uf_api, elem_classes=[])
-    else:
-        # se a API não trouxe UF válida, não force valor (mantém como está)
-        out[4] = gr.update(value=(uf_val or None), elem_classes=[])
-
-    # 5) CEP genérico de município (logradouro/bairro vazios): orientar usuário
-    if not novo_end or not novo_bairro:
-        gr.Info("ℹ️ CEP genérico do município: preencha manualmente Endereço e Bairro.")
-
-    return tuple(out)
-
-AUTO_CORRIGIR_CIDADE_UF = True  # defina False se quiser apenas marcar erro e interromper
-
-def _norm(x: str) -> str:
-    x = (x or "").strip().lower()
-    x = unicodedata.normalize("NFD", x)
-    x = "".join(ch for ch in x if unicodedata.category(ch) != "Mn")
-    x = re.sub(r"\s+", " ", x)
-    return x
-
-def validar_cidade_uf_por_cep(dados: dict, updates: dict, nomes_completos: list, prefixo: str, UF_OPCOES=None):
-    """Valida se cidade/UF batem com ViaCEP para o CEP. prefixo "" ou 'estudante'."""
-    def nome(c): return f"{c}_{prefixo}" if prefixo else c
-    def idx(n): return nomes_completos.index(n)
-
-    n_cep, n_cidade, n_uf = nome("cep"), nome("cidade"), nome("uf")
-
-    cep_raw = (dados.get(n_cep) or "").strip()
-    cep8 = re.sub(r"\D", "", cep_raw)[:8]
-    if len(cep8) != 8 or cep8 == "00000000":
-        updates[idx(n_cep)] = gr.update(elem_classes=["erro"])
-        gr.Warning(f"⚠️ CEP inválido em '{n_cep}'.")
-        return False
-
-    try:
-        info = viacep_lookup(cep8)
-    except Exception:
-        updates[idx(n_cep)] = gr.update(elem_classes=["erro"])
-        gr.Warning(f"⚠️ Não foi possível validar {n_cep} agora. Tente novamente.")
-        return False
-
-    if not info:
-        updates[idx(n_cep)] = gr.update(elem_classes=["erro"])
-        gr.Warning(f"⚠️ {n_cep} não encontrado (ViaCEP).")
-        return False
-
-    cidade_api = (info.get("localidade") or "").strip()
-    uf_api     = (info.get("uf") or "").strip().upper()
-
-    cidade_user = (dados.get(n_cidade) or "").strip()
-    uf_user     = (dados.get(n_uf) or "").strip().upper()
-
-    ok_cidade = _norm(cidade_user) == _norm(cidade_api) if cidade_api else True
-    ok_uf     = (uf_user == uf_api) if uf_api else True
-
-    # padroniza CEP
-    updates[idx(n_cep)] = gr.update(value=f"{cep8[:5]}-{cep8[5:]}", elem_classes=[])
-
-    if ok_cidade and ok_uf:
-        return True
-
-    # Divergência → corrigir ou marcar erro
-    msgs = []
-    if not ok_cidade:
-        msgs.append(f"cidade = '{cidade_api}'")
-        updates[idx(n_cidade)] = (
-            gr.update(value=cidade_api, elem_classes=[]) if AUTO_CORRIGIR_CIDADE_UF
-            else gr.update(elem_classes=["erro"])
-        )
-    if not ok_uf:
-        msgs.append(f"UF = '{uf_api}'")
-        if UF_OPCOES is None or (uf_api in UF_OPCOES_SET):
-            updates[idx(n_uf)] = (
-                gr.update(value=uf_api, elem_classes=[]) if AUTO_CORRIGIR_CIDADE_UF
-                else gr.update(elem_classes=["erro"])
-            )
-        else:
-            updates[idx(n_uf)] = gr.update(elem_classes=["erro"])
-
-
-    gr.Warning("⚠️ Cidade/UF não conferem com o CEP. Valor esperado: " + ", ".join(msgs) + ".")
-    return AUTO_CORRIGIR_CIDADE_UF
-
-AUTO_CORRIGIR_CIDADE_UF_NO_BLUR = False  # mantemos só sinalização, sem autocorrigir
+    r = validacao.validar_cep_com_api(cep_val, end_val, bairro_val, cidade_val, uf_val, viacep_lookup)
+    return _para_updates(r, ["cep", "endereco", "bairro", "cidade", "uf"],
+                         [cep_val, end_val, bairro_val, cidade_val, uf_val])
 
 def validar_cidade_uf_blur(cep_val, cidade_val, uf_val):
-    """
-    Valida no blur de CIDADE ou UF:
-    - Compara (cidade/uf) informados com ViaCEP do CEP.
-    - Se só a cidade divergir -> limpa/erro APENAS a cidade.
-    - Se só a UF divergir     -> limpa/erro APENAS a UF.
-    - Se ambos divergirem     -> limpa/erro ambos.
-    - Se baterem               -> remove erros.
-    - Se CEP inválido/sem API  -> não altera nada.
-    Retorna: (update_cidade, update_uf)
-    """
-    # 0) precisa de CEP válido
-    cep8 = re.sub(r"\D", "", (cep_val or ""))[:8]
-    if len(cep8) != 8 or cep8 == "00000000":
-        return (
-            gr.update(value=(cidade_val or ""), elem_classes=[]),
-            gr.update(value=(uf_val or None),  elem_classes=[]),
-        )
-
-    # 1) ViaCEP
-    try:
-        info = viacep_lookup(cep8)
-    except Exception:
-        gr.Warning("⚠️ Não foi possível validar cidade/UF agora (rede).")
-        return (
-            gr.update(value=(cidade_val or ""), elem_classes=[]),
-            gr.update(value=(uf_val or None),  elem_classes=[]),
-        )
-    if not info:
-        gr.Warning("⚠️ CEP não encontrado na base ViaCEP; não é possível validar cidade/UF.")
-        return (
-            gr.update(value=(cidade_val or ""), elem_classes=[]),
-            gr.update(value=(uf_val or None),  elem_classes=[]),
-        )
-
-    # 2) compara
-    cidade_api = (info.get("localidade") or "").strip()
-    uf_api     = (info.get("uf") or "").strip().upper()
-
-    def _norm(x: str) -> str:
-        import unicodedata, re as _re
-        x = (x or "").strip().lower()
-        x = unicodedata.normalize("NFD", x)
-        return _re.sub(r"\s+", " ", "".join(ch for ch in x if unicodedata.category(ch) != "Mn"))
-
-    uf_user   = (str(uf_val or "")).upper()
-    ok_cidade = _norm(cidade_val) == _norm(cidade_api) if cidade_api else True
-    ok_uf     = (uf_user == uf_api) if uf_api else True
-
-    # 3) construir updates por campo, limpando somente o que divergiu
-    updates_cidade = gr.update(value=(cidade_val or ""), elem_classes=[])
-    updates_uf     = gr.update(value=(uf_val or None),  elem_classes=[])
-
-    msgs = []
-    if not ok_cidade:
-        updates_cidade = gr.update(value="", elem_classes=["erro"])   # limpa SÓ cidade
-        msgs.append(f"cidade = '{cidade_api}'")
-    if not ok_uf:
-        updates_uf = gr.update(value=None, elem_classes=["erro"])     # limpa SÓ UF (dropdown)
-        msgs.append(f"UF = '{uf_api}'")
-
-    if msgs:
-        gr.Warning("⚠️ Cidade/UF não conferem com o CEP. Esperado: " + ", ".join(msgs) + ".")
-        return (updates_cidade, updates_uf)
-
-    # 4) tudo ok → remover erros e manter valores
-    return (
-        gr.update(value=(cidade_val or ""), elem_classes=[]),
-        gr.update(value=(uf_val or None),  elem_classes=[]),
-    )
-
+    """Blur de CIDADE ou UF: limpa/marca só o que divergir do IBGE/ViaCEP."""
+    r = validacao.validar_cidade_uf(cep_val, cidade_val, uf_val, viacep_lookup, MUNICIPIOS)
+    return _para_updates(r, ["cidade", "uf"], [cidade_val, uf_val])
 
 # def rg_normalizar(raw: str) -> str: # OK
 #     # remove tudo que não for dígito ou X/x
@@ -447,187 +202,79 @@ def validar_cidade_uf_blur(cep_val, cidade_val, uf_val):
 #         s = s.replace("X", "")
 #     return s
 
-PRESERVAR_PONTUACAO_RG = True  # mantém como digitado quando RG for válido
-
-def rg_eh_rg_simples(raw: str) -> bool:
-    """
-    RG simples (7–10), aceita só dígitos e 'X' APENAS no final (e no máximo 1).
-    Bloqueia todos zeros/todos iguais.
-    """
-    s = (raw or "").strip().upper()
-
-    # 🔴 Rejeita já aqui: 'X' fora do final ou mais de um 'X'
-    if 'X' in s and (s.count('X') > 1 or not s.endswith('X')):
-        return False
-
-    # mantém apenas dígitos e, se houver, um 'X' final
-    n = re.sub(r"[^0-9X]", "", s)
-
-    # faixa da sua versão original
-    if not (7 <= len(n) <= 10):
-        return False
-
-    # separa corpo/dv
-    if n.endswith('X'):
-        corpo = n[:-1]
-        if not corpo.isdigit():
-            return False
-    else:
-        if not n.isdigit():
-            return False
-        corpo = n
-
-    # bloqueios
-    if set(corpo) == {'0'} or len(set(corpo)) == 1:
-        return False
-
-    return True
-
-def rg_formatar(raw: str) -> str:
-    """Formata RG: pontos a cada 3 + hífen antes do último caractere."""
-    s = (raw or "").strip().upper()
-    # não mexa na regra do X aqui; só formata o que vier
-    n = re.sub(r"[^0-9X]", "", s)
-    if not n:
-        return ""
-    corpo, dv = n[:-1], n[-1]
-    grupos, rest = [], corpo
-    while rest:
-        grupos.append(rest[:3]); rest = rest[3:]
-    base = ".".join(grupos) if grupos else ""
-    return f"{base}-{dv}" if base else n
-
 def validar_rg_front(valor: str):
-    raw = (valor or "").strip()
-    if not raw:
-        return gr.update(value="", elem_classes=[])
-    if rg_eh_rg_simples(raw):
-        return gr.update(
-            value=(raw if PRESERVAR_PONTUACAO_RG else rg_formatar(raw)),
-            elem_classes=[]
-        )
-    gr.Warning("⚠️ RG inválido. Use 7–10 dígitos (opcional 'X' só no final). Ex.: 12.345.678-9")
-    return gr.update(value="", elem_classes=["erro"])
-
-
-def _so_digitos(s: str) -> str:
-    return re.sub(r"\D", "", s or "")
-
-# DDDs válidos (ANATEL): 11-19, 21-24, 27-28, 31-35, 37-38, 41-49, 51-55,
-# 61-69, 71-75, 77, 79, 81-89, 91-99
-DDD_VALIDOS = {
-    *[str(x) for x in range(11,20)],
-    *[str(x) for x in range(21,25)], 27, 28,
-    *[str(x) for x in range(31,36)], 37, 38,
-    *[str(x) for x in range(41,50)],
-    *[str(x) for x in range(51,56)],
-    *[str(x) for x in range(61,70)],
-    *[str(x) for x in range(71,76)], 77, 79,
-    *[str(x) for x in range(81,90)],
-    *[str(x) for x in range(91,100)],
-}
-DDD_VALIDOS = {str(x) for x in DDD_VALIDOS}  # garante strings
+    return _para_update(validacao.validar_rg(valor))
 
-def _todos_iguais(s: str) -> bool:
-    return s and all(ch == s[0] for ch in s)
-
-def telefone_valido_br(dig: str) -> bool:
-    """
-    Regras (Brasil):
-    - Aceita DDD + número: 10 dígitos (fixo) ou 11 dígitos (celular).
-    - Permite prefixo +55 (12 ou 13 dígitos; removemos antes de validar).
-    - DDD deve ser válido (ANATEL).
-    - Fixo: primeiro dígito do número (após DDD) ∈ {2,3,4,5}.
-    - Celular: primeiro dígito do número (após DDD) = 9.
-    - Rejeita sequências inválidas (número local todo zero ou todos dígitos iguais).
-    """
-    d = _so_digitos(dig)
-
-    # remove +55 se vier junto e o comprimento for compatível
-    if d.startswith("55") and len(d) in (12, 13):
-        d = d[2:]
-
-    # precisa ser 10 (fixo) ou 11 (celular)
-    if len(d) not in (10, 11):
-        return False
-
-    ddd = d[:2]
-    numero = d[2:]
-
-    # DDD válido
-    if ddd not in DDD_VALIDOS:
-        return False
-
-    # bloquear número local obviamente inválido
-    if set(numero) == {"0"} or _todos_iguais(numero):
-        return False
-
-    # regras de prefixo
-    if len(d) == 10:
-        # fixo começa em 2-5
-        return numero[0] in {"2", "3", "4", "5"}
-    else:
-        # celular começa em 9
-        return numero[0] == "9"
-
-def formatar_telefone_br(dig: str) -> str:
-    d = _so_digitos(dig)
-    if d.startswith("55") and len(d) in (12, 13):
-        d = d[2:]
-    if len(d) == 10:  # fixo
-        return f"({d[:2]}) {d[2:6]}-{d[6:]}"
-    if len(d) == 11:  # celular
-        return f"({d[:2]}) {d[2:7]}-{d[7:]}"
-    return dig  # fallback
 
 def validar_telefone(valor: str):
-    """
-    Para blur/change nos inputs.
-    - Se válido → normaliza e formata.
-    - Se inválido → limpa o campo e aplica .erro.
-    """
-    raw = (valor or "").strip()
-    if not raw:
-        return gr.update(value="", elem_classes=[])
-    if telefone_valido_br(raw):
-        return gr.update(value=formatar_telefone_br(raw), elem_classes=[])
-    gr.Warning("⚠️ Telefone inválido. Ex.: fixo (62) 2345-6789 ou celular (62) 91234-5678.")
-    return gr.update(value="", elem_classes=["erro"])
+    """Blur do telefone: válido → formata; inválido → limpa e marca .erro."""
+    return _para_update(validacao.validar_telefone(valor))
 
 # Resolver com DNS públicos e timeouts curtos
+DNS_SERVIDORES = ["8.8.8.8", "1.1.1.1", "9.9.9.9"]  # DNS públicos; ajuste se sua rede bloquear
+
 def _make_resolver():
     r = dns.resolver.Resolver(configure=True)
-    # Use DNS públicos; ajuste se sua rede bloquear
-    r.nameservers = ["8.8.8.8", "1.1.1.1", "9.9.9.9"]
+    r.nameservers = list(DNS_SERVIDORES)
     r.lifetime = 3.0   # tempo total por consulta
     r.timeout  = 2.0   # timeout por servidor
     return r
 
+# respostas de verdade do DNS: o domínio (ou o registro) não existe
+_DNS_SEM_REGISTRO = (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer)
+# resolver não respondeu: indeterminado, nunca "sem MX"
+_DNS_INDISPONIVEL = (dns.exception.Timeout, dns.resolver.NoNameservers, OSError)
+
 def _has_mx_or_a(domain: str, resolver=None) -> bool:
+    """
+    True/False pela resposta do DNS; timeout e resolver inalcançável
+    (_DNS_INDISPONIVEL) sobem como exceção para o chamador.
+    """
     if resolver is None:
         resolver = _make_resolver()
     try:
         resolver.resolve(domain, "MX")
         return True
-    except Exception:
-        try:
-            resolver.resolve(domain, "A")
-            return True
-        except Exception:
-            return False
+    except _DNS_SEM_REGISTRO:
+        pass
+    try:
+        resolver.resolve(domain, "A")
+        return True
+    except _DNS_SEM_REGISTRO:
+        return False
+
+DNS_TTL = 6 * 3600           # resposta positiva (domínio recebe e-mail)
+DNS_TTL_NEGATIVO = 30 * 60   # domínio sem MX/A: revalida mais cedo
 
 def _has_mx_or_a_or_parent(domain: str, resolver=None):
+    """True/False com cache (ver cache.py); None (timeout) nunca é cacheado."""
+    domain = domain.lower()
+    c = CACHE.get("dns", domain, _FALTA)
+    if c is not _FALTA:
+        return c
+    if not DISJUNTOR_DNS.permitir():
+        return None  # resolvers fora: mesmo tratamento do timeout (não reprova)
+    res = _consulta_mx_or_a_or_parent(domain, resolver)
+    if res is None:
+        DISJUNTOR_DNS.falha(f"DNS indisponível ao consultar {domain}")
+    else:
+        DISJUNTOR_DNS.sucesso()
+    if res is not None:
+        CACHE.set("dns", domain, res, DNS_TTL if res else DNS_TTL_NEGATIVO)
+    return res
+
+def _consulta_mx_or_a_or_parent(domain: str, resolver=None):
     if resolver is None:
         resolver = _make_resolver()
 
     def check(d):
         try:
             return _has_mx_or_a(d, resolver=resolver)
-        except (dns.resolver.LifetimeTimeout, dns.exception.Timeout):
+        except _DNS_INDISPONIVEL:
             # Rede/DNS indisponível → não condene o e-mail; devolva None (desconhecido)
             return None
-        except Exception:
-            return False
+        except dns.exception.DNSException:
+            return False  # nome malformado etc.
 
     # Tenta no próprio domínio
     res = check(domain)
@@ -649,155 +296,47 @@ def _has_mx_or_a_or_parent(domain: str, resolver=None):
     return False
 
 def validar_email_estrito(valor: str):
-    if not (valor and valor.strip()):
-        return gr.update(value="", elem_classes=[])
-
-    try:
-        info = validate_email(
-            valor,
-            allow_smtputf8=False,      # sem acentos no local-part
-            check_deliverability=False # DNS faremos abaixo
-        )
-        addr = info.normalized
-        local, domain = addr.rsplit("@", 1)
-
-        # Bloqueia Unicode também no domínio (versão estrita)
-        if any(ord(c) > 127 for c in domain):
-            raise EmailNotValidError("Domínio com caracteres inválidos.")
-
-        dns_ok = _has_mx_or_a_or_parent(domain)
-
-        if dns_ok is False:
-            # Domínio realmente sem MX/A (nem no pai)
-            gr.Warning("⚠️ O domínio do e-mail informado não aceita mensagens. Confira se está correto.")
-            return gr.update(value="", elem_classes=["erro"])
-        elif dns_ok is None:
-            # Timeout/sem resposta do DNS → não reprovar, apenas aceitar sintaxe ok
-            # (Se preferir avisar discretamente, adicione um Warning leve)
-            return gr.update(value=addr, elem_classes=[])
-
-        # Tudo certo
-        return gr.update(value=addr, elem_classes=[])
-
-    except EmailNotValidError:
-        gr.Warning("⚠️ O endereço de e-mail informado não é válido. Verifique se está escrito corretamente (sem acentos) e tente novamente.")
-        return gr.update(value="", elem_classes=["erro"])
-
-
-def _apenas_digitos(s: str) -> str:
-    return re.sub(r"\D", "", s or "")
-
-def _valida_cpf(d: str) -> bool:
-    if len(d) != 11 or d == d[0] * 11:
-        return False
-    soma = sum(int(d[i]) * (10 - i) for i in range(9))
-    dv1 = (soma * 10) % 11
-    dv1 = 0 if dv1 == 10 else dv1
-    if dv1 != int(d[9]): 
-        return False
-    soma = sum(int(d[i]) * (11 - i) for i in range(10))
-    dv2 = (soma * 10) % 11
-    dv2 = 0 if dv2 == 10 else dv2
-    return dv2 == int(d[10])
-
-def _valida_cnpj(d: str) -> bool:
-    if len(d) != 14 or d == d[0] * 14:
-        return False
-    pesos1 = [5,4,3,2,9,8,7,6,5,4,3,2]
-    pes2   = [6] + pesos1
-    s1 = sum(int(d[i])*pesos1[i] for i in range(12))
-    r1 = 11 - (s1 % 11); r1 = 0 if r1 >= 10 else r1
-    if r1 != int(d[12]): return False
-    s2 = sum(int(d[i])*pes2[i] for i in range(13))
-    r2 = 11 - (s2 % 11); r2 = 0 if r2 >= 10 else r2
-    return r2 == int(d[13])
-
-def _formata_cpf(d: str) -> str:
-    return f"{d[0:3]}.{d[3:6]}.{d[6:9]}-{d[9:11]}"
-
-def _formata_cnpj(d: str) -> str:
-    return f"{d[0:2]}.{d[2:5]}.{d[5:8]}/{d[8:12]}-{d[12:14]}"
+    return _para_update(validacao.validar_email(valor, _has_mx_or_a_or_parent))
 
 def validar_cnpj_cpf(valor: str):
-    d = _apenas_digitos(valor)
-    # vazio → não mexe (deixa o usuário digitar)
-    if not d:
-        return gr.update(value="", elem_classes=[])
-
-    if len(d) == 11:
-        if _valida_cpf(d):
-            return gr.update(value=_formata_cpf(d), elem_classes=[])
-        else:
-            gr.Warning("⚠️ CPF inválido. Preencha no formato 000.000.000-00")
-            return gr.update(value="", elem_classes=["erro"])
+    return _para_update(validacao.validar_cnpj_cpf(valor))
 
-    if len(d) == 14:
-        if _valida_cnpj(d):
-            return gr.update(value=_formata_cnpj(d), elem_classes=[])
-        else:
-            gr.Warning("⚠️ CNPJ inválido. Preencha no formato 00.000.000/0000-00")
-            return gr.update(value="", elem_classes=["erro"])
+def preencher_concedente(cnpj_val, *campos):
+    """
+    Blur do CNPJ/CPF: valida o documento e, se a concedente já tem termo
+    validado no histórico, preenche de uma vez os campos vazios
+    (CAMPOS_CONCEDENTE, na mesma ordem), sem passar pelos validadores de rede.
+    Campos já digitados pelo usuário são mantidos. Só para CNPJ: concedente
+    pessoa física (CPF) tem endereço pessoal, que não é preenchido para ninguém.
+    """
+    upd_doc = validar_cnpj_cpf(cnpj_val)
+    out = [upd_doc] + [gr.skip() for _ in campos]
+    if upd_doc.get("elem_classes") or len(validacao._apenas_digitos(upd_doc.get("value"))) != 14:
+        return out
 
-    # tamanho inesperado
-    gr.Warning("⚠️ Número inválido. Informe um CPF (11 dígitos) ou CNPJ (14 dígitos).")
-    return gr.update(value="", elem_classes=["erro"])
+    try:
+        cadastro = HISTORICO.concedente(upd_doc["value"])
+    except Exception as e:
+        print(f"[CONCEDENTES][ERRO] {type(e).__name__}: {e}")
+        return out
+    if not cadastro:
+        return out
+
+    preencheu = False
+    for i, (nome, atual) in enumerate(zip(CAMPOS_CONCEDENTE, campos), start=1):
+        novo = cadastro.get(nome)
+        if novo and not (atual or "").strip():
+            out[i] = gr.update(value=novo, elem_classes=[])
+            preencheu = True
+    if preencheu:
+        gr.Info("ℹ️ Dados da concedente preenchidos a partir de termos anteriores. Confira antes de enviar.")
+    return out
 
 def validar_cpf(valor: str):
-    raw = (valor or "").strip()
-
-    # se o campo foi deixado em branco, não marca erro (você valida obrigatoriedade no submit)
-    if not raw:
-        return gr.update(value="", elem_classes=[])
-
-    d = _apenas_digitos(raw)
-
-    # precisa ter 11 dígitos numéricos
-    if len(d) != 11:
-        gr.Warning("⚠️ CPF inválido. Informe 11 dígitos no formato 000.000.000-00.")
-        return gr.update(value="", elem_classes=["erro"])
-
-    # dígitos ok, checa DV
-    if not _valida_cpf(d):
-        gr.Warning("⚠️ CPF inválido. Verifique os dígitos verificadores.")
-        return gr.update(value="", elem_classes=["erro"])
-
-    # válido → formata e remove erro
-    return gr.update(value=_formata_cpf(d), elem_classes=[])
+    return _para_update(validacao.validar_cpf(valor))
 
 def validar_horas_semanais(valor: str):
-    if not valor or not str(valor).strip():
-        return gr.update(value="", elem_classes=[])
-
-    try:
-        # Normaliza separadores
-        txt = valor.lower().replace("h", ":").replace("min", "").replace(" ", "")
-        txt = txt.replace(",", ".")  # aceita vírgula decimal
-
-        horas, minutos = 0, 0
-
-        if ":" in txt:  # formato hh:mm
-            partes = txt.split(":")
-            horas = int(partes[0])
-            minutos = int(partes[1]) if len(partes) > 1 and partes[1] else 0
-        elif "." in txt:  # formato decimal, ex: 22.5
-            horas_float = float(txt)
-            horas = int(horas_float)
-            minutos = round((horas_float - horas) * 60)
-        else:  # só horas inteiras
-            horas = int(txt)
-
-        total_horas = horas + minutos / 60.0
-
-    except Exception:
-        gr.Warning("⚠️ Informe o valor em formato válido (ex: 30h, 22h30min, 22:30 ou 22,5).")
-        return gr.update(value="", elem_classes=["erro"])
-
-    if total_horas > 40:
-        gr.Warning("⚠️ Horas semanais não pode ultrapassar 40.")
-        return gr.update(value="", elem_classes=["erro"])
-
-    # Formata saída sempre como hh:mm
-    return gr.update(value=f"{int(horas)}h{minutos:02d}min" if minutos else f"{int(horas)}h", elem_classes=[])
+    return _para_update(validacao.validar_horas_semanais(valor))
 
 
 def limpar_erro_quando_digitar(valor: str):
@@ -806,68 +345,15 @@ def limpar_erro_quando_digitar(valor: str):
 
 def converter_valor(valor_str):
     try:
-        # Remove 'R$', espaços e outros caracteres não numéricos, exceto vírgula e ponto
-        valor_str = re.sub(r"[^\d,\.]", "", valor_str)
-        valor_str = valor_str.replace(",", ".").strip()
-        valor_float = float(valor_str)
-        
-        # Separa parte inteira (reais) e decimal (centavos)
-        reais = int(valor_float)
-        centavos = round((valor_float - reais) * 100)
-
-        partes = []
-
-        if reais > 0:
-            partes.append(num2words(reais, lang='pt_BR') + (" real" if reais == 1 else " reais"))
-        if centavos > 0:
-            partes.append(num2words(centavos, lang='pt_BR') + (" centavo" if centavos == 1 else " centavos"))
-
-        if not partes:
-            return "Zero real"
-
-        return " e ".join(partes).capitalize()
-    except Exception as e:
-        print(f"Erro na conversão do valor: {e}")
+        return valor_por_extenso((valor_str or "").strip())
+    except ValueError:
         return ""
 
 def calcular_total_dias(data_inicio, data_termino, contar_finais_semana, qtd_feriados):
-    if not data_inicio or not data_termino:
-        return gr.update(value="")
-
-    try:
-        dt_inicio = datetime.strptime(data_inicio, "%Y-%m-%d")
-        dt_termino = datetime.strptime(data_termino, "%Y-%m-%d")
-        if dt_termino < dt_inicio:
-            gr.Warning("⚠️ A data de término não pode ser anterior à data de início.")
-            return gr.update(value="")
-    except ValueError:
-        return gr.update(value="")
-
-    # feriados (inteiro ≥ 0)
-    try:
-        feriados = int(qtd_feriados or 0)
-        if feriados < 0:
-            feriados = 0
-    except Exception:
-        feriados = 0
-
-    # === LÓGICA AJUSTADA ===
-    # "Sim"  -> NÃO contar finais de semana (excluir sábados e domingos)
-    # "Não"  -> CONTAR finais de semana (incluir sábados e domingos)
-    conta = {0, 1, 2, 3, 4}  # seg a sex
-    if contar_finais_semana == "Não":
-        conta.update({5, 6})  # inclui sábados e domingos
-
-    # conta dias [início, término] inclusivo
-    dias = 0
-    atual = dt_inicio
-    while atual <= dt_termino:
-        if atual.weekday() in conta:
-            dias += 1
-        atual += timedelta(days=1)
-
-    dias_efetivos = max(0, dias - feriados)
-    return gr.update(value=f"{dias_efetivos} dias")
+    res = validacao.calcular_total_dias(data_inicio, data_termino, contar_finais_semana, qtd_feriados)
+    if res.mensagem:
+        gr.Warning(res.mensagem)
+    return gr.update(value=res.valor)
 
 
 def montar_corpo_email(dados: dict, atividades: list[str]) -> str:
@@ -910,18 +396,16 @@ def montar_corpo_email(dados: dict, atividades: list[str]) -> str:
         s = (v or "").strip()
         if not s:
             return ""
-        # normaliza: remove separadores de milhar e padroniza decimal com ponto
+        # mesmo parser do valor por extenso
         # exemplos aceitos: '1.234,56' | '1234,56' | '1234.56' | '759'
-        normalized = s.replace(".", "").replace(",", ".")
-        try:
-            quant = Decimal(normalized).quantize(Decimal("0.01"))
-            # formata em padrão en_US e depois troca separadores para pt-BR
-            en = f"{quant:,.2f}"           # '1,234.56'
-            br = en.replace(",", "X").replace(".", ",").replace("X", ".")
-            return f"R$ {br}"
-        except (InvalidOperation, ValueError):
+        quant = _parse_valor_brl(s)
+        if quant is None:
             # se não conseguir converter, retorna como veio (sem quebrar fluxo)
             return s
+        # formata em padrão en_US e depois troca separadores para pt-BR
+        en = f"{quant:,.2f}"           # '1,234.56'
+        br = en.replace(",", "X").replace(".", ",").replace("X", ".")
+        return f"R$ {br}"
 
     atividades_linhas = [
         f"{i}. {str(a).strip()}"
@@ -1020,337 +504,163 @@ def montar_corpo_email(dados: dict, atividades: list[str]) -> str:
 
 
 # === Função principal ===
-def processar_formulario(*args):
-    # ------------------------------
-    # 1) Campos FIXOS (até "horario_atividades")
-    #    -> Deixe essa lista exatamente nessa ordem,
-    #       pois é a ordem em que você coloca os inputs antes do *atividades
-    nomes_fixos = [
-        "tipo_estagio", "razao_social", "cnpj", "nome_fantasia", "endereco", "bairro",
-        "cep", "complemento", "cidade", "uf", "email", "telefone",
-        "representante", 
-        "nascimento_repr",
-        "cpf_repr", 
-        "nome_estudante", 
-        "nascimento", "cpf_estudante", "rg",
-        "endereco_estudante", "bairro_estudante", "cep_estudante", "complemento_estudante",
-        "cidade_estudante", "uf_estudante", "email_estudante", "telefone_estudante", "curso_estudante",
-        "ano_periodo", "matricula", "orientador", "data_inicio", "data_termino", "total_dias",
-        "horas_diarias", "horas_semana_estagio", "total_horas_estagio",
-        "seguradora", "apolice",
-        "modalidade_estagio", "remunerado", "valor_bolsa", "valor_extenso",
-        "auxilio_transporte", "especificacao_auxilio",
-        "contraprestacao", "especificacao_contraprestacao",
-        "horas_diarias_plano", "horas_semanais_plano", "total_horas_plano",
-        "horario_atividades",   # <- último fixo antes das atividades
-    ]
-
-    # 2) Campos do "rodapé" (após TODAS as atividades)
-    nomes_final = ["nome_supervisor", "formacao_supervisor", "cargo_supervisor", "registro_conselho"]
-
-    num_fixos = len(nomes_fixos)
-    num_finais = len(nomes_final)
-    total_args = len(args)
-    n_atividades = max(0, total_args - (num_fixos + num_finais))
-
-    nomes_completos = (
-        nomes_fixos
-        + [f"atividade_{i}" for i in range(1, n_atividades + 1)]
-        + nomes_final
-    )
+def _validar_termo(em_erro: set, args):
+    """
+    Adaptador de validacao.validar_termo para o formulário (sem enviar nada).
+    Retorna (falha, dados, atividades, nomes_completos, saida): `falha` é None
+    se o termo está OK, ou a lista [em_erro, *updates] pronta para a UI.
+    """
+    nomes_completos = nomes_do_termo(len(args))
+    res = validacao.validar_termo(dict(zip(nomes_completos, args)), viacep_lookup, MUNICIPIOS)
 
-    # === Aqui está o "desempacotamento" elegante ===
-    dados = dict(zip(nomes_completos, args))
-
-    # Agora você acessa qualquer campo por nome:
-    # exemplo:
-    # tipo_estagio = dados["tipo_estagio"]
-    # razao_social = dados["razao_social"]
-    # ...
-    atividades = [dados[n] for n in nomes_completos if n.startswith("atividade_")]
-
-    campos_obrigatorios = {
-        "tipo_estagio": "Tipo de Estágio",
-        "razao_social": "Razão Social",
-        "cnpj": "CNPJ",
-        "nome_fantasia": "Nome Fantasia",
-        "endereco": "Endereço",
-        "bairro": "Bairro",
-        "cep": "CEP",
-        "cidade": "Cidade",
-        "uf": "UF",
-        "email": "E-mail",
-        "telefone": "Telefone",
-        "representante": "Representante Legal",
-        "nascimento_repr": "Data de Nascimento do Representante",
-        "cpf_repr": "CPF do Representante Legal",
-        "nome_estudante": "Nome do(a) Estudante",
-        "nascimento": "Data de Nascimento do Estudante",
-        "cpf_estudante": "CPF do(a) Estudante",
-        "rg": "RG",
-        "endereco_estudante": "Endereço do(a) Estudante",
-        "bairro_estudante": "Bairro do(a) Estudante",
-        "cep_estudante": "CEP do(a) Estudante",
-        "cidade_estudante": "Cidade do(a) Estudante",
-        "uf_estudante": "UF do(a) Estudante",
-        "email_estudante": "E-mail do(a) Estudante",
-        "telefone_estudante": "Telefone do(a) Estudante",
-        "curso_estudante": "Curso do(a) Estudante",
-        "ano_periodo": "Ano/Período Letivo",
-        "matricula": "Matrícula",
-        "orientador": "Professor(a) Orientador(a)",
-        "data_inicio": "Data de Início",
-        "data_termino": "Data de Término",
-        "total_dias": "Total de Dias de Estágio",
-        "horas_diarias": "Horas Diárias",
-        "horas_semana_estagio": "Horas Semanais de Estágio",
-        "total_horas_estagio": "Total de Horas de Estágio",
-        "seguradora": "Nome da Seguradora",
-        "apolice": "Nº da Apólice de Seguro",
-        "modalidade_estagio": "Modalidade do Estágio",
-        "remunerado": "Remunerado",
-        "auxilio_transporte": "Auxílio Transporte",
-        "contraprestacao": "Contraprestação de Serviços",
-        "horas_diarias_plano": "Horas Diárias no Plano",
-        "horas_semanais_plano": "Horas Semanais no Plano",
-        "total_horas_plano": "Total de Horas no Plano",
-        "horario_atividades": "Horário das Atividades",
-        "nome_supervisor": "Nome do(a) Supervisor(a)",
-        "cargo_supervisor": "Cargo/Função do(a) Supervisor(a) no(a) concedente",
-        "formacao_supervisor": "Formação do(a) Supervisor(a)"
-    }
-     
-    
-    # Validação de obrigatórios (realça apenas os que faltam e preserva os demais)
-    # --- PREPARE: lista de updates + helper de marcação ---
-    updates = [gr.update(value=v, elem_classes=[]) for v in args]
+    # Nada é ecoado de volta: só emitimos update para o que de fato muda
+    # (valor normalizado, borda vermelha ligada/desligada).
+    updates = [gr.skip() for _ in args]
 
-    def marcar_erro(nome, on=True):
+    def marcar(nome, **upd):
         idx = nomes_completos.index(nome)
-        val_atual = args[idx]
-        updates[idx] = gr.update(value=val_atual, elem_classes=(["erro"] if on else []))
-
-    # =========================
-    # 1) Regras condicionais primeiro
-    # =========================
-    remunerado    = dados["remunerado"]
-    valor_bolsa   = dados["valor_bolsa"]
-    valor_extenso = dados["valor_extenso"]
-
-    if remunerado == "Sim":
-        if not str(valor_bolsa or "").strip():
-            marcar_erro("valor_bolsa", True)
-            gr.Warning("⚠️ O campo 'Valor da Bolsa' é obrigatório para a opção remunerado 'Sim'.")
-            return updates
-        if not str(valor_extenso or "").strip():
-            marcar_erro("valor_extenso", True)
-            gr.Warning("⚠️ O campo 'Valor por Extenso' é obrigatório para a opção remunerado 'Sim'.")
-            return updates
-    # limpa borda se corrigiu
-    marcar_erro("valor_bolsa", False)
-    marcar_erro("valor_extenso", False)
-
-    auxilio_transporte    = dados["auxilio_transporte"]
-    especificacao_auxilio = dados["especificacao_auxilio"]
-    if auxilio_transporte == "Sim":
-        if not str(especificacao_auxilio or "").strip():
-            marcar_erro("especificacao_auxilio", True)
-            gr.Warning("⚠️ O campo 'Especificação do Auxílio Transporte' é obrigatório para a opção Sim.")
-            return updates
-    marcar_erro("especificacao_auxilio", False)
-
-    contraprestacao                 = dados["contraprestacao"]
-    especificacao_contraprestacao   = dados["especificacao_contraprestacao"]
-    if contraprestacao == "Sim":
-        if not str(especificacao_contraprestacao or "").strip():
-            marcar_erro("especificacao_contraprestacao", True)
-            gr.Warning("⚠️ O campo 'Especificação da Contraprestação' é obrigatório para a opção Sim.")
-            return updates
-    marcar_erro("especificacao_contraprestacao", False)
-    
-    # ... (depois de montar dados/updates/nomes_completos)
-
-    # valida coerência cidade/UF com CEP — concedente
-    ok_concedente = validar_cidade_uf_por_cep(
-        dados, updates, nomes_completos, prefixo="", UF_OPCOES=UF_OPCOES_SET
-    )
-    if not ok_concedente:
-        return updates
-
-    # valida coerência cidade/UF com CEP — estudante
-    ok_estudante = validar_cidade_uf_por_cep(
-        dados, updates, nomes_completos, prefixo="estudante", UF_OPCOES=UF_OPCOES_SET
-    )
-    if not ok_estudante:
-        return updates
-    
-    # =========================
-    # 1) Validação das Datas de Nascimento
-    # =========================
-    ANO_MIN = 1900
-    
-    def _parse_iso_date_local(s: str):
-        try:
-            return date.fromisoformat((s or "").strip())
-        except Exception:
-            return None
-    
-    def _ano_ok(d: date) -> bool:
-        return ANO_MIN <= d.year <= date.today().year
-
+        updates[idx] = {**updates[idx], **upd}
+
+    for nome, valor in res.corrigidos.items():
+        marcar(nome, value=valor)
+    for nome in res.validos:
+        if nome in em_erro:
+            marcar(nome, elem_classes=[])
+    for e in res.erros:
+        if e.campo:
+            marcar(e.campo, elem_classes=["erro"])
+        if e.mensagem:
+            gr.Warning(e.mensagem)
+
+    def saida(novos=None):
+        # recalcula quem ficou em vermelho a partir dos updates emitidos
+        lista = novos if novos is not None else updates
+        marcados = set(em_erro)
+        for nome, upd in zip(nomes_completos, lista):
+            classes = upd.get("elem_classes")
+            if classes is None:
+                continue
+            if "erro" in classes:
+                marcados.add(nome)
+            else:
+                marcados.discard(nome)
+        return [marcados, *lista]
+
+    falha = None if res.ok else saida()
+    return falha, res.dados, res.atividades, nomes_completos, saida
+
+
+def encaminhar_termo(dados: dict, atividades: list[str], anexos=()) -> tuple[str, str]:
+    """
+    Envia o termo já validado ao setor responsável (com idempotência) e o
+    registra no histórico. `anexos`: documentos no spool (anexos.Anexo).
+    Retorna (situação, mensagem), situação em "enviado" | "duplicado" | "falha".
+    """
+    # Define o destinatário (pelo curso, ou fallback)
+#     mapa_destinatarios = {
+#         "Bacharelado em Administração": "lpa.cbe@ifgoiano.edu.br",
+#         "Bacharelado em Zootecnia": "coordbachzoo.cbe@ifgoiano.edu.br",
+#         "Técnico em Agropecuária": "coortecagro.cbe@ifgoiano.edu.br",
+#         "Técnico em Administração": "coordtecadm.cbe@ifgoiano.edu.br",
+#         "Técnico em Informática": "coordtecinfo.cbe@ifgoiano.edu.br",
+#     }
+#     curso = (dados.get("curso_estudante") or "").strip()
+#     email_destinatario = mapa_destinatarios.get(curso, "estagio.cbe@ifgoiano.edu.br")  # fallback de testes
 
-    # 1) Validações específicas
-    campos_com_erro = set()
+    #email_destinatario = "estagio.cbe@ifgoiano.edu.br"
+    email_destinatario = "robson.campelo@gmail.com"
 
-    def falha_especifica(nome, idx, msg):
-        updates[idx] = gr.update(elem_classes=["erro"])
-        gr.Warning(msg)
-        campos_com_erro.add(nome)
+    assunto = f"Termo de Compromisso de Estágio - {dados.get('nome_estudante','').strip()}"
 
-    # idx e valores crus
-    idx_nasc      = nomes_completos.index("nascimento")
-    idx_nasc_repr = nomes_completos.index("nascimento_repr")
+    corpo_email = montar_corpo_email(dados, atividades)
+    if anexos:
+        corpo_email += "\n\nDocumentos anexados:\n" + "\n".join(
+            f"- {a.nome} ({a.tamanho / 1024:.0f} KB)" for a in anexos
+        )
 
-    nasc_raw      = (dados.get("nascimento") or "").strip()
-    nasc_repr_raw = (dados.get("nascimento_repr") or "").strip()
-    
-#     print("DBG nasc_raw =", repr(nasc_raw))
-#     print("DBG nasc_repr_raw =", repr(nasc_repr_raw))
+    # Idempotência: o mesmo termo (mesmo conteúdo) só é enviado uma vez dentro
+    # de ENVIO_TTL, mesmo que o reenvio caia em outro worker
+    chave_envio = hashlib.sha256(
+        "\x1f".join([email_destinatario, assunto, corpo_email, *(a.sha256 for a in anexos)]).encode("utf-8")
+    ).hexdigest()
+    ja_enviado = not CACHE.reservar("envio", chave_envio, ENVIO_TTL)
 
-    hoje = date.today()
-    # trata 29/02 em anos não bissextos
     try:
-        limite_18 = hoje.replace(year=hoje.year - 18)
-    except ValueError:
-        limite_18 = hoje.replace(month=2, day=28, year=hoje.year - 18)
-
-    # Estudante — se veio preenchido: inválida/futura
-    if nasc_raw:
-        d = _parse_iso_date_local(nasc_raw)
-        if not d or not _ano_ok(d):
-            falha_especifica("nascimento", idx_nasc, f"⚠️ Data de nascimento inválida (ano deve ser ≥ {ANO_MIN}).")
-        elif d > hoje:
-            falha_especifica("nascimento", idx_nasc, "⚠️ A data de nascimento do(a) estudante não pode ser futura.")
-
-
-    # Representante — se veio preenchido: inválida/futura/<18
-    if nasc_repr_raw:
-        d = _parse_iso_date_local(nasc_repr_raw)
-        if not d or not _ano_ok(d):
-            falha_especifica("nascimento_repr", idx_nasc_repr,\
-                             f"⚠️ Data de nascimento do(a) representante inválida (ano deve ser ≥ {ANO_MIN}).")
-        elif d > hoje:
-            falha_especifica("nascimento_repr", idx_nasc_repr,\
-                             "⚠️ A data de nascimento do(a) representante não pode ser futura.")
-        elif d > limite_18:
-            falha_especifica("nascimento_repr", idx_nasc_repr, "⚠️ O(A) representante deve ter pelo menos 18 anos.")
-
-    data_inicio  = dados["data_inicio"]
-    data_termino = dados["data_termino"]
-    nascimento   = dados["nascimento"]
-    nascimento_repr = dados["nascimento_repr"]
-
-    # datas obrigatórias de período
-    try:
-        dt_inicio  = datetime.strptime(data_inicio,  "%Y-%m-%d")
-        dt_termino = datetime.strptime(data_termino, "%Y-%m-%d")
-    except ValueError:
-        gr.Warning("⚠️ Formato inválido de data (início/término). Use o seletor de calendário.")
-        return updates
-
-    # nascimento do estudante (opcional aqui, erros específicos já foram avisados acima)
-    dt_nascimento = None
-    if nascimento:
-        try:
-            dt_nascimento = datetime.strptime(nascimento, "%Y-%m-%d")
-        except ValueError:
-            # Se quiser, marque o campo como erro específico, em vez de mensagem genérica:
-            falha_especifica("nascimento", idx_nasc, "⚠️ Data de nascimento inválida.")
-            return updates
-
-    # nascimento do representante (idem)
-    dt_nascimento_repr = None
-    if nascimento_repr:
-        try:
-            dt_nascimento_repr = datetime.strptime(nascimento_repr, "%Y-%m-%d")
-        except ValueError:
-            falha_especifica("nascimento_repr", idx_nasc_repr, "⚠️ Data de nascimento do(a) representante inválida.")
-            return updates
-
-    if dt_termino < dt_inicio:
-        gr.Warning("⚠️ A data de término não pode ser anterior à data de início.")
-        return updates
-
-    dados['data_inicio']      = dt_inicio.strftime("%d/%m/%Y")
-    dados['data_termino']     = dt_termino.strftime("%d/%m/%Y")
-    if dt_nascimento:
-        dados['nascimento']   = dt_nascimento.strftime("%d/%m/%Y")
-    if dt_nascimento_repr:
-        dados['nascimento_repr'] = dt_nascimento_repr.strftime("%d/%m/%Y")
-
-
-    # (Se você precisa dos formatos dd/mm/aaaa depois, faça a conversão aqui em variáveis locais,
-    #   mas NÃO altere args; o 'updates' é só para UI)
-
-    # =========================
-    # 4) Atividades (mínimo 5) com borda vermelha
-    # =========================
-    indices_atividades = [
-        nomes_completos.index(f"atividade_{i}")
-        for i in range(1, n_atividades + 1)
-    ]
-    # valores normalizados
-    valores_atividades = [
-        (i, (str(args[i]).strip() if args[i] is not None else ""))
-        for i in indices_atividades
-    ]
-
-    preenchidas = [(i, v) for (i, v) in valores_atividades if v]
-    vazias = [i for (i, v) in valores_atividades if not v]
+        if ja_enviado:
+            print(f"[EMAIL] duplicado ignorado: {chave_envio[:12]}")
+            return "duplicado", "Este termo já foi encaminhado ao setor responsável."
+        else:
+            ok, msg_email = enviar_email(
+                destinatario=email_destinatario,
+                assunto=assunto,
+                corpo=corpo_email,
+                reply_to="no-reply@ifgoiano.edu.br",
+                anexos=anexos,
+            )
 
-   # 1) zere as classes de TODAS as atividades visíveis (remove vermelho antigo)
-    for idx in indices_atividades:
-        updates[idx] = gr.update(value=args[idx], elem_classes=[])
+            if ok:
+                # log técnico (aparece nos logs do Render)
+                print(msg_email)
+                # histórico local (alimenta o aquecimento de caches)
+                try:
+                    HISTORICO.registrar({**dados, "atividades": atividades})
+                except Exception as e:
+                    print(f"[HISTORICO][ERRO] {type(e).__name__}: {e}")
+                return "enviado", msg_email
+            else:
+                # libera a chave para permitir nova tentativa
+                CACHE.liberar("envio", chave_envio)
+                # detalhes técnicos só nos logs
+                print(msg_email)
+                return "falha", msg_email
 
-    # 2) regra do mínimo
-    MIN_REQ = 5
-    if len(preenchidas) < MIN_REQ:
-        faltam = MIN_REQ - len(preenchidas)
+    except Exception as e:
+        # se algo fora do enviar_email der erro
+        CACHE.liberar("envio", chave_envio)
+        msg_erro_handler = f"[ENVIAR_EMAIL_HANDLER][ERRO] {type(e).__name__}: {e}"
+        print(msg_erro_handler)
+        return "falha", msg_erro_handler
 
-        # marque de vermelho apenas as primeiras 'faltam' vazias
-        for idx in vazias[:faltam]:
-            updates[idx] = gr.update(value=args[idx], elem_classes=["erro"])
 
-        gr.Warning(f"⚠️ Informe pelo menos {MIN_REQ} atividades (faltam {faltam}).")
-        return updates
-    
-    # =========================
-    # Obrigatórios gerais
-    # =========================
-    erros_rotulos = []
-    for idx, nome in enumerate(nomes_completos[:len(args)]):
-        if nome in campos_com_erro:
-            # já marcamos erro específico e mostramos mensagem
+def anexar_documentos(arquivos, spool):
+    """
+    Sincroniza o spool (gr.State: caminho do upload -> Anexo) com os arquivos
+    do componente: confere e copia os novos, descarta os removidos.
+    """
+    arquivos = [a for a in (arquivos or []) if a]
+    spool = dict(spool or {})
+    for origem in set(spool) - set(arquivos):
+        descartar([spool.pop(origem)])
+
+    rejeitados = False
+    for origem in arquivos:
+        if origem in spool:
             continue
+        try:
+            conferir_total([a.tamanho for a in spool.values()] + [os.path.getsize(origem)])
+            spool[origem] = guardar_anexo(origem)
+        except AnexoInvalido as e:
+            gr.Warning(str(e))
+            rejeitados = True
 
-        obrigatorio = nome in campos_obrigatorios
-        valor = args[idx]
-        vazio = (valor is None) or (str(valor).strip().lower() in ["", "none"])
-
-        if obrigatorio and vazio:
-            marcar_erro(nome, True)  # preencha updates[idx] internamente, como você já faz
-            erros_rotulos.append(campos_obrigatorios[nome])
-        else:
-            marcar_erro(nome, False)
-
-    if campos_com_erro or erros_rotulos:
-        if erros_rotulos:
-            lista = ", ".join(erros_rotulos[:4]) + ("..." if len(erros_rotulos) > 4 else "")
-            gr.Warning(f"⚠️ Preencha os campos obrigatórios destacados em vermelho: {lista}.")
-        # ATENÇÃO: se sua função espera lista de updates na ordem,
-        # converta aqui (ex.: with_indices -> list). Se você já usa dict->list em outro ponto, chame o mesmo helper.
-        return updates  # ou: return out_list
+    if rejeitados:
+        return spool, gr.update(value=list(spool))
+    return spool, gr.skip()
 
+def processar_formulario(token, em_erro, spool, *args):
+    """
+    Valida e envia o termo. `token` é a chave do rascunho da sessão; `em_erro`,
+    o conjunto (gr.State) de campos que o último envio deixou marcados em
+    vermelho; `spool`, os anexos já conferidos (ver anexar_documentos).
+    Retorna [novo em_erro, spool, arquivos, qtd. de atividades, atividades
+    restauradas, marca de encaminhado, *updates], emitindo update apenas para
+    os campos que mudam (demais: gr.skip()).
+    """
+    em_erro = set(em_erro or ())
+    falha, dados, atividades, nomes_completos, saida = _validar_termo(em_erro, args)
+    if falha is not None:
+        return [falha[0], *(gr.skip() for _ in range(5)), *falha[1:]]
+    anexos = list((spool or {}).values())
 
     # ------------------------------
     # Se chegou aqui, está tudo OK — siga com o resto do processamento
@@ -1438,52 +748,21 @@ def processar_formulario(*args):
     
     
     # === Envia o e-mail após gerar as informações ===
-    
-    # Define o destinatário (pelo curso, ou fallback)
-#     mapa_destinatarios = {
-#         "Bacharelado em Administração": "lpa.cbe@ifgoiano.edu.br",
-#         "Bacharelado em Zootecnia": "coordbachzoo.cbe@ifgoiano.edu.br",
-#         "Técnico em Agropecuária": "coortecagro.cbe@ifgoiano.edu.br",
-#         "Técnico em Administração": "coordtecadm.cbe@ifgoiano.edu.br",
-#         "Técnico em Informática": "coordtecinfo.cbe@ifgoiano.edu.br",
-#     }
-#     curso = (dados.get("curso_estudante") or "").strip()
-#     email_destinatario = mapa_destinatarios.get(curso, "estagio.cbe@ifgoiano.edu.br")  # fallback de testes
-
-    #email_destinatario = "estagio.cbe@ifgoiano.edu.br"
-    email_destinatario = "robson.campelo@gmail.com"
-
-    assunto = f"Termo de Compromisso de Estágio - {dados.get('nome_estudante','').strip()}"
-
-    corpo_email = montar_corpo_email(dados, atividades)
-
-    # Envia e trata visualmente sem interromper o retorno dos outputs
-    try:
-        ok, msg_email = enviar_email(
-            destinatario=email_destinatario,
-            assunto=assunto,
-            corpo=corpo_email,
-            reply_to="no-reply@ifgoiano.edu.br"
-        )
-
-        if ok:
-            # mensagem amigável para o usuário
-            gr.Info("✅ TCE registrado e encaminhado com sucesso ao setor responsável.")
-            # log técnico (aparece nos logs do Render)
-            print(msg_email)
-        else:
-            # mensagem amigável
-            #gr.Warning("⚠️ Não foi possível enviar o e-mail agora. Tente novamente mais tarde.")
-            gr.Warning(msg_email)
-            # detalhes técnicos só nos logs
-            print(msg_email)
-
-    except Exception as e:
-        # se algo fora do enviar_email der erro
-        msg_erro_handler = f"[ENVIAR_EMAIL_HANDLER][ERRO] {type(e).__name__}: {e}"
-        print(msg_erro_handler)
-        #gr.Warning("⚠️ [ERRO] Não foi possível enviar o e-mail agora. Tente novamente mais tarde.")
-        gr.Warning(msg_erro_handler)
+    status_envio, msg_envio = encaminhar_termo(dados, atividades, anexos)
+    if status_envio == "falha":
+        #gr.Warning("⚠️ Não foi possível enviar o e-mail agora. Tente novamente mais tarde.")
+        gr.Warning(msg_envio)
+        # formulário e anexos ficam como estão, para tentar de novo
+        marcados, *lista = saida()
+        return [marcados, *(gr.skip() for _ in range(5)), *lista]
+
+    descartar(anexos)  # o formulário é limpo abaixo; o spool também
+    RASCUNHOS.descartar(token)  # a cópia do navegador sai via JS_ENCAMINHADO
+    if status_envio == "enviado":
+        # mensagem amigável para o usuário
+        gr.Info("✅ TCE registrado e encaminhado com sucesso ao setor responsável.")
+    else:
+        gr.Info("ℹ️ Este termo já foi encaminhado ao setor responsável.")
 
 
    
@@ -1508,102 +787,439 @@ def processar_formulario(*args):
         "qtd_feriados",  # só terá efeito se estiver em nomes_completos
     }
 
-    def _reset_update(nome: str):
+    def _valor_reset(nome: str):
         if nome in RADIOS:
-            return gr.update(value=("Não" if nome == "possui_cin" else None), elem_classes=[])
+            return "Não" if nome == "possui_cin" else None
         if nome in DROPDOWNS:
-            return gr.update(value=None, elem_classes=[])
+            return None
         if nome in NUMBERS:
-            return gr.update(value=None, elem_classes=[])
-        if nome in {"nascimento", "nascimento_repr"}:
-            return gr.update(value="", elem_classes=[])
-        return gr.update(value="", elem_classes=[])
+            return None
+        return ""
 
+    # reseta só o que não está já no valor inicial (ou ainda está em vermelho)
     out = []
-    for nome in nomes_completos:
-        out.append(_reset_update(nome))
+    for nome, valor in zip(nomes_completos, args):
+        alvo = _valor_reset(nome)
+        if valor == alvo and nome not in em_erro:
+            out.append(gr.skip())
+        else:
+            out.append(gr.update(value=alvo, elem_classes=[]))
 
 #     print("✅ Termo registrado com sucesso!")
 #     gr.Info("✅ Termo registrado com sucesso!")
 
-    return out
+    em_erro.clear()
+    marcados, *lista = saida(out)
+    # a lista de atividades volta ao mínimo; a nova geração recria as caixas vazias
+    restauradas = {"geracao": time.time_ns(), "valores": []}
+    return [marcados, {}, gr.update(value=None), MIN_ATIVIDADES, restauradas, str(time.time_ns()), *lista]
 
 
+# === Rascunho (salvamento automático e retomada) ===
+# O navegador guarda o rascunho no localStorage e manda a mesma foto ao
+# servidor a cada RASCUNHO_INTERVALO s (só quando algo mudou). Ao abrir a
+# página, o rascunho volta num único update, sem disparar blur: nenhum
+# validador de rede roda na retomada. Ver rascunhos.py.
+RASCUNHO_INTERVALO = float(os.getenv("RASCUNHO_INTERVALO", 5))
+RASCUNHOS = rascunhos.Rascunhos(CACHE)
 
-with gr.Blocks(theme="default") as demo:
-    gr.HTML("""
-    <script>
-    (function () {
-      try {
-        // Diz explicitamente que a página está em pt-BR
-        document.documentElement.setAttribute("lang", "pt-BR");
-        // Sinaliza a tradutores que não queremos tradução automática
-        document.documentElement.setAttribute("translate", "no");
-        document.documentElement.classList.add("notranslate");
-
-        // Dica para o Google Translate
-        var m = document.createElement("meta");
-        m.setAttribute("name", "google");
-        m.setAttribute("content", "notranslate");
-        document.head.appendChild(m);
-      } catch (e) {}
-    })();
-    </script>
-    <style>
-      /* Evita que engines que respeitam a propriedade CSS traduzam o conteúdo */
-      .notranslate, .notranslate * { translate: none; }
-    </style>
-    """)
-    
-    # CSS de erro (uma vez na app)
-    gr.HTML("""
-        <style>
-        /* Borda vermelha em inputs de texto/textarea/select */
-        .erro input,
-        .erro textarea,
-        .erro select {
-          border-color: #dc2626 !important;
-          border-width: 1px !important;
-          border-style: solid !important;
-          box-shadow: 0 0 0 1px #dc2626 inset !important;
-        }
+# campos da tela que não entram no termo, mas mudam o que é calculado nele
+NOMES_EXTRAS_RASCUNHO = ["possui_cin", "contar_finais_semana", "qtd_feriados"]
+# valores com que esses campos já abrem (os dos componentes): não são rascunho
+INICIAIS_RASCUNHO = {"possui_cin": "Não", "contar_finais_semana": "Não", "qtd_feriados": 0}
+NOMES_RASCUNHO = NOMES_EXTRAS_RASCUNHO + NOMES_FIXOS + NOMES_FINAIS
 
-        /* Mantém o vermelho mesmo com foco */
-        .erro input:focus,
-        .erro textarea:focus,
-        .erro select:focus {
-          border-color: #dc2626 !important;
-          box-shadow: 0 0 0 1px #dc2626 inset !important;
-        }
+def _so_cache_cep(cep8: str):
+    c = _cache_get(cep8)
+    if c is _FALTA:
+        raise LookupError(cep8)  # sem resposta guardada: não marca (e não vai à rede)
+    return c
+
+def _so_cache_dominio(dominio: str):
+    c = CACHE.get("dns", dominio, _FALTA)
+    if c is _FALTA:
+        raise LookupError(dominio)
+    return c
+
+def _cep_conferido(valor: str):
+    res = validacao.validar_cep(valor)
+    if res.ok and res.valor and not _so_cache_cep(_cep8(res.valor)):
+        return validacao.Resultado("", "cep_nao_encontrado")
+    return res
+
+def _email_conferido(valor: str):
+    return validacao.validar_email(valor, _so_cache_dominio)
+
+VALIDADORES_RASCUNHO = [
+    ("cnpj", validacao.validar_cnpj_cpf),
+    ("cep", _cep_conferido),
+    ("email", _email_conferido),
+    ("telefone", validacao.validar_telefone),
+    ("nascimento_repr", validacao.validar_nascimento_representante),
+    ("cpf_repr", validacao.validar_cpf),
+    ("nascimento", validacao.validar_nascimento_estudante),
+    ("cpf_estudante", validacao.validar_cpf),
+    ("cep_estudante", _cep_conferido),
+    ("email_estudante", _email_conferido),
+    ("telefone_estudante", validacao.validar_telefone),
+]
 
-        /* Fallback para componentes não-input (ex.: Radio/Checkbox) */
-        .erro {
-          outline: 2px solid #dc2626 !important;
-          outline-offset: 2px;
-          border-radius: 6px;
-        }
-        </style>
-        """)
-    
-     # CSS anti-erro (se já não tiver)
-    gr.HTML("""
-    <style>
-    .erro select {              /* dropdown */
-      border-color:#dc2626!important; box-shadow:0 0 0 1px #dc2626 inset!important;
+def _campos_validados(campos: dict) -> set:
+    """
+    Campos cujo valor atual passa pelos mesmos validadores do blur. Nada sai
+    para a rede: CEP e domínio de e-mail só contam com a resposta já em cache.
+    """
+    validados = set()
+    for nome, fn in VALIDADORES_RASCUNHO:
+        valor = campos.get(nome)
+        if not valor:
+            continue
+        try:
+            res = fn(valor)
+        except LookupError:
+            continue
+        if res.ok and res.valor == valor:
+            validados.add(nome)
+
+    for prefixo in ("", "_estudante"):
+        c_cep, c_cidade, c_uf = (f"{n}{prefixo}" for n in ("cep", "cidade", "uf"))
+        if not (campos.get(c_cidade) and campos.get(c_uf)):
+            continue
+        r = validacao.validar_cidade_uf(campos.get(c_cep), campos[c_cidade], campos[c_uf],
+                                        _so_cache_cep, MUNICIPIOS)
+        if r.erro is None:
+            validados.update(
+                {"cidade": c_cidade, "uf": c_uf}[n] for n, res in r.campos.items() if res.ok
+            )
+    return validados
+
+def _separar_rascunho(valores) -> tuple[dict, list]:
+    """[*extras, *fixos, *atividades, *finais] -> (campos por nome, atividades)."""
+    valores = list(valores)
+    n_extras, n_fixos, n_finais = len(NOMES_EXTRAS_RASCUNHO), len(NOMES_FIXOS), len(NOMES_FINAIS)
+    if len(valores) < n_extras + n_fixos + n_finais:
+        raise ValueError("rascunho incompleto")
+    fim = len(valores) - n_finais
+    campos = dict(zip(NOMES_RASCUNHO, valores[:n_extras + n_fixos] + valores[fim:]))
+    return campos, valores[n_extras + n_fixos:fim]
+
+def salvar_rascunho(token, em_erro, *valores):
+    """Cópia do rascunho no servidor (o navegador só chama quando algo mudou)."""
+    campos, atividades = _separar_rascunho(valores)
+    rascunho = rascunhos.compactar(campos, atividades, _campos_validados(campos), em_erro,
+                                   INICIAIS_RASCUNHO)
+    if not RASCUNHOS.salvar(token, rascunho):
+        print("[RASCUNHO] cópia recusada (chave inválida ou rascunho grande demais)")
+
+def _rascunho_do_navegador(local: str) -> dict | None:
+    try:
+        doc = json.loads(local)
+        campos, atividades = _separar_rascunho(doc["valores"])
+        salvo_em = float(doc.get("t") or 0) / 1000
+    except (ValueError, TypeError, KeyError):
+        return None
+    return {**rascunhos.compactar(campos, atividades, set(), (), INICIAIS_RASCUNHO), "t": salvo_em}
+
+def restaurar_rascunho(token, local):
+    """
+    Retomada ao abrir a página: vale o rascunho do navegador, ou a cópia do
+    servidor se ela for mais nova (ou o navegador não tiver nenhum). Campo
+    cuja marca confere com o valor volta validado; o que estava em vermelho
+    com o mesmo valor volta em vermelho.
+    Sem chave válida, emite uma nova (rascunhos.novo_token).
+    Retorna [chave, em_erro, qtd de atividades, atividades restauradas, *updates].
+    """
+    if not rascunhos.token_valido(token):
+        token = rascunhos.novo_token()
+    nada = [token, gr.skip(), gr.skip(), gr.skip(), *(gr.skip() for _ in NOMES_RASCUNHO)]
+    servidor = RASCUNHOS.carregar(token) or {}
+    navegador = _rascunho_do_navegador(local) if local else None
+    if navegador and navegador["t"] >= servidor.get("t", 0):
+        base = navegador
+    else:
+        base = servidor
+    if rascunhos.vazio(base):
+        return nada
+
+    valores, atividades = base["v"], base["a"]
+    validados = rascunhos.conferidos(servidor, valores)
+    anteriores = servidor.get("v") or {}
+    em_erro = {
+        c for c in servidor.get("e") or ()
+        if c in valores and anteriores.get(c) == valores[c] and c not in validados
     }
-    </style>
-    """)
-    
-    gr.HTML("""
-    <script>
-      try {
-        history.scrollRestoration = 'manual';
-        window.addEventListener('DOMContentLoaded', ()=>{ window.scrollTo(0,0); });
-        setTimeout(()=>{ window.scrollTo(0,0); }, 0);
-      } catch(e){}
-    </script>
-    """)
 
+    updates = []
+    for nome in NOMES_RASCUNHO:
+        if nome not in valores:
+            updates.append(gr.skip())
+        elif nome in em_erro:
+            updates.append(gr.update(value=valores[nome], elem_classes=["erro"]))
+        else:
+            updates.append(gr.update(value=valores[nome]))
+
+    gr.Info(f"📝 Rascunho retomado: {len(valores) + len(atividades)} campos preenchidos, "
+            f"{len(validados)} já validados.")
+    restauradas = {"geracao": time.time_ns(), "valores": atividades}
+    return [token, em_erro, max(MIN_ATIVIDADES, len(atividades)), restauradas, *updates]
+
+# Antes do backend (no navegador). JS_RETOMAR: lê a chave da sessão
+# (localStorage, ou o cookie) e o rascunho local; sem chave, o servidor emite
+# uma. JS_SALVAR: grava a foto no localStorage e só a envia ao servidor se
+# mudou desde a última.
+JS_RETOMAR = """
+() => {
+  let token = null, local = "";
+  try { token = localStorage.getItem("tce_rascunho_token"); } catch (e) {}
+  if (!token) {
+    const m = document.cookie.match(/(?:^|; )tce_rascunho=([\\w-]+)/);
+    token = m ? m[1] : null;
+  }
+  try { local = localStorage.getItem("tce_rascunho") || ""; } catch (e) {}
+  return [token || "", local];
+}
+"""
+
+JS_SALVAR = """
+(token, emErro, ...valores) => {
+  const foto = JSON.stringify(valores);
+  if (!token || !window.__tce_rascunho_pronto || foto === window.__tce_rascunho_foto) {
+    return new Promise(() => {});   // nada mudou: não vai ao servidor
+  }
+  window.__tce_rascunho_foto = foto;
+  try {
+    localStorage.setItem("tce_rascunho", JSON.stringify({ t: Date.now(), valores }));
+  } catch (e) {}
+  return [token, emErro, ...valores];
+}
+"""
+
+# depois de um termo encaminhado (marca nova no componente oculto): o
+# rascunho do navegador já não serve
+JS_ENCAMINHADO = """
+(marca) => {
+  if (!marca || marca === window.__tce_encaminhado) return;
+  window.__tce_encaminhado = marca;
+  try { localStorage.removeItem("tce_rascunho"); } catch (e) {}
+}
+"""
+
+# depois da retomada: guarda a chave (emitida pelo servidor na primeira
+# visita); os campos de data são ocultos, então o valor restaurado é
+# espelhado nos seletores visíveis; só então o salvamento automático começa
+JS_RETOMADO = f"""
+(token, nascimentoRepr, nascimento, inicio, termino) => {{
+  if (token) {{
+    try {{ localStorage.setItem("tce_rascunho_token", token); }} catch (e) {{}}
+    document.cookie = `tce_rascunho=${{token}}; path=/; max-age={int(rascunhos.RASCUNHO_TTL)}; SameSite=Lax`;
+  }}
+  const pares = {{
+    "input-nascimento-repr": nascimentoRepr, "input-nascimento": nascimento,
+    "input-inicio": inicio, "input-termino": termino,
+  }};
+  for (const [id, v] of Object.entries(pares)) {{
+    const el = document.getElementById(id);
+    if (el && v && el.value !== v) el.value = v;
+  }}
+  window.__tce_rascunho_pronto = true;
+}}
+"""
+
+
+
+# === Faixas de concorrência (filas separadas) ===
+# Cada faixa vira um concurrency_id do Gradio com o seu próprio limite de
+# workers; assim uma rajada de consultas lentas (ViaCEP/DNS) não bloqueia
+# os validadores locais nem o envio do termo.
+FAIXAS = {
+    "rede":   int(os.getenv("FAIXA_REDE", 8)),     # ViaCEP / DNS
+    "rapida": int(os.getenv("FAIXA_RAPIDA", 16)),  # validadores locais (CPU)
+    "envio":  int(os.getenv("FAIXA_ENVIO", 4)),    # processar_formulario (reservada)
+    "lote":   int(os.getenv("FAIXA_LOTE", 1)),     # importação em lote (longa: uma por vez)
+}
+
+_metricas_lock = threading.Lock()
+_METRICAS_FAIXAS = {
+    nome: {"chamadas": 0, "em_execucao": 0, "espera_total_s": 0.0, "espera_max_s": 0.0,
+           "execucao_total_s": 0.0, "execucao_max_s": 0.0}
+    for nome in FAIXAS
+}
+
+class CarimboDeChegada:
+    """
+    Middleware ASGI: anota em request.state a hora em que a requisição chegou.
+    O gr.Request de um evento é a requisição que o pôs na fila, então a
+    diferença até o handler começar é a espera na fila.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            scope.setdefault("state", {})["recebido_em"] = time.time()
+        await self.app(scope, receive, send)
+
+def _registrar_faixa(faixa: str, espera: float | None, dur: float):
+    with _metricas_lock:
+        m = _METRICAS_FAIXAS[faixa]
+        m["chamadas"] += 1
+        m["execucao_total_s"] += dur
+        m["execucao_max_s"] = max(m["execucao_max_s"], dur)
+        if espera is not None:
+            m["espera_total_s"] += espera
+            m["espera_max_s"] = max(m["espera_max_s"], espera)
+
+def _medir_faixa(faixa: str, fn):
+    """Envolve fn para registrar espera na fila e tempo de execução da faixa."""
+    @wraps(fn)
+    def medido(request: gr.Request, *args):
+        recebido_em = getattr(getattr(request, "state", None), "recebido_em", None)
+        espera = max(0.0, time.time() - recebido_em) if recebido_em else None
+        with _metricas_lock:
+            _METRICAS_FAIXAS[faixa]["em_execucao"] += 1
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            with _metricas_lock:
+                _METRICAS_FAIXAS[faixa]["em_execucao"] -= 1
+            _registrar_faixa(faixa, espera, time.perf_counter() - t0)
+    # o Gradio injeta o gr.Request lendo a assinatura: a do invólucro, não a de fn
+    medido.__signature__ = inspect.signature(medido, follow_wrapped=False)
+    medido.__annotations__ = {"request": gr.Request}
+    return medido
+
+def metricas_faixas() -> dict:
+    """Fotografia das faixas: limites, eventos em execução e médias de espera/execução."""
+    saida = {}
+    with _metricas_lock:
+        copia = {k: dict(v) for k, v in _METRICAS_FAIXAS.items()}
+    for nome, m in copia.items():
+        n = m["chamadas"] or 1
+        m["limite"] = FAIXAS[nome]
+        m["espera_media_s"] = m["espera_total_s"] / n
+        m["execucao_media_s"] = m["execucao_total_s"] / n
+        saida[nome] = m
+    return saida
+
+
+# === Política de eventos ===
+# Cada listener registrado via ligar_evento() recebe daqui o seu debounce,
+# trigger_mode e faixa (chave = nome da função).
+# Para mudar o comportamento de um evento, altere só esta tabela.
+#  - debounce (s): aplicado no navegador; só o último valor após a pausa
+#    chega ao servidor (os intermediários nem saem do cliente).
+#  - trigger_mode: "once" | "multiple" | "always_last" (None = padrão do Gradio)
+#  - faixa: vira concurrency_id; o concurrency_limit é o tamanho da faixa.
+POLITICA_PADRAO = {
+    "debounce": 0,
+    "trigger_mode": None,
+    "faixa": "rapida",
+}
+
+POLITICA_EVENTOS = {
+    # digitação (disparam a cada tecla): espera a pausa e processa só o último valor
+    "converter_valor":                  {"debounce": 0.4, "trigger_mode": "always_last"},
+    "calcular_total_dias":              {"debounce": 0.3, "trigger_mode": "always_last"},
+
+    # datas de nascimento: o seletor já confere no navegador e só sincroniza a
+    # data confirmada (estatico/tce.js), então não há rajada a segurar
+    "validar_nascimento_estudante":     {"trigger_mode": "always_last"},
+    "validar_nascimento_representante": {"trigger_mode": "always_last"},
+
+    # validadores de rede (ViaCEP/DNS): último valor vence, faixa de I/O
+    "validar_cep_com_api":    {"trigger_mode": "always_last", "faixa": "rede"},
+    "validar_cidade_uf_blur": {"trigger_mode": "always_last", "faixa": "rede"},
+    "validar_email_estrito":  {"trigger_mode": "always_last", "faixa": "rede"},
+
+    # envio do termo: ignora cliques repetidos enquanto o envio está pendente
+    "processar_formulario":   {"trigger_mode": "once", "faixa": "envio"},
+
+    # importação em lote: segura a faixa do começo ao fim, então tem a sua
+    # (na "envio" deixaria os estudantes esperando)
+    "importar_lote":          {"trigger_mode": "once", "faixa": "lote"},
+
+    # anexos: só o último estado da lista de arquivos importa
+    "anexar_documentos":      {"trigger_mode": "always_last"},
+
+    # rascunho: só a foto mais recente interessa
+    "salvar_rascunho":        {"trigger_mode": "always_last"},
+}
+
+def politica_evento(nome: str) -> dict:
+    return {**POLITICA_PADRAO, **POLITICA_EVENTOS.get(nome, {})}
+
+def _js_debounce(chave: str, segundos: float, n_inputs: int) -> str:
+    """
+    JS executado antes do backend: segura a chamada por `segundos`; se outra
+    chamada da mesma chave chegar nesse intervalo, a anterior nunca resolve
+    (e portanto nunca vai ao servidor).
+    """
+    ms = int(segundos * 1000)
+    return f"""
+    (...args) => {{
+      const w = (window.__tce_debounce = window.__tce_debounce || {{}});
+      const n = (w["{chave}"] = (w["{chave}"] || 0) + 1);
+      return new Promise((ok) => setTimeout(() => {{
+        if (w["{chave}"] === n) ok(args.slice(0, {n_inputs}));
+      }}, {ms}));
+    }}
+    """
+
+def ligar_evento(gatilho, fn, inputs, outputs, js=None):
+    """
+    Registra `fn` no listener `gatilho` (ex.: cep.blur) aplicando a política
+    de POLITICA_EVENTOS. Equivale a gatilho(fn, inputs=..., outputs=..., **política).
+    `js` é o pré-processamento próprio do evento no navegador (substitui o
+    debounce da política).
+    """
+    pol = politica_evento(fn.__name__)
+    lista_in = inputs if isinstance(inputs, (list, tuple)) else [inputs]
+    lista_out = outputs if isinstance(outputs, (list, tuple)) else [outputs]
+
+    extra = {}
+    if pol["debounce"]:
+        chave = fn.__name__ + ":" + ",".join(str(c._id) for c in lista_out)
+        extra["js"] = _js_debounce(chave, pol["debounce"], len(lista_in))
+    if js:
+        extra["js"] = js
+
+    faixa = pol["faixa"]
+    return gatilho(
+        _medir_faixa(faixa, fn),
+        inputs=inputs,
+        outputs=outputs,
+        trigger_mode=pol["trigger_mode"],
+        concurrency_limit=FAIXAS[faixa],
+        concurrency_id=faixa,
+        **extra,
+    )
+
+
+# === Arquivos estáticos (CSS/JS da página) ===
+# Um único CSS e um único JS, referenciados no <head> com a versão (hash do
+# conteúdo) na URL: o navegador guarda por um ano e só baixa de novo quando o
+# arquivo muda; o config do Blocks leva só as duas tags.
+ESTATICO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "estatico")
+ESTATICOS = {nome: os.path.join(ESTATICO_DIR, nome) for nome in ("tce.css", "tce.js")}
+
+def _versao_estaticos() -> str:
+    h = hashlib.sha256()
+    for caminho in ESTATICOS.values():
+        with open(caminho, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:12]
+
+ESTATICO_VERSAO = _versao_estaticos()
+CABECALHO_HTML = f"""
+<meta name="google" content="notranslate">
+<link rel="stylesheet" href="/estatico/{ESTATICO_VERSAO}/tce.css">
+<script src="/estatico/{ESTATICO_VERSAO}/tce.js" defer></script>
+"""
+
+
+with gr.Blocks(theme="default", head=CABECALHO_HTML) as demo:
     gr.Markdown("<h2 style='text-align: center;'>TERMO DE COMPROMISSO DE ESTÁGIO - TCE</h2>")
     
     gr.Markdown("(*) Preenchimento obrigatório")
@@ -1629,9 +1245,6 @@ with gr.Blocks(theme="default") as demo:
                 placeholder="Ex: 12.345.678/0001-99 ou 123.456.789-00"
             )
             
-    # valida ao sair do campo
-    cnpj.blur(validar_cnpj_cpf, inputs=cnpj, outputs=cnpj)
-
     # linha seguinte com largura total
     nome_fantasia = gr.Text(
         label="Nome Fantasia*",
@@ -1644,19 +1257,8 @@ with gr.Blocks(theme="default") as demo:
         cep = gr.Text(label="CEP (00000-000)*", placeholder="Ex: 12345-000")
         
     
-    UF_OPCOES = [
-        "AC","AL","AM","AP","BA","CE","DF","ES","GO","MA",
-        "MG","MS","MT","PA","PB","PE","PI","PR","RJ","RN",
-        "RO","RR","RS","SC","SE","SP","TO"
-    ]
-
     def validar_uf(valor: str):
-        if valor in UF_OPCOES:
-            # ok, remove borda vermelha
-            return gr.update(value=valor, elem_classes=[])
-        else:
-            gr.Warning("⚠️ UF inválida. Selecione uma das opções da lista.")
-            return gr.update(value=None, elem_classes=["erro"])
+        return _para_update(validacao.validar_uf(valor))
     
     with gr.Row():
         complemento = gr.Text(label="Complemento")
@@ -1670,29 +1272,29 @@ with gr.Blocks(theme="default") as demo:
             elem_classes=["notranslate"]
         )
     
-    uf.blur(validar_uf, inputs=uf, outputs=uf)  # 1º: valida a sigla
-    uf.blur(                                     # 2º: cruza com CEP/Cidade
-        validar_cidade_uf_blur,
+    ligar_evento(uf.blur, validar_uf, inputs=uf, outputs=uf)  # 1º: valida a sigla
+    ligar_evento(                                            # 2º: cruza com CEP/Cidade
+        uf.blur, validar_cidade_uf_blur,
         inputs=[cep, cidade, uf],
-        outputs=[cidade, uf]
+        outputs=[cidade, uf],
     )
-    cidade.blur(validar_cidade_uf_blur, inputs=[cep, cidade, uf], outputs=[cidade, uf])
+    ligar_evento(cidade.blur, validar_cidade_uf_blur, inputs=[cep, cidade, uf], outputs=[cidade, uf])
     
     # Concedente
     #cep.blur(validar_cep, inputs=cep, outputs=cep)
-    cep.blur(
-        validar_cep_com_api,
+    ligar_evento(
+        cep.blur, validar_cep_com_api,
         inputs=[cep, endereco, bairro, cidade, uf],
-        outputs=[cep, endereco, bairro, cidade, uf]
+        outputs=[cep, endereco, bairro, cidade, uf],
     )
     
     with gr.Row():
         email = gr.Textbox(label="E-mail*", placeholder="exemplo@dominio.com")
         telefone = gr.Text(label="Telefone (00) 00000-0000*", placeholder="Ex: (64) 91234-5678")
     
-    telefone.blur(validar_telefone, inputs=telefone, outputs=telefone)
+    ligar_evento(telefone.blur, validar_telefone, inputs=telefone, outputs=telefone)
     
-    email.blur(validar_email_estrito, inputs=email, outputs=email)
+    ligar_evento(email.blur, validar_email_estrito, inputs=email, outputs=email)
 
     with gr.Row():
         representante = gr.Text(label="Representante legal*")
@@ -1701,46 +1303,9 @@ with gr.Blocks(theme="default") as demo:
         # Representante
         gr.HTML("""
         <label for="input-nascimento-repr">Data de Nascimento do Representante (use o seletor abaixo)*</label><br>
-        <input type="date" id="input-nascimento-repr"
-          oninput="
-            (function(){
-              const src = document.getElementById('input-nascimento-repr');
-              const dst = document.querySelector('#nascimento_repr input, #nascimento_repr textarea');
-              if (!src || !dst) return;
-              let v = src.value; // browsers válidos emitem YYYY-MM-DD
-              // fallback: se o navegador permitir digitação em DD/MM/AAAA, converte:
-              if (!v) {
-                const raw = src.value || '';
-                const m = raw.match(/^(\\d{2})\\/(\\d{2})\\/(\\d{4})$/);
-                if (m) v = `${m[3]}-${m[2]}-${m[1]}`;
-              }
-              // copie mesmo se vazio, para permitir validação no backend
-              // if (!v) return;
-              if (dst.value !== v) {
-                dst.value = v;
-                dst.dispatchEvent(new Event('input', { bubbles:true }));
-              }
-            })();
-          "
-          onchange="
-            (function(){
-              const src = document.getElementById('input-nascimento-repr');
-              const dst = document.querySelector('#nascimento_repr input, #nascimento_repr textarea');
-              if (!src || !dst) return;
-              let v = src.value;
-              if (!v) {
-                const raw = src.value || '';
-                const m = raw.match(/^(\\d{2})\\/(\\d{2})\\/(\\d{4})$/);
-                if (m) v = `${m[3]}-${m[2]}-${m[1]}`;
-              }
-              if (!v) return;
-              if (dst.value !== v) {
-                dst.value = v;
-                dst.dispatchEvent(new Event('input', { bubbles:true }));
-              }
-            })();
-          "
-        >
+        <input type="date" id="input-nascimento-repr" data-destino="nascimento_repr" min="1900-01-01"
+          data-passado data-idade-min="18" data-msg-idade="⚠️ O Representante deve ter pelo menos 18 anos.">
+        <small class="tce-data-msg" aria-live="polite"></small>
         """)
 
         nascimento_repr = gr.Textbox(elem_id="nascimento_repr", visible=False)
@@ -1748,9 +1313,21 @@ with gr.Blocks(theme="default") as demo:
         cpf_repr = gr.Text(label="CPF (000.000.000-00)*", placeholder="Ex: 123.456.789-00")
                                      
     # Representante
-    nascimento_repr.change(fn=validar_nascimento_representante, inputs=nascimento_repr, outputs=nascimento_repr)
+    ligar_evento(nascimento_repr.change, validar_nascimento_representante, inputs=nascimento_repr, outputs=nascimento_repr)
 
-    cpf_repr.blur(validar_cpf, inputs=cpf_repr, outputs=cpf_repr)
+    ligar_evento(cpf_repr.blur, validar_cpf, inputs=cpf_repr, outputs=cpf_repr)
+
+    # valida o CNPJ/CPF ao sair do campo e, se a concedente já é conhecida,
+    # preenche os demais dados dela (mesma ordem de CAMPOS_CONCEDENTE)
+    campos_concedente = [
+        razao_social, nome_fantasia, endereco, bairro, cep, complemento,
+        cidade, uf,
+    ]
+    ligar_evento(
+        cnpj.blur, preencher_concedente,
+        inputs=[cnpj, *campos_concedente],
+        outputs=[cnpj, *campos_concedente],
+    )
     
     gr.Markdown("Do outro lado o(a) estudante,")
     
@@ -1763,46 +1340,8 @@ with gr.Blocks(theme="default") as demo:
         # Estudante
         gr.HTML("""
         <label for="input-nascimento">Data de Nascimento (use o seletor abaixo)*</label><br>
-        <input type="date" id="input-nascimento"
-          oninput="
-            (function(){
-              const src = document.getElementById('input-nascimento');
-              const dst = document.querySelector('#nascimento input, #nascimento textarea');
-              if (!src || !dst) return;
-              let v = src.value; // navegadores normalmente emitem YYYY-MM-DD
-              // fallback: se o usuário digitar DD/MM/AAAA, converte para ISO
-              if (!v) {
-                const raw = src.value || '';
-                const m = raw.match(/^(\\d{2})\\/(\\d{2})\\/(\\d{4})$/);
-                if (m) v = `${m[3]}-${m[2]}-${m[1]}`;
-              }
-              // copie mesmo se vazio, para permitir validação no backend
-              // if (!v) return;
-              if (dst.value !== v) {
-                dst.value = v;
-                dst.dispatchEvent(new Event('input', { bubbles:true }));
-              }
-            })();
-          "
-          onchange="
-            (function(){
-              const src = document.getElementById('input-nascimento');
-              const dst = document.querySelector('#nascimento input, #nascimento textarea');
-              if (!src || !dst) return;
-              let v = src.value;
-              if (!v) {
-                const raw = src.value || '';
-                const m = raw.match(/^(\\d{2})\\/(\\d{2})\\/(\\d{4})$/);
-                if (m) v = `${m[3]}-${m[2]}-${m[1]}`;
-              }
-              if (!v) return;
-              if (dst.value !== v) {
-                dst.value = v;
-                dst.dispatchEvent(new Event('input', { bubbles:true }));
-              }
-            })();
-          "
-        >
+        <input type="date" id="input-nascimento" data-destino="nascimento" min="1900-01-01" data-passado>
+        <small class="tce-data-msg" aria-live="polite"></small>
         """)
 
         nascimento = gr.Textbox(elem_id="nascimento", visible=False)
@@ -1822,30 +1361,26 @@ with gr.Blocks(theme="default") as demo:
         
     
     def validar_rg_ou_cin(valor: str, opcao_cin: str):
-        if (opcao_cin or "").strip().lower() == "sim":
-            return validar_cpf(valor)   # mesma UX do CPF
-        return validar_rg_front(valor)  # RG simples
+        # CIN: mesma UX do CPF; senão, RG simples
+        return _para_update(validacao.validar_rg_ou_cin(valor, opcao_cin))
 
     # Estudante
-    nascimento.change(fn=validar_nascimento_estudante, inputs=nascimento, outputs=nascimento)
+    ligar_evento(nascimento.change, validar_nascimento_estudante, inputs=nascimento, outputs=nascimento)
     
     # Quando sair do RG → valida conforme a escolha do Radio
-    rg.blur(
-        validar_rg_ou_cin,
+    ligar_evento(
+        rg.blur, validar_rg_ou_cin,
         inputs=[rg, possui_cin],
-        outputs=rg
+        outputs=rg,
     )
     
     # Opcional, mas recomendado: ao trocar Sim/Não, revalidar o que já está no campo
-    possui_cin.change(
-        validar_rg_ou_cin,
+    ligar_evento(
+        possui_cin.change, validar_rg_ou_cin,
         inputs=[rg, possui_cin],
-        outputs=rg
+        outputs=rg,
     )
 
-    # valida ao sair do campo (estudante) — reutiliza a MESMA função
-    cpf_estudante.blur(validar_cpf, inputs=cpf_estudante, outputs=cpf_estudante)
-    
     
     with gr.Row():
         endereco_estudante = gr.Text(label="Endereço*")
@@ -1864,48 +1399,39 @@ with gr.Blocks(theme="default") as demo:
             elem_classes=["notranslate"]
         )
     
-    uf_estudante.blur(validar_uf, inputs=uf_estudante, outputs=uf_estudante)
-    uf_estudante.blur(
-        validar_cidade_uf_blur,
+    ligar_evento(uf_estudante.blur, validar_uf, inputs=uf_estudante, outputs=uf_estudante)
+    ligar_evento(
+        uf_estudante.blur, validar_cidade_uf_blur,
         inputs=[cep_estudante, cidade_estudante, uf_estudante],
-        outputs=[cidade_estudante, uf_estudante]
+        outputs=[cidade_estudante, uf_estudante],
     )
 
     # Estudante
     #cep_estudante.blur(validar_cep, inputs=cep_estudante, outputs=cep_estudante)
-    cep_estudante.blur(
-        validar_cep_com_api,
+    ligar_evento(
+        cep_estudante.blur, validar_cep_com_api,
         inputs=[cep_estudante, endereco_estudante, bairro_estudante, cidade_estudante, uf_estudante],
-        outputs=[cep_estudante, endereco_estudante, bairro_estudante, cidade_estudante, uf_estudante]
+        outputs=[cep_estudante, endereco_estudante, bairro_estudante, cidade_estudante, uf_estudante],
     )
     
-    cidade_estudante.blur(validar_cidade_uf_blur, inputs=[cep_estudante, cidade_estudante, uf_estudante],\
-                          outputs=[cidade_estudante, uf_estudante])
+    ligar_evento(
+        cidade_estudante.blur, validar_cidade_uf_blur,
+        inputs=[cep_estudante, cidade_estudante, uf_estudante],
+        outputs=[cidade_estudante, uf_estudante],
+    )
     
     
     with gr.Row():
         email_estudante = gr.Textbox(label="E-mail do Estudante*", placeholder="exemplo@dominio.com")
         telefone_estudante = gr.Text(label="Telefone (00) 00000-0000)*", placeholder="Ex: (64) 91234-5678")
     
-    telefone_estudante.blur(validar_telefone, inputs=telefone_estudante, outputs=telefone_estudante)
+    ligar_evento(telefone_estudante.blur, validar_telefone, inputs=telefone_estudante, outputs=telefone_estudante)
     
-    email_estudante.blur(validar_email_estrito, inputs=email_estudante, outputs=email_estudante)
+    ligar_evento(email_estudante.blur, validar_email_estrito, inputs=email_estudante, outputs=email_estudante)
     
 
-    CURSO_OPCOES = [
-        "Bacharelado em Administração",
-        "Bacharelado em Zootecnia",
-        "Técnico em Agropecuária",
-        "Técnico em Administração",
-        "Técnico em Informática",
-    ]
-
     def validar_curso(valor: str):
-        if valor in CURSO_OPCOES:
-            return gr.update(value=valor, elem_classes=[])   # ok
-        else:
-            gr.Warning("⚠️ Curso inválido. Selecione uma opção da lista.")
-            return gr.update(value=None, elem_classes=["erro"])
+        return _para_update(validacao.validar_curso(valor))
 
 
     curso_estudante = gr.Dropdown(
@@ -1917,7 +1443,7 @@ with gr.Blocks(theme="default") as demo:
         elem_classes=["notranslate"]   # ver item 2
     )
 
-    curso_estudante.blur(validar_curso, inputs=curso_estudante, outputs=curso_estudante)
+    ligar_evento(curso_estudante.blur, validar_curso, inputs=curso_estudante, outputs=curso_estudante)
 
     with gr.Row():
         ano_periodo = gr.Dropdown(
@@ -1931,6 +1457,68 @@ with gr.Blocks(theme="default") as demo:
 
         matricula = gr.Text(label="Número de Matrícula*")
 
+    # Cadastro do campus (ESTUDANTES_CSV): matrícula e CPF do mesmo estudante,
+    # juntos, preenchem de uma vez nome, nascimento, curso e ano/período. Um
+    # só não basta (o formulário é aberto: seria consultar os dados de outra
+    # pessoa) e nada além do que o cadastro confere é devolvido.
+    # Só campos vazios são preenchidos; o que o estudante digitou fica.
+    def _preencher_estudante(matricula_val, cpf_val, atuais: dict) -> list:
+        est = ESTUDANTES.conferir(matricula_val, cpf_val)
+        if est is None:
+            return [gr.skip()] * len(atuais)
+        novos = {
+            "nome_estudante": est.nome,
+            "nascimento": est.nascimento,
+            "curso_estudante": est.curso if est.curso in CURSO_OPCOES else "",
+            "ano_periodo": est.ano_periodo if est.ano_periodo in [v for _, v in ano_periodo.choices] else "",
+        }
+        out, preencheu = [], False
+        for nome, atual in atuais.items():
+            novo = novos[nome]
+            if novo and not (atual or "").strip():
+                out.append(gr.update(value=novo, elem_classes=[]))
+                preencheu = True
+            else:
+                out.append(gr.skip())
+        if preencheu:
+            gr.Info("ℹ️ Dados do(a) estudante preenchidos a partir do cadastro do campus. Confira antes de enviar.")
+        return out
+
+    def preencher_estudante_por_matricula(matricula_val, cpf_val, nome_val, nasc_val, curso_val, ano_val):
+        return _preencher_estudante(matricula_val, cpf_val, {
+            "nome_estudante": nome_val, "nascimento": nasc_val,
+            "curso_estudante": curso_val, "ano_periodo": ano_val,
+        })
+
+    def preencher_estudante_por_cpf(cpf_val, matricula_val, nome_val, nasc_val, curso_val, ano_val):
+        # valida ao sair do campo (estudante) — reutiliza a MESMA função do CPF
+        upd_cpf = validar_cpf(cpf_val)
+        if upd_cpf.get("elem_classes") or not upd_cpf.get("value"):
+            return [upd_cpf] + [gr.skip()] * 4
+        return [upd_cpf] + _preencher_estudante(matricula_val, upd_cpf["value"], {
+            "nome_estudante": nome_val, "nascimento": nasc_val,
+            "curso_estudante": curso_val, "ano_periodo": ano_val,
+        })
+
+    # o campo `nascimento` é oculto: depois do preenchimento, espelha o valor
+    # no seletor de data visível
+    js_espelhar_nascimento = """
+    (v) => {
+      const el = document.getElementById('input-nascimento');
+      if (el && v && el.value !== v) el.value = v;
+    }
+    """
+    ligar_evento(
+        matricula.blur, preencher_estudante_por_matricula,
+        inputs=[matricula, cpf_estudante, nome_estudante, nascimento, curso_estudante, ano_periodo],
+        outputs=[nome_estudante, nascimento, curso_estudante, ano_periodo],
+    ).then(None, inputs=nascimento, js=js_espelhar_nascimento)
+    ligar_evento(
+        cpf_estudante.blur, preencher_estudante_por_cpf,
+        inputs=[cpf_estudante, matricula, nome_estudante, nascimento, curso_estudante, ano_periodo],
+        outputs=[cpf_estudante, nome_estudante, nascimento, curso_estudante, ano_periodo],
+    ).then(None, inputs=nascimento, js=js_espelhar_nascimento)
+
     orientador = gr.Text(label="Professor(a) orientador(a)*")
     
     # Use HTML inline dentro do Markdown só nos nomes próprios
@@ -1953,19 +1541,13 @@ with gr.Blocks(theme="default") as demo:
     with gr.Row():
         gr.HTML("""
         <label for="input-inicio">Data de Início (use o seletor abaixo)*</label><br>
-        <input type="date" id="input-inicio" onchange="
-            const txt = document.querySelector('#data_inicio textarea');
-            txt.value = this.value;
-            txt.dispatchEvent(new Event('input', { bubbles: true }));
-        ">
+        <input type="date" id="input-inicio" data-destino="data_inicio" min="1900-01-01">
+        <small class="tce-data-msg" aria-live="polite"></small>
         """)
         gr.HTML("""
         <label for="input-termino">Data de Término (use o seletor abaixo)*</label><br>
-        <input type="date" id="input-termino" onchange="
-            const txt = document.querySelector('#data_termino textarea');
-            txt.value = this.value;
-            txt.dispatchEvent(new Event('input', { bubbles: true }));
-        ">
+        <input type="date" id="input-termino" data-destino="data_termino" min="1900-01-01" data-apos="input-inicio">
+        <small class="tce-data-msg" aria-live="polite"></small>
         """)
         
          # Inputs ocultos
@@ -1997,25 +1579,25 @@ with gr.Blocks(theme="default") as demo:
         
     # Atualiza o total de dias automaticamente
     # sempre que qualquer uma das entradas mudar, recalcule
-    data_inicio.change(
-        fn=calcular_total_dias,
+    ligar_evento(
+        data_inicio.change, calcular_total_dias,
         inputs=[data_inicio, data_termino, contar_finais_semana, qtd_feriados],
-        outputs=total_dias
+        outputs=total_dias,
     )
-    data_termino.change(
-        fn=calcular_total_dias,
+    ligar_evento(
+        data_termino.change, calcular_total_dias,
         inputs=[data_inicio, data_termino, contar_finais_semana, qtd_feriados],
-        outputs=total_dias
+        outputs=total_dias,
     )
-    contar_finais_semana.change(
-        fn=calcular_total_dias,
+    ligar_evento(
+        contar_finais_semana.change, calcular_total_dias,
         inputs=[data_inicio, data_termino, contar_finais_semana, qtd_feriados],
-        outputs=total_dias
+        outputs=total_dias,
     )
-    qtd_feriados.change(
-        fn=calcular_total_dias,
+    ligar_evento(
+        qtd_feriados.change, calcular_total_dias,
         inputs=[data_inicio, data_termino, contar_finais_semana, qtd_feriados],
-        outputs=total_dias
+        outputs=total_dias,
     )
         
     gr.Markdown("""
@@ -2054,10 +1636,10 @@ with gr.Blocks(theme="default") as demo:
         )
     
     # valida quando perde o foco
-        horas_semana_estagio.blur(
-            validar_horas_semanais, 
-            inputs=horas_semana_estagio, 
-            outputs=horas_semana_estagio
+        ligar_evento(
+            horas_semana_estagio.blur, validar_horas_semanais,
+            inputs=horas_semana_estagio,
+            outputs=horas_semana_estagio,
         )
         
     gr.Markdown("""
@@ -2103,6 +1685,15 @@ with gr.Blocks(theme="default") as demo:
     with gr.Row():
         seguradora = gr.Text(label="Nome da Seguradora*", placeholder="Ex: MAPFRE Seguros")
         apolice = gr.Text(label="Nº da Apólice de Seguro*", placeholder="Ex: 1234567890123")
+
+    # Apólice e demais documentos (opcional): vão anexados ao e-mail do termo
+    anexos_arquivos = gr.File(
+        label=f"Apólice do seguro e outros documentos (opcional — PDF, JPG ou PNG, até {ANEXO_MAX_BYTES // (1024 * 1024)} MB cada)",
+        file_count="multiple", file_types=[".pdf", ".jpg", ".jpeg", ".png"], type="filepath",
+    )
+    anexos_spool = gr.State({})
+    ligar_evento(anexos_arquivos.change, anexar_documentos,
+                 inputs=[anexos_arquivos, anexos_spool], outputs=[anexos_spool, anexos_arquivos])
     
     gr.Markdown("""
         ### CLÁUSULA SÉTIMA – DOS BENEFÍCIOS  
@@ -2129,10 +1720,10 @@ with gr.Blocks(theme="default") as demo:
             return gr.update(value=None)
 
         # Conectar alteração do tipo ao campo modalidade
-        tipo_estagio.change(
-            fn=atualizar_modalidade,
+        ligar_evento(
+            tipo_estagio.change, atualizar_modalidade,
             inputs=[tipo_estagio],
-            outputs=[modalidade_estagio]
+            outputs=[modalidade_estagio],
         )
 
         remunerado = gr.Radio(
@@ -2151,10 +1742,10 @@ with gr.Blocks(theme="default") as demo:
             interactive=False
         )
         
-        valor_bolsa.change(
-            converter_valor, 
-            inputs=valor_bolsa, 
-            outputs=valor_extenso
+        ligar_evento(
+            valor_bolsa.change, converter_valor,
+            inputs=valor_bolsa,
+            outputs=valor_extenso,
         )
 
         auxilio_transporte = gr.Radio(
@@ -2211,10 +1802,10 @@ with gr.Blocks(theme="default") as demo:
         # garante que o espelho tenha a mesma string (ex.: "1,5")
         return gr.update(value=str(v))
 
-    horas_diarias.change(
-        sincronizar_horas_diarias,
+    ligar_evento(
+        horas_diarias.change, sincronizar_horas_diarias,
         inputs=horas_diarias,
-        outputs=horas_diarias_plano
+        outputs=horas_diarias_plano,
     )
 
     with gr.Row():
@@ -2230,10 +1821,10 @@ with gr.Blocks(theme="default") as demo:
             return gr.update(value=v)
 
         # Conexão entre os dois campos
-        horas_semana_estagio.change(
-            sincronizar_horas_semanais,
+        ligar_evento(
+            horas_semana_estagio.change, sincronizar_horas_semanais,
             inputs=horas_semana_estagio,
-            outputs=horas_semanais_plano
+            outputs=horas_semanais_plano,
         )
         
         # Campo espelhado (apenas exibe, sem edição)
@@ -2251,10 +1842,10 @@ with gr.Blocks(theme="default") as demo:
             return gr.update(value=v)
 
         # 4) Conexão entre os dois campos
-        total_horas_estagio.change(
-            sincronizar_total_horas,
+        ligar_evento(
+            total_horas_estagio.change, sincronizar_total_horas,
             inputs=total_horas_estagio,
-            outputs=total_horas_plano
+            outputs=total_horas_plano,
         )
         
         horario_atividades = gr.Text(label="Horário de realização das atividades*", placeholder="Ex: 13h às 17h30min")
@@ -2306,24 +1897,23 @@ with gr.Blocks(theme="default") as demo:
         return gr.update(value=txt)
     
     # quando horas_diarias mudar
-    horas_diarias.change(
-        fn=calcular_total_horas,
+    ligar_evento(
+        horas_diarias.change, calcular_total_horas,
         inputs=[horas_diarias, total_dias],
-        outputs=total_horas_estagio
+        outputs=total_horas_estagio,
     )
 
     # quando total_dias mudar (datas / finais de semana / feriados)
-    total_dias.change(
-        fn=calcular_total_horas,
+    ligar_evento(
+        total_dias.change, calcular_total_horas,
         inputs=[horas_diarias, total_dias],
-        outputs=total_horas_estagio
+        outputs=total_horas_estagio,
     )
 
     
-    # ==== ATIVIDADES DINÂMICAS (mín. 5, sem máximo prático) ====
-
-    MAX_ATIVIDADES = 30  # pode ajustar se quiser
-    MIN_ATIVIDADES = 5
+    # ==== ATIVIDADES DINÂMICAS (mín. 5, sem máximo) ====
+    # As caixas são criadas sob demanda por @gr.render: só existem no navegador
+    # as linhas visíveis, e o submit envia apenas elas.
 
     gr.Markdown("**As seguintes atividades serão desenvolvidas (mínimo de 5 atividades):**")
 
@@ -2333,50 +1923,53 @@ with gr.Blocks(theme="default") as demo:
 
     # Estado: quantas atividades estão visíveis agora
     ativ_count = gr.State(MIN_ATIVIDADES)
+
+    # Estado: campos que o último envio deixou em vermelho (para o diff do submit)
+    campos_em_erro = gr.State(set())
+
+    # Rascunho: chave da sessão e rascunho local (preenchidos no navegador),
+    # marca do último termo encaminhado (limpa o rascunho do navegador),
+    # atividades vindas da retomada e o relógio do salvamento automático
+    token_rascunho = gr.Textbox(visible=False)
+    rascunho_local = gr.Textbox(visible=False)
+    termo_encaminhado = gr.Textbox(visible=False)
+    atividades_restauradas = gr.State({"geracao": 0, "valores": []})
+    relogio_rascunho = gr.Timer(RASCUNHO_INTERVALO)
     
     def limpar_erro(valor):
         # sempre que o usuário alterar o campo, limpamos a classe 'erro'
         return gr.update(elem_classes=[])
 
-    # Pré-cria os campos (Atividade 1..N) e deixa só as 5 primeiras visíveis
-    atividades = []
-    for i in range(1, MAX_ATIVIDADES + 1):
-        atividades.append(
-            gr.Text(
+    @gr.render(inputs=[ativ_count, atividades_restauradas])
+    def renderizar_atividades(n, restauradas):
+        atividades = []
+        valores = restauradas["valores"]
+        for i in range(1, n + 1):
+            # key= preserva o texto já digitado quando a lista é re-renderizada;
+            # a geração muda na retomada, para o texto do rascunho prevalecer
+            comp = gr.Text(
                 label=f"Atividade {i}",
                 placeholder=f"Descreva a atividade {i}",
-                visible=(i <= MIN_ATIVIDADES)
+                value=valores[i - 1] if i <= len(valores) else "",
+                key=f"atividade-{restauradas['geracao']}-{i}",
             )
-        )
-    
-    # após o for que cria os componentes:
-    for comp in atividades:
-        # comp.change(limpar_erro, inputs=comp, outputs=comp)
-        # se preferir limpar no desfocar em vez de a cada mudança:
-        comp.blur(limpar_erro, inputs=comp, outputs=comp)
+            # limpa o vermelho ao desfocar (em vez de a cada mudança)
+            ligar_evento(comp.blur, limpar_erro, inputs=comp, outputs=comp)
+            atividades.append(comp)
 
+        # o submit e o rascunho dependem das caixas atuais, por isso são ligados aqui dentro
+        ligar_envio(atividades)
+        ligar_rascunho(atividades)
 
     def add_atividade(n):
-        # revela mais um até o máximo
-        if n < MAX_ATIVIDADES:
-            n += 1
-        updates = []
-        for i in range(MAX_ATIVIDADES):
-            # visível se índice < n
-            updates.append(gr.update(visible=(i < n)))
-        return [n, *updates]
+        return n + 1
 
     def rem_atividade(n):
-        # esconde a última, mas nunca abaixo do mínimo
-        if n > MIN_ATIVIDADES:
-            n -= 1
-        updates = []
-        for i in range(MAX_ATIVIDADES):
-            updates.append(gr.update(visible=(i < n)))
-        return [n, *updates]
+        # remove a última, mas nunca abaixo do mínimo
+        return n - 1 if n > MIN_ATIVIDADES else n
 
-    btn_add.click(add_atividade, inputs=ativ_count, outputs=[ativ_count, *atividades])
-    btn_rem.click(rem_atividade, inputs=ativ_count, outputs=[ativ_count, *atividades])
+    ligar_evento(btn_add.click, add_atividade, inputs=ativ_count, outputs=ativ_count)
+    ligar_evento(btn_rem.click, rem_atividade, inputs=ativ_count, outputs=ativ_count)
 
     
     gr.Markdown("""
@@ -2400,36 +1993,577 @@ with gr.Blocks(theme="default") as demo:
     with gr.Row():
         botao = gr.Button(value="Enviar Termo", variant="primary", elem_id="btn-enviar-termo")
     
-    botao.click(
-        fn=processar_formulario, 
-        inputs=[
-            tipo_estagio, razao_social, cnpj, nome_fantasia, endereco, bairro, cep, complemento, cidade, uf, 
-            email, telefone, representante, nascimento_repr, cpf_repr, nome_estudante, nascimento, cpf_estudante, rg, 
-            endereco_estudante, bairro_estudante, cep_estudante, complemento_estudante, cidade_estudante, uf_estudante,
-            email_estudante, telefone_estudante, curso_estudante, ano_periodo, matricula,
-            orientador, data_inicio, data_termino, total_dias, horas_diarias, horas_semana_estagio, total_horas_estagio,
-            seguradora, apolice, modalidade_estagio, remunerado, valor_bolsa, valor_extenso, auxilio_transporte,
-            especificacao_auxilio, contraprestacao, especificacao_contraprestacao, horas_diarias_plano, horas_semanais_plano,
-            total_horas_plano, horario_atividades,
-            *atividades,
-            nome_supervisor, formacao_supervisor, cargo_supervisor, registro_conselho
-        ],
-        outputs=[
-            tipo_estagio, razao_social, cnpj, nome_fantasia, endereco, bairro, cep, complemento, cidade, uf,
-            email, telefone, representante, nascimento_repr, cpf_repr, nome_estudante, nascimento, cpf_estudante, rg, 
-            endereco_estudante, bairro_estudante, cep_estudante, complemento_estudante, cidade_estudante, uf_estudante,
-            email_estudante, telefone_estudante, curso_estudante, ano_periodo, matricula,
-            orientador, data_inicio, data_termino, total_dias, horas_diarias, horas_semana_estagio, total_horas_estagio,
-            seguradora, apolice, modalidade_estagio, remunerado, valor_bolsa, valor_extenso, auxilio_transporte,
-            especificacao_auxilio, contraprestacao, especificacao_contraprestacao, horas_diarias_plano, horas_semanais_plano,
-            total_horas_plano, horario_atividades,
-            *atividades,
-            nome_supervisor, formacao_supervisor, cargo_supervisor, registro_conselho
-        ]
+    campos_fixos = [
+        tipo_estagio, razao_social, cnpj, nome_fantasia, endereco, bairro, cep, complemento, cidade, uf, 
+        email, telefone, representante, nascimento_repr, cpf_repr, nome_estudante, nascimento, cpf_estudante, rg, 
+        endereco_estudante, bairro_estudante, cep_estudante, complemento_estudante, cidade_estudante, uf_estudante,
+        email_estudante, telefone_estudante, curso_estudante, ano_periodo, matricula,
+        orientador, data_inicio, data_termino, total_dias, horas_diarias, horas_semana_estagio, total_horas_estagio,
+        seguradora, apolice, modalidade_estagio, remunerado, valor_bolsa, valor_extenso, auxilio_transporte,
+        especificacao_auxilio, contraprestacao, especificacao_contraprestacao, horas_diarias_plano, horas_semanais_plano,
+        total_horas_plano, horario_atividades,
+    ]
+    campos_finais = [nome_supervisor, formacao_supervisor, cargo_supervisor, registro_conselho]
+    campos_extras = [possui_cin, contar_finais_semana, qtd_feriados]  # NOMES_EXTRAS_RASCUNHO
+
+    def ligar_envio(atividades):
+        ligar_evento(
+            botao.click, processar_formulario,
+            inputs=[token_rascunho, campos_em_erro, anexos_spool, *campos_fixos, *atividades, *campos_finais],
+            outputs=[campos_em_erro, anexos_spool, anexos_arquivos, ativ_count, atividades_restauradas,
+                     termo_encaminhado, *campos_fixos, *atividades, *campos_finais],
+        ).then(None, inputs=termo_encaminhado, js=JS_ENCAMINHADO)
+
+    def ligar_rascunho(atividades):
+        ligar_evento(
+            relogio_rascunho.tick, salvar_rascunho,
+            inputs=[token_rascunho, campos_em_erro, *campos_extras, *campos_fixos, *atividades, *campos_finais],
+            outputs=None,
+            js=JS_SALVAR,
+        )
+
+    # retomada do rascunho ao abrir a página (um único update, sem blur)
+    ligar_evento(
+        demo.load, restaurar_rascunho,
+        inputs=[token_rascunho, rascunho_local],
+        outputs=[token_rascunho, campos_em_erro, ativ_count, atividades_restauradas,
+                 *campos_extras, *campos_fixos, *campos_finais],
+        js=JS_RETOMAR,
+    ).then(None, inputs=[token_rascunho, nascimento_repr, nascimento, data_inicio, data_termino],
+           js=JS_RETOMADO)
+
+
+# === Importação em lote (planilha CSV/XLSX) ===
+# Mesmas regras do formulário (validacao.py): validadores de campo (os do blur)
+# + validar_termo, chamados direto, sem passar pelos adaptadores do Gradio
+# (ver lote.py). A planilha é lida em blocos: os CEPs e domínios de e-mail de
+# cada bloco são resolvidos uma única vez (no processo principal) e entregues
+# já prontos aos processos de validação, que importam só lote.py, não o app.
+# Na tela, só a coordenação importa, e com limites de tamanho
+# (LOTE_MAX_LINHAS termos, LOTE_MAX_MB de arquivo); a linha de comando
+# (importacao.py) não tem limite.
+LOTE_PROCESSOS = int(os.getenv("LOTE_PROCESSOS", 0)) or min(4, os.cpu_count() or 1)
+LOTE_CONCORRENCIA_REDE = int(os.getenv("LOTE_CONCORRENCIA_REDE", 8))
+LOTE_MAX_LINHAS = int(os.getenv("LOTE_MAX_LINHAS", 1000))
+LOTE_MAX_MB = float(os.getenv("LOTE_MAX_MB", 5))
+
+def validar_linha_lote(n: int, registro: dict) -> dict:
+    """Valida uma linha no processo principal (API), com o cache do app."""
+    return lote.validar_linha(n, registro, viacep_lookup, _has_mx_or_a_or_parent, MUNICIPIOS)
+
+def _precisa_dns(dominio: str) -> bool:
+    """Domínio conhecido é aceito sem DNS (ver dominios.py)."""
+    return not dominio_conhecido(dominio)
+
+def _resolver_lote(linhas) -> tuple[dict, dict]:
+    """Consulta cada CEP e domínio distinto do lote uma única vez."""
+    ceps, dominios = set(), set()
+    for _, r in linhas:
+        for c in ("cep", "cep_estudante"):
+            if len(_cep8(r.get(c))) == 8:
+                ceps.add(_cep8(r.get(c)))
+        for c in ("email", "email_estudante"):
+            if "@" in (r.get(c) or ""):
+                d = r[c].rsplit("@", 1)[1].strip().lower()
+                if _precisa_dns(d):
+                    dominios.add(d)
+
+    with ThreadPoolExecutor(max_workers=LOTE_CONCORRENCIA_REDE) as ex:
+        list(ex.map(lambda c: _aquecer(viacep_lookup, c), ceps))
+        list(ex.map(lambda d: _aquecer(_has_mx_or_a_or_parent, d), dominios))
+
+    return (
+        {c: v for c in ceps if (v := _cache_get(c)) is not _FALTA},
+        {d: v for d in dominios if (v := CACHE.get("dns", d, _FALTA)) is not _FALTA},
     )
 
+def importar_planilha(caminho: str, enviar: bool = False, processos: int | None = None,
+                      max_linhas: int | None = None) -> list[dict]:
+    """
+    Valida todas as linhas da planilha (em paralelo) e, se `enviar`,
+    encaminha os termos válidos. Retorna um resultado por linha.
+    Com `max_linhas`, planilha maior é recusada (ValueError).
+    """
+    t0 = time.perf_counter()
+    linhas = ler_planilha(caminho)
+    if max_linhas:
+        linhas = limitar_linhas(linhas, max_linhas)
+    ceps, dominios = set(), set()
+
+    def preparar(bloco):
+        resolvidos = _resolver_lote(bloco)
+        ceps.update(resolvidos[0])
+        dominios.update(resolvidos[1])
+        return resolvidos
+
+    resultados = list(validar_em_lote(
+        linhas, lote.validar_linha_semeada,
+        preparar=preparar, semear=lote.semear,
+        processos=processos or LOTE_PROCESSOS,
+    ))
+    if enviar:
+        for r in resultados:
+            if r["ok"]:
+                situacao, msg = encaminhar_termo(r["dados"], r["atividades"])
+                r["situacao"] = {"enviado": "ENVIADO", "duplicado": "JÁ ENVIADO"}.get(situacao, "FALHA NO ENVIO")
+                if situacao == "falha":
+                    r["mensagens"].append(msg)
+    print(f"[LOTE] {len(resultados)} linhas, {len(ceps)} CEPs e {len(dominios)} domínios "
+          f"distintos em {time.perf_counter() - t0:.1f}s")
+    return resultados
+
+def _senha_coordenacao_ok(senha: str) -> bool:
+    return bool(COORDENACAO_SENHA) and hmac.compare_digest(
+        (senha or "").encode("utf-8"), COORDENACAO_SENHA.encode("utf-8")
+    )
+
+def importar_lote(senha, arquivo, enviar):
+    if not _senha_coordenacao_ok(senha):
+        gr.Warning("⚠️ Senha da coordenação incorreta.")
+        return gr.skip(), gr.skip()
+    if not arquivo:
+        gr.Warning("⚠️ Selecione a planilha (.csv ou .xlsx).")
+        return gr.skip(), gr.skip()
+    if os.path.getsize(arquivo) > LOTE_MAX_MB * 1024 * 1024:
+        gr.Warning(f"⚠️ A planilha passa de {LOTE_MAX_MB:g} MB; divida-a em partes menores.")
+        return gr.skip(), gr.skip()
+    try:
+        resultados = importar_planilha(arquivo, enviar=bool(enviar), max_linhas=LOTE_MAX_LINHAS)
+    except Exception as e:
+        print(f"[LOTE][ERRO] {type(e).__name__}: {e}")
+        gr.Warning(f"⚠️ Não foi possível ler a planilha: {e}")
+        return gr.skip(), gr.skip()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", prefix="relatorio_importacao_",
+                                     encoding="utf-8-sig", newline="", delete=False) as f:
+        f.write(relatorio_csv(resultados))
+    ok = sum(r["ok"] for r in resultados)
+    resumo = f"**{ok} de {len(resultados)}** linhas válidas."
+    if enviar:
+        enviados = sum(r.get("situacao") == "ENVIADO" for r in resultados)
+        resumo += f" {enviados} termo(s) encaminhado(s)."
+    if ok < len(resultados):
+        resumo += " Baixe o relatório para ver os erros de cada linha."
+    return resumo, f.name
+
+
+with demo.route("Importação em lote", "importacao"):
+    gr.Markdown("## Importação em lote de termos")
+    gr.Markdown(
+        "Envie uma planilha **.csv** ou **.xlsx** com um termo por linha. O cabeçalho usa os "
+        "nomes dos campos do formulário (ex.: `razao_social`, `cnpj`, `cep`, `nome_estudante`, "
+        "`data_inicio`...); as atividades vão em `atividade_1`, `atividade_2`... ou numa coluna "
+        "`atividades` separadas por `;`. Datas em DD/MM/AAAA ou AAAA-MM-DD. "
+        f"Até {LOTE_MAX_LINHAS} termos por planilha. Acesso restrito à coordenação."
+    )
+    with gr.Row():
+        arquivo_lote = gr.File(label="Planilha", file_types=[".csv", ".xlsx"], type="filepath")
+        with gr.Column():
+            senha_lote = gr.Textbox(label="Senha da coordenação", type="password")
+            enviar_lote = gr.Checkbox(label="Encaminhar os termos válidos ao setor responsável",
+                                      value=False)
+            botao_lote = gr.Button("Validar planilha", variant="primary")
+    resumo_lote = gr.Markdown()
+    relatorio_lote = gr.File(label="Relatório por linha (CSV)", interactive=False)
+
+    ligar_evento(
+        botao_lote.click, importar_lote,
+        inputs=[senha_lote, arquivo_lote, enviar_lote],
+        outputs=[resumo_lote, relatorio_lote],
+    )
+
+
+# === Coordenação: consulta dos termos enviados ===
+# Lê o histórico (historico.py) com filtros indexados e paginação por cursor;
+# os totais por curso vêm da tabela de contagem mantida na gravação.
+COORD_POR_PAGINA = int(os.getenv("COORD_POR_PAGINA", 50))
+STATUS_ROTULOS = {
+    "enviado": "Enviado",
+    "em_analise": "Em análise",
+    "formalizado": "Formalizado",
+    "devolvido": "Devolvido",
+}
+COLUNAS_COORD = ["Nº", "Enviado em", "Curso", "Estudante", "Concedente", "CNPJ/CPF", "Situação"]
+
+def _data_coord(valor: str, fim: bool = False) -> float | None:
+    """DD/MM/AAAA (ou AAAA-MM-DD) -> epoch do início do dia; `fim` = dia seguinte."""
+    v = (valor or "").strip()
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            d = datetime.strptime(v, fmt)
+        except ValueError:
+            continue
+        return (d + timedelta(days=1) if fim else d).timestamp()
+    if v:
+        raise ValueError(f"⚠️ Data inválida: '{v}'. Use DD/MM/AAAA.")
+    return None
+
+def _resumo_coordenacao() -> str:
+    contagem = HISTORICO.contagem_por_curso()
+    if not contagem:
+        return "Nenhum termo registrado."
+    linhas = ["| Curso | " + " | ".join(STATUS_ROTULOS[s] for s in STATUS) + " | Total |",
+              "|---" * (len(STATUS) + 2) + "|"]
+    for curso, por_status in contagem.items():
+        totais = [por_status.get(s, 0) for s in STATUS]
+        linhas.append(f"| {curso or '—'} | " + " | ".join(map(str, totais)) + f" | {sum(totais)} |")
+    return "\n".join(linhas)
+
+def _consultar_coordenacao(senha, curso, status, concedente, estudante, de, ate, pilha):
+    """Página do topo de `pilha` (cursores das páginas visitadas; None = primeira)."""
+    if not _senha_coordenacao_ok(senha):
+        gr.Warning("⚠️ Senha da coordenação incorreta.")
+        return gr.skip(), gr.skip(), gr.skip()
+    try:
+        periodo = {"de": _data_coord(de), "ate": _data_coord(ate, fim=True)}
+    except ValueError as e:
+        gr.Warning(str(e))
+        return gr.skip(), gr.skip(), gr.skip()
+
+    linhas, proximo = HISTORICO.buscar(
+        curso=curso or None, status=status or None,
+        concedente=concedente, estudante=estudante,
+        apos=pilha[-1], limite=COORD_POR_PAGINA, **periodo,
+    )
+    tabela = [
+        [t["id"], datetime.fromtimestamp(t["criado_em"]).strftime("%d/%m/%Y %H:%M"), t["curso"] or "",
+         t["nome_estudante"] or "", t["razao_social"] or "", t["cnpj"] or "",
+         STATUS_ROTULOS.get(t["status"], t["status"])]
+        for t in linhas
+    ]
+    resumo = _resumo_coordenacao() + f"\n\nPágina {len(pilha)}" + (" · há mais páginas" if proximo else "")
+    return tabela, resumo, {"pilha": pilha, "proximo": proximo}
+
+def buscar_termos(senha, curso, status, concedente, estudante, de, ate, estado):
+    return _consultar_coordenacao(senha, curso, status, concedente, estudante, de, ate, [None])
+
+def pagina_seguinte(senha, curso, status, concedente, estudante, de, ate, estado):
+    if not estado or not estado.get("proximo"):
+        return gr.skip(), gr.skip(), gr.skip()
+    return _consultar_coordenacao(senha, curso, status, concedente, estudante, de, ate,
+                                  [*estado["pilha"], estado["proximo"]])
+
+def pagina_anterior(senha, curso, status, concedente, estudante, de, ate, estado):
+    if not estado or len(estado["pilha"]) < 2:
+        return gr.skip(), gr.skip(), gr.skip()
+    return _consultar_coordenacao(senha, curso, status, concedente, estudante, de, ate,
+                                  estado["pilha"][:-1])
+
+def ver_termo(senha, termo_id):
+    if not _senha_coordenacao_ok(senha):
+        gr.Warning("⚠️ Senha da coordenação incorreta.")
+        return gr.skip()
+    dados = HISTORICO.termo(int(termo_id or 0))
+    if dados is None:
+        gr.Warning("⚠️ Termo não encontrado.")
+        return gr.skip()
+    return montar_corpo_email(dados, dados.get("atividades") or [])
+
+def mudar_situacao(senha, termo_id, novo_status, curso, status, concedente, estudante, de, ate, estado):
+    if not _senha_coordenacao_ok(senha):
+        gr.Warning("⚠️ Senha da coordenação incorreta.")
+        return gr.skip(), gr.skip(), gr.skip()
+    if not termo_id or novo_status not in STATUS:
+        gr.Warning("⚠️ Informe o nº do termo e a nova situação.")
+        return gr.skip(), gr.skip(), gr.skip()
+    if HISTORICO.atualizar_status(int(termo_id), novo_status):
+        gr.Info(f"Termo {int(termo_id)}: {STATUS_ROTULOS[novo_status]}.")
+    pilha = (estado or {}).get("pilha") or [None]
+    return _consultar_coordenacao(senha, curso, status, concedente, estudante, de, ate, pilha)
+
+
+with demo.route("Coordenação", "coordenacao"):
+    gr.Markdown("## Termos enviados")
+    senha_coord = gr.Textbox(label="Senha da coordenação", type="password")
+    with gr.Row():
+        filtro_curso = gr.Dropdown(label="Curso", choices=[("Todos", ""), *CURSO_OPCOES], value="")
+        filtro_status = gr.Dropdown(label="Situação", value="",
+                                    choices=[("Todas", ""), *((r, s) for s, r in STATUS_ROTULOS.items())])
+        filtro_concedente = gr.Textbox(label="Concedente (CNPJ/CPF ou início da razão social)")
+        filtro_estudante = gr.Textbox(label="Estudante (início do nome)")
+    with gr.Row():
+        filtro_de = gr.Textbox(label="Enviados de", placeholder="DD/MM/AAAA")
+        filtro_ate = gr.Textbox(label="até", placeholder="DD/MM/AAAA")
+    with gr.Row():
+        botao_buscar = gr.Button("Buscar", variant="primary")
+        botao_anterior = gr.Button("◀ Anterior")
+        botao_proxima = gr.Button("Próxima ▶")
+    resumo_coord = gr.Markdown()
+    tabela_coord = gr.Dataframe(headers=COLUNAS_COORD, interactive=False, wrap=True)
+    estado_coord = gr.State({"pilha": [None], "proximo": None})
+
+    with gr.Row():
+        termo_id = gr.Number(label="Nº do termo", precision=0)
+        novo_status = gr.Dropdown(label="Nova situação", choices=[(r, s) for s, r in STATUS_ROTULOS.items()])
+        botao_ver = gr.Button("Ver termo")
+        botao_status = gr.Button("Atualizar situação")
+    detalhe_termo = gr.Textbox(label="Termo", lines=12, interactive=False)
+
+    filtros = [filtro_curso, filtro_status, filtro_concedente, filtro_estudante, filtro_de, filtro_ate]
+    saidas = [tabela_coord, resumo_coord, estado_coord]
+    for gatilho, fn in ((botao_buscar.click, buscar_termos),
+                        (botao_proxima.click, pagina_seguinte),
+                        (botao_anterior.click, pagina_anterior)):
+        ligar_evento(gatilho, fn, inputs=[senha_coord, *filtros, estado_coord], outputs=saidas)
+    ligar_evento(botao_ver.click, ver_termo, inputs=[senha_coord, termo_id], outputs=detalhe_termo)
+    ligar_evento(botao_status.click, mudar_situacao,
+                 inputs=[senha_coord, termo_id, novo_status, *filtros, estado_coord], outputs=saidas)
+
+
+demo.queue(default_concurrency_limit=FAIXAS["rapida"])
+
+# === Aquecimento de caches na subida ===
+# Busca em segundo plano os CEPs e domínios de e-mail mais frequentes do
+# histórico (e de um arquivo-semente opcional) para que os primeiros acessos
+# já encontrem o cache quente.
+#   AQUECIMENTO=0 desliga; AQUECIMENTO_SEMENTE aponta um JSON
+#   {"ceps": [...], "dominios": [...]}; AQUECIMENTO_LIMITE e
+#   AQUECIMENTO_CONCORRENCIA limitam o volume e o paralelismo.
+AQUECIMENTO = os.getenv("AQUECIMENTO", "1") == "1"
+AQUECIMENTO_SEMENTE = os.getenv("AQUECIMENTO_SEMENTE")
+AQUECIMENTO_LIMITE = int(os.getenv("AQUECIMENTO_LIMITE", 300))
+AQUECIMENTO_CONCORRENCIA = int(os.getenv("AQUECIMENTO_CONCORRENCIA", 4))
+
+def _alvos_aquecimento() -> tuple[list[str], list[str]]:
+    ceps, dominios = [], []
+    if AQUECIMENTO_SEMENTE:
+        try:
+            with open(AQUECIMENTO_SEMENTE, encoding="utf-8") as f:
+                semente = json.load(f)
+            ceps += semente.get("ceps", [])
+            dominios += semente.get("dominios", [])
+        except (OSError, ValueError) as e:
+            print(f"[AQUECIMENTO][ERRO] semente: {type(e).__name__}: {e}")
+    try:
+        ceps += HISTORICO.ceps_frequentes(AQUECIMENTO_LIMITE)
+        dominios += HISTORICO.dominios_frequentes(AQUECIMENTO_LIMITE)
+    except Exception as e:
+        print(f"[AQUECIMENTO][ERRO] histórico: {type(e).__name__}: {e}")
+
+    # normaliza, remove repetidos (mantendo a ordem) e o que já está no cache
+    ceps = [c for c in dict.fromkeys(_cep8(c) for c in ceps)
+            if len(c) == 8 and _cache_get(c) is _FALTA]
+    dominios = [d for d in dict.fromkeys(str(d).strip().lower() for d in dominios)
+                if d and _precisa_dns(d) and CACHE.get("dns", d, _FALTA) is _FALTA]
+    return ceps[:AQUECIMENTO_LIMITE], dominios[:AQUECIMENTO_LIMITE]
+
+def _aquecer(fn, arg):
+    try:
+        fn(arg)
+    except Exception as e:
+        # não interrompe o aquecimento: o blur tenta de novo
+        print(f"[CACHE][AQUECIMENTO] {getattr(fn, '__name__', fn)}({arg}): {type(e).__name__}: {e}")
+
+def aquecer_caches():
+    t0 = time.perf_counter()
+    ceps, dominios = _alvos_aquecimento()
+    with ThreadPoolExecutor(max_workers=AQUECIMENTO_CONCORRENCIA) as ex:
+        list(ex.map(lambda c: _aquecer(viacep_lookup, c), ceps))
+        list(ex.map(lambda d: _aquecer(_has_mx_or_a_or_parent, d), dominios))
+    print(f"[AQUECIMENTO] {len(ceps)} CEPs e {len(dominios)} domínios em {time.perf_counter() - t0:.1f}s")
+
+# === Saúde (/healthz, /readyz) ===
+# As sondas rodam em segundo plano (sondas.py); as rotas só leem o resultado.
+def _sondar_smtp():
+    return RELAYS.sondar(SAUDE_TIMEOUT)
+
+def _sondar_cep():
+    return PROVEDORES_CEP.sondar(timeout=SAUDE_TIMEOUT)
+
+def _sondar_dns():
+    """Consulta o MX de um domínio conhecido em cada resolver, separadamente."""
+    partes, algum_ok = [], False
+    for servidor in DNS_SERVIDORES:
+        r = dns.resolver.Resolver(configure=False)
+        r.nameservers = [servidor]
+        r.lifetime = r.timeout = SAUDE_TIMEOUT
+        try:
+            r.resolve("gmail.com", "MX")
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer) as e:
+            algum_ok = True  # o resolver respondeu; é o que importa aqui
+            partes.append(f"{servidor}: ok ({type(e).__name__})")
+        except Exception as e:
+            partes.append(f"{servidor}: {type(e).__name__}")
+        else:
+            algum_ok = True
+            partes.append(f"{servidor}: ok")
+    return algum_ok, "; ".join(partes)
+
+MONITOR = Monitor({"smtp": _sondar_smtp, "cep": _sondar_cep, "dns": _sondar_dns})
+
+@asynccontextmanager
+async def ciclo_de_vida(_app):
+    # no modo multiprocesso o cache é compartilhado: basta o worker 0 aquecer
+    if AQUECIMENTO and os.getenv("WORKER_ID", "0") == "0":
+        threading.Thread(target=aquecer_caches, name="aquecimento", daemon=True).start()
+    MONITOR.iniciar()
+    yield
+    MONITOR.parar()
+
+
+# === API JSON (v1) ===
+# POST /api/v1/termos recebe um termo (objeto) ou vários (array), com as
+# mesmas chaves da planilha de importação, e responde em NDJSON: uma linha
+# "inicio", uma "resultado" por termo (na ordem, assim que fica pronto) e uma
+# "fim". As regras são as do formulário (validar_linha_lote); CEPs e domínios
+# do lote são consultados uma única vez pelo cache compartilhado e o envio
+# passa por encaminhar_termo (idempotência + histórico), limitado ao tamanho
+# da faixa "envio".
+#   Só valida, a menos que venha ?enviar=true. Sem API_TOKEN a API (e as
+#   rotas /metricas/*) fica desligada (404); com ele, exige
+#   "Authorization: Bearer <token>".
+#   API_MAX_TERMOS limita o array.
+API_TOKEN = os.getenv("API_TOKEN", "")
+API_MAX_TERMOS = int(os.getenv("API_MAX_TERMOS", 200))
+_API_ENVIO = threading.BoundedSemaphore(FAIXAS["envio"])
+
+def _api_autorizada(request: Request) -> bool:
+    if not API_TOKEN:
+        return False  # nunca aberta: sem token configurado, ninguém entra
+    tipo, _, token = request.headers.get("authorization", "").partition(" ")
+    return tipo.lower() == "bearer" and hmac.compare_digest(
+        token.strip().encode("utf-8"), API_TOKEN.encode("utf-8")
+    )
+
+def _exigir_token(request: Request):
+    """404 sem API_TOKEN configurado; 401 sem o Bearer certo."""
+    if not API_TOKEN:
+        raise HTTPException(status_code=404, detail="API desativada (defina API_TOKEN).")
+    if not _api_autorizada(request):
+        raise HTTPException(status_code=401, detail="Token inválido ou ausente.")
+
+def _ndjson(obj: dict) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+def processar_termos_api(documentos: list, enviar: bool):
+    """Valida (e envia) os termos, gerando as linhas NDJSON da resposta."""
+    t0 = time.perf_counter()
+    yield _ndjson({"evento": "inicio", "total": len(documentos)})
+
+    linhas, invalidos = [], {}
+    for i, doc in enumerate(documentos):
+        if isinstance(doc, dict):
+            linhas.append((i, registro_de_json(doc)))
+        else:
+            invalidos[i] = "⚠️ Cada termo deve ser um objeto JSON."
+    _resolver_lote(linhas)   # aquece o cache: um acesso por CEP/domínio distinto
+
+    registros = dict(linhas)
+    validos = enviados = 0
+    for i in range(len(documentos)):
+        if i in invalidos:
+            r = {"linha": i, "ok": False, "campos": [], "mensagens": [invalidos[i]]}
+        else:
+            try:
+                r = validar_linha_lote(i, registros[i])
+            except Exception as e:
+                print(f"[API][ERRO] {type(e).__name__}: {e}")
+                r = {"linha": i, "ok": False, "campos": [],
+                     "mensagens": ["⚠️ Erro interno ao validar o termo."]}
+        situacao = "invalido"
+        if r["ok"]:
+            validos += 1
+            situacao = "validado"
+            if enviar:
+                t0 = time.perf_counter()
+                with _API_ENVIO:
+                    t1 = time.perf_counter()
+                    situacao, msg = encaminhar_termo(r["dados"], r["atividades"])
+                _registrar_faixa("envio", t1 - t0, time.perf_counter() - t1)
+                if situacao == "enviado":
+                    enviados += 1
+                elif situacao == "falha":
+                    r["mensagens"].append("⚠️ Não foi possível encaminhar o termo. Tente novamente.")
+        yield _ndjson({
+            "evento": "resultado",
+            "indice": i,
+            "ok": r["ok"],
+            "situacao": situacao,
+            "campos": r["campos"],
+            "mensagens": r["mensagens"],
+        })
+
+    yield _ndjson({
+        "evento": "fim",
+        "total": len(documentos),
+        "validos": validos,
+        "enviados": enviados,
+        "duracao_s": round(time.perf_counter() - t0, 3),
+    })
+
+
+# App FastAPI que hospeda o Blocks e as rotas auxiliares
+app = FastAPI(lifespan=ciclo_de_vida)
+app.add_middleware(CarimboDeChegada)
+
+@app.get("/healthz")
+def rota_healthz():
+    # vivacidade: o processo responde; não depende de nada externo
+    return {"situacao": "ok"}
+
+@app.get("/readyz")
+def rota_readyz():
+    pronta, corpo = MONITOR.prontidao()
+    return JSONResponse(corpo, status_code=200 if pronta else 503)
+
+@app.get("/estatico/{versao}/{nome}")
+def rota_estatico(versao: str, nome: str):
+    caminho = ESTATICOS.get(nome)
+    if caminho is None:
+        raise HTTPException(status_code=404)
+    # URL com a versão atual é imutável; versão antiga (página em cache) é
+    # servida com o conteúdo novo, mas sem cache longo
+    cache = "public, max-age=31536000, immutable" if versao == ESTATICO_VERSAO else "no-cache"
+    return FileResponse(caminho, headers={"Cache-Control": cache})
+
+# métricas: mesma proteção da API (expõem relays, erros e volume de uso)
+@app.get("/metricas/faixas")
+def rota_metricas_faixas(request: Request):
+    _exigir_token(request)
+    return metricas_faixas()
+
+@app.get("/metricas/relays")
+def rota_metricas_relays(request: Request):
+    _exigir_token(request)
+    return RELAYS.estado()
+
+@app.get("/metricas/disjuntores")
+def rota_metricas_disjuntores(request: Request):
+    _exigir_token(request)
+    return [*(p.disjuntor.estado() for p in PROVEDORES_CEP.provedores), DISJUNTOR_DNS.estado()]
+
+@app.get("/metricas/cep")
+def rota_metricas_cep(request: Request):
+    _exigir_token(request)
+    return PROVEDORES_CEP.estado()
+
+@app.post("/api/v1/termos")
+async def rota_api_termos(request: Request, enviar: bool = False):
+    _exigir_token(request)
+    try:
+        corpo = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Corpo deve ser JSON (objeto ou array de objetos).")
+    documentos = corpo if isinstance(corpo, list) else [corpo]
+    if not documentos:
+        raise HTTPException(status_code=400, detail="Nenhum termo enviado.")
+    if len(documentos) > API_MAX_TERMOS:
+        raise HTTPException(status_code=413, detail=f"No máximo {API_MAX_TERMOS} termos por requisição.")
+    return StreamingResponse(processar_termos_api(documentos, enviar),
+                             media_type="application/x-ndjson")
+
+# teto do upload no servidor (o Gradio recusa antes de gravar tudo em disco);
+# os limites por anexo/termo ficam em anexos.py
+UPLOAD_MAX_MB = int(os.getenv("UPLOAD_MAX_MB", 50))
+app = gr.mount_gradio_app(app, demo, path="", max_file_size=f"{UPLOAD_MAX_MB}mb")
+
 
-import os
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 7860))
-    demo.queue().launch(server_name="0.0.0.0", server_port=port)
+    workers = int(os.environ.get("WORKERS", 1))
+    if workers > 1:
+        # N processos atrás de um proxy local com afinidade de sessão (balanceador.py)
+        from balanceador import servir_multiprocesso
+        servir_multiprocesso("app:app", workers, host="0.0.0.0", port=port)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
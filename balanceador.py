@@ -0,0 +1,159 @@
+"""
+Modo multiprocesso: N workers uvicorn + proxy reverso local com afinidade.
+
+A fila e o gr.State do Gradio vivem na memória de cada processo, então todas
+as requisições de uma mesma sessão precisam cair no mesmo worker. O proxy
+escolhe o worker por, nesta ordem:
+  1. cookie "tce_worker" (gravado na primeira resposta ao navegador);
+  2. session_hash (query string ou corpo JSON) — clientes sem cookie;
+  3. rodízio, para requisições sem sessão.
+
+Caches e chaves de idempotência vão para um SQLite compartilhado (ver cache.py),
+indicado aos workers pela variável TCE_CACHE_DB.
+"""
+import hashlib
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+COOKIE_WORKER = "tce_worker"
+
+# cabeçalhos hop-by-hop que não devem ser repassados
+_HOP_BY_HOP = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade", "content-length", "host",
+}
+
+
+def _indice_por_chave(chave: str, n: int) -> int:
+    return int.from_bytes(hashlib.blake2b(chave.encode(), digest_size=8).digest(), "big") % n
+
+
+def criar_proxy(destinos: list[str]) -> Starlette:
+    """App ASGI que repassa tudo para `destinos` mantendo a afinidade por sessão."""
+    cliente = httpx.AsyncClient(timeout=httpx.Timeout(None, connect=5.0))
+    rodizio = itertools.cycle(range(len(destinos)))
+
+    def escolher(request: Request, corpo: bytes) -> tuple[int, bool]:
+        """Retorna (índice do worker, precisa gravar cookie?)."""
+        cookie = request.cookies.get(COOKIE_WORKER, "")
+        if cookie.isdigit() and int(cookie) < len(destinos):
+            return int(cookie), False
+
+        sessao = request.query_params.get("session_hash")
+        if not sessao and corpo[:1] == b"{":
+            try:
+                sessao = json.loads(corpo).get("session_hash")
+            except (ValueError, AttributeError):
+                sessao = None
+        if sessao:
+            return _indice_por_chave(str(sessao), len(destinos)), False
+
+        return next(rodizio), True
+
+    async def encaminhar(request: Request):
+        corpo = await request.body()
+        idx, gravar_cookie = escolher(request, corpo)
+
+        url = destinos[idx] + request.url.path
+        if request.url.query:
+            url += "?" + request.url.query
+        headers = [(k, v) for k, v in request.headers.items() if k.lower() not in _HOP_BY_HOP]
+        headers += [
+            ("x-forwarded-for", request.client.host if request.client else ""),
+            ("x-forwarded-host", request.headers.get("host", "")),
+            ("x-forwarded-proto", request.url.scheme),
+        ]
+
+        try:
+            resp = await cliente.send(
+                cliente.build_request(request.method, url, headers=headers, content=corpo),
+                stream=True,
+            )
+        except httpx.TransportError as e:
+            return PlainTextResponse(f"worker {idx} indisponível: {type(e).__name__}", status_code=502)
+
+        # respostas em streaming (SSE da fila do Gradio) passam sem buffer
+        saida = StreamingResponse(
+            resp.aiter_raw(),
+            status_code=resp.status_code,
+            headers={k: v for k, v in resp.headers.items() if k.lower() not in _HOP_BY_HOP},
+            background=BackgroundTask(resp.aclose),
+        )
+        if gravar_cookie:
+            saida.set_cookie(COOKIE_WORKER, str(idx), httponly=True, samesite="lax")
+        return saida
+
+    @asynccontextmanager
+    async def ciclo_de_vida(_app):
+        yield
+        await cliente.aclose()
+
+    metodos = ["GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"]
+    return Starlette(
+        routes=[Route("/{caminho:path}", encaminhar, methods=metodos)],
+        lifespan=ciclo_de_vida,
+    )
+
+
+def _aguardar_porta(host: str, porta: int, limite: float = 90.0) -> bool:
+    fim = time.time() + limite
+    while time.time() < fim:
+        try:
+            with socket.create_connection((host, porta), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.3)
+    return False
+
+
+def servir_multiprocesso(app_ref: str, workers: int, host: str, port: int):
+    """
+    Sobe `workers` processos uvicorn (app_ref, ex.: "app:app") em portas
+    locais consecutivas a partir de WORKER_PORTA_BASE e serve o proxy em host:port.
+    """
+    porta_base = int(os.getenv("WORKER_PORTA_BASE", port + 1))
+    env = dict(os.environ)
+    env.setdefault("TCE_CACHE_DB", os.path.abspath(os.getenv("CACHE_DB", ".tce_cache.sqlite")))
+
+    processos = []
+    destinos = []
+    try:
+        for i in range(workers):
+            porta = porta_base + i
+            env_worker = {**env, "WORKER_ID": str(i)}
+            processos.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", app_ref,
+                 "--host", "127.0.0.1", "--port", str(porta), "--no-access-log"],
+                env=env_worker,
+            ))
+            destinos.append(f"http://127.0.0.1:{porta}")
+
+        for d, p in zip(destinos, processos):
+            porta = int(d.rsplit(":", 1)[1])
+            if not _aguardar_porta("127.0.0.1", porta):
+                raise RuntimeError(f"worker na porta {porta} não subiu (exit={p.poll()})")
+
+        print(f"[BALANCEADOR] {workers} workers prontos; proxy em {host}:{port}")
+        uvicorn.run(criar_proxy(destinos), host=host, port=port, access_log=False)
+    finally:
+        for p in processos:
+            p.terminate()
+        for p in processos:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
@@ -0,0 +1,224 @@
+"""
+Cache chave/valor com TTL usado pelo app (CEP, DNS, idempotência de envio).
+
+Backends (interface CacheBackend):
+- CacheMemoria: dicionário do próprio processo; opcionalmente grava um
+                snapshot JSON ao desligar e o recarrega ao subir (sem os
+                namespaces de NS_SO_MEMORIA).
+- CacheSQLite:  arquivo SQLite em modo WAL, persistente e compartilhado por
+                todos os workers da mesma máquina.
+
+As chaves são separadas por namespace ("cep", "dns", "envio", ...). Os valores
+precisam ser serializáveis em JSON.
+
+Configuração (variáveis de ambiente, lidas por abrir_cache):
+- CACHE_BACKEND:  "memoria" | "sqlite" (padrão: sqlite se TCE_CACHE_DB existir)
+- TCE_CACHE_DB / CACHE_DB: arquivo do SQLite
+- CACHE_SNAPSHOT: arquivo do snapshot do backend em memória ("" desliga)
+Caminhos relativos (e os padrões) ficam na pasta deste módulo, não no
+diretório de onde o processo foi iniciado.
+"""
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+
+# dados pessoais em claro (rascunhos do formulário): não vão para o snapshot
+NS_SO_MEMORIA = {"rascunho"}
+
+
+class CacheBackend(ABC):
+    """Interface comum dos backends de cache (backend incompleto nem instancia)."""
+
+    @abstractmethod
+    def get(self, ns: str, chave: str, padrao=None):
+        ...
+
+    @abstractmethod
+    def set(self, ns: str, chave: str, valor, ttl: float):
+        ...
+
+    @abstractmethod
+    def reservar(self, ns: str, chave: str, ttl: float) -> bool:
+        """Grava a chave só se ainda não existir (válida). True = reservou agora."""
+
+    @abstractmethod
+    def liberar(self, ns: str, chave: str):
+        ...
+
+    def carregar(self):
+        """Restaura o estado persistido (chamado ao subir)."""
+
+    def salvar(self):
+        """Persiste o estado atual (chamado ao desligar)."""
+
+    def fechar(self):
+        self.salvar()
+
+
+class CacheMemoria(CacheBackend):
+    """Cache em memória, por processo, com snapshot opcional em arquivo."""
+
+    def __init__(self, snapshot: str | None = None):
+        self._dados = {}  # (ns, chave) -> (expira_em, valor)
+        self._lock = threading.Lock()
+        self.snapshot = snapshot
+        if snapshot:
+            self.carregar()
+
+    # _get/_set supõem o lock já tomado (reservar usa os dois de uma vez)
+    def _get(self, ns: str, chave: str, padrao):
+        hit = self._dados.get((ns, chave))
+        if hit is None:
+            return padrao
+        expira_em, valor = hit
+        if time.time() > expira_em:
+            self._dados.pop((ns, chave), None)
+            return padrao
+        return valor
+
+    def _set(self, ns: str, chave: str, valor, ttl: float):
+        self._dados[(ns, chave)] = (time.time() + ttl, valor)
+
+    def get(self, ns: str, chave: str, padrao=None):
+        with self._lock:
+            return self._get(ns, chave, padrao)
+
+    def set(self, ns: str, chave: str, valor, ttl: float):
+        with self._lock:
+            self._set(ns, chave, valor, ttl)
+
+    def reservar(self, ns: str, chave: str, ttl: float) -> bool:
+        """Grava a chave só se ainda não existir (válida). True = reservou agora."""
+        with self._lock:
+            falta = object()
+            if self._get(ns, chave, falta) is not falta:
+                return False
+            self._set(ns, chave, True, ttl)
+            return True
+
+    def liberar(self, ns: str, chave: str):
+        with self._lock:
+            self._dados.pop((ns, chave), None)
+
+    def carregar(self):
+        try:
+            with open(self.snapshot, encoding="utf-8") as f:
+                itens = json.load(f)
+        except (OSError, ValueError):
+            return
+        agora = time.time()
+        with self._lock:
+            for ns, chave, expira_em, valor in itens:
+                if expira_em > agora:
+                    self._dados[(ns, chave)] = (expira_em, valor)
+
+    def salvar(self):
+        if not self.snapshot:
+            return
+        agora = time.time()
+        with self._lock:
+            itens = [[ns, chave, exp, valor]
+                     for (ns, chave), (exp, valor) in list(self._dados.items())
+                     if exp > agora and ns not in NS_SO_MEMORIA]
+        # grava em arquivo temporário e troca atomicamente
+        tmp = f"{self.snapshot}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(itens, f, ensure_ascii=False)
+        os.replace(tmp, self.snapshot)
+
+
+class CacheSQLite(CacheBackend):
+    """Cache em arquivo SQLite (WAL): leitores não bloqueiam o escritor."""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._local = threading.local()
+        self._conn().executescript("""
+            CREATE TABLE IF NOT EXISTS cache (
+                ns TEXT NOT NULL,
+                chave TEXT NOT NULL,
+                expira_em REAL NOT NULL,
+                valor TEXT NOT NULL,
+                PRIMARY KEY (ns, chave)
+            ) WITHOUT ROWID;
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        # uma conexão por thread (e por processo: o pid protege contra fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.caminho, timeout=5, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, ns: str, chave: str, padrao=None):
+        row = self._conn().execute(
+            "SELECT valor FROM cache WHERE ns = ? AND chave = ? AND expira_em >= ?",
+            (ns, chave, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else padrao
+
+    def set(self, ns: str, chave: str, valor, ttl: float):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (ns, chave, expira_em, valor) VALUES (?, ?, ?, ?)",
+            (ns, chave, time.time() + ttl, json.dumps(valor)),
+        )
+
+    def reservar(self, ns: str, chave: str, ttl: float) -> bool:
+        agora = time.time()
+        conn = self._conn()
+        # o UPSERT só sobrescreve entradas vencidas; rowcount diz se gravou
+        cur = conn.execute(
+            """
+            INSERT INTO cache (ns, chave, expira_em, valor) VALUES (?, ?, ?, 'true')
+            ON CONFLICT (ns, chave) DO UPDATE
+                SET expira_em = excluded.expira_em, valor = excluded.valor
+                WHERE cache.expira_em < ?
+            """,
+            (ns, chave, agora + ttl, agora),
+        )
+        return cur.rowcount == 1
+
+    def liberar(self, ns: str, chave: str):
+        self._conn().execute("DELETE FROM cache WHERE ns = ? AND chave = ?", (ns, chave))
+
+    def salvar(self):
+        # os dados já estão no disco: só descarta vencidos e consolida o WAL
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE expira_em < ?", (time.time(),))
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+_PASTA = os.path.dirname(os.path.abspath(__file__))
+
+
+def _caminho(nome: str) -> str:
+    return os.path.join(_PASTA, nome)   # nome absoluto é mantido pelo join
+
+
+def abrir_cache() -> CacheBackend:
+    """
+    Abre o backend configurado pelo ambiente e registra o salvamento no
+    desligamento do processo.
+    """
+    caminho = os.getenv("TCE_CACHE_DB") or os.getenv("CACHE_DB")
+    backend = os.getenv("CACHE_BACKEND") or ("sqlite" if os.getenv("TCE_CACHE_DB") else "memoria")
+
+    if backend == "sqlite":
+        cache = CacheSQLite(_caminho(caminho or ".tce_cache.sqlite"))
+    elif backend == "memoria":
+        snapshot = os.getenv("CACHE_SNAPSHOT", ".tce_cache.snapshot.json")
+        cache = CacheMemoria(snapshot=_caminho(snapshot) if snapshot else None)
+    else:
+        raise ValueError(f"CACHE_BACKEND desconhecido: {backend!r}")
+
+    atexit.register(cache.fechar)
+    return cache
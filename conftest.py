@@ -0,0 +1 @@
+"""Raiz dos testes: os módulos do app ficam na raiz do repositório (importáveis pelo pytest)."""
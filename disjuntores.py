@@ -0,0 +1,129 @@
+"""
+Disjuntores (circuit breakers) para os serviços externos: ViaCEP e DNS.
+
+Estados:
+- fechado:     chamadas passam; FALHAS seguidas abrem o disjuntor;
+- aberto:      chamadas são recusadas na hora (sem esperar o timeout), e o
+               chamador cai direto no "não foi possível validar agora";
+- meio_aberto: passado o tempo de espera, até SONDAS chamadas vão ao serviço
+               como sonda; sucesso fecha, falha reabre (com espera dobrada,
+               até ABERTO_MAX_S).
+
+Configuração:
+- DISJUNTOR_FALHAS:       falhas seguidas que abrem (padrão 5)
+- DISJUNTOR_ABERTO_S:     espera antes da primeira sonda (padrão 30)
+- DISJUNTOR_ABERTO_MAX_S: teto da espera após sondas que falham (padrão 300)
+- DISJUNTOR_SONDAS:       sondas simultâneas no meio_aberto (padrão 1)
+O estado é por processo: com WORKERS > 1 cada worker abre o seu.
+"""
+import os
+import threading
+import time
+
+FECHADO, ABERTO, MEIO_ABERTO = "fechado", "aberto", "meio_aberto"
+
+
+class CircuitoAberto(Exception):
+    """Chamada recusada: o disjuntor do serviço está aberto."""
+
+
+class Disjuntor:
+    def __init__(self, nome: str, falhas: int = 5, aberto_s: float = 30.0,
+                 aberto_max_s: float = 300.0, sondas: int = 1):
+        self.nome = nome
+        self.limite_falhas = max(int(falhas), 1)
+        self.aberto_s = aberto_s
+        self.aberto_max_s = max(aberto_max_s, aberto_s)
+        self.max_sondas = max(int(sondas), 1)
+        self._lock = threading.Lock()
+        self.situacao = FECHADO
+        self.falhas_seguidas = 0
+        self._espera = aberto_s
+        self._reabre_em = 0.0
+        self._sondas = 0
+        self._sonda_desde = 0.0
+        # métricas
+        self.chamadas = self.falhas = self.recusadas = self.aberturas = 0
+        self.ultimo_erro = ""
+
+    def _mudar(self, nova: str):
+        if nova != self.situacao:
+            print(f"[DISJUNTOR] {self.nome}: {self.situacao} -> {nova}")
+            self.situacao = nova
+
+    def _abrir(self, agora: float):
+        self._reabre_em = agora + self._espera
+        self.aberturas += 1
+        self._sondas = 0
+        self._mudar(ABERTO)
+
+    def permitir(self) -> bool:
+        """
+        True = pode chamar o serviço (e depois informar sucesso()/falha()).
+        False = disjuntor aberto: falhe na hora.
+        """
+        agora = time.monotonic()
+        with self._lock:
+            if self.situacao == ABERTO and agora >= self._reabre_em:
+                self._mudar(MEIO_ABERTO)
+            if self.situacao == MEIO_ABERTO:
+                # sonda que nunca informou o resultado não segura o disjuntor
+                if self._sondas and agora - self._sonda_desde > self._espera:
+                    self._sondas = 0
+                if self._sondas >= self.max_sondas:
+                    self.recusadas += 1
+                    return False
+                self._sondas += 1
+                self._sonda_desde = agora
+            elif self.situacao == ABERTO:
+                self.recusadas += 1
+                return False
+            self.chamadas += 1
+            return True
+
+    def sucesso(self):
+        with self._lock:
+            self.falhas_seguidas = 0
+            if self.situacao != FECHADO:
+                self._espera = self.aberto_s
+                self._sondas = 0
+                self._mudar(FECHADO)
+
+    def falha(self, erro: str = ""):
+        agora = time.monotonic()
+        with self._lock:
+            self.falhas += 1
+            self.falhas_seguidas += 1
+            self.ultimo_erro = erro
+            if self.situacao == MEIO_ABERTO:
+                self._espera = min(self._espera * 2, self.aberto_max_s)
+                self._abrir(agora)
+            elif self.situacao == FECHADO and self.falhas_seguidas >= self.limite_falhas:
+                self._abrir(agora)
+
+    def estado(self) -> dict:
+        agora = time.monotonic()
+        with self._lock:
+            return {
+                "nome": self.nome,
+                "estado": self.situacao,
+                "falhas_seguidas": self.falhas_seguidas,
+                "reabre_em_s": round(max(0.0, self._reabre_em - agora), 1)
+                               if self.situacao == ABERTO else 0.0,
+                "chamadas": self.chamadas,
+                "falhas": self.falhas,
+                "recusadas": self.recusadas,
+                "aberturas": self.aberturas,
+                "ultimo_erro": self.ultimo_erro,
+            }
+
+
+def abrir_disjuntor(nome: str) -> Disjuntor:
+    """Disjuntor com os limites do ambiente (ver docstring do módulo)."""
+    return Disjuntor(
+        nome,
+        falhas=int(os.getenv("DISJUNTOR_FALHAS", 5)),
+        aberto_s=float(os.getenv("DISJUNTOR_ABERTO_S", 30)),
+        aberto_max_s=float(os.getenv("DISJUNTOR_ABERTO_MAX_S", 300)),
+        sondas=int(os.getenv("DISJUNTOR_SONDAS", 1)),
+    )
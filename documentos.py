@@ -0,0 +1,198 @@
+"""
+Validação de CPF/CNPJ em lote (NumPy), para cadastros e planilhas grandes.
+
+As regras são as de validacao._valida_cpf/_valida_cnpj, mas aplicadas à
+coluna inteira de uma vez: os textos viram uma matriz de códigos Unicode,
+os dígitos são compactados à esquerda de cada linha e os dois dígitos
+verificadores saem de somas ponderadas (produto matricial). A saída
+formatada segue _formata_cpf/_formata_cnpj ("" nas linhas inválidas).
+
+Comparação com as funções escalares:
+    python documentos.py [--linhas 200000]
+"""
+import argparse
+import random
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+_ZERO, _NOVE = ord("0"), ord("9")
+
+_PESOS_CPF_1 = np.arange(10, 1, -1)                                  # 10..2
+_PESOS_CPF_2 = np.arange(11, 1, -1)                                  # 11..2
+_PESOS_CNPJ_1 = np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+_PESOS_CNPJ_2 = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+
+# máscara de saída: índice do dígito ou o separador a inserir
+_MASCARA_CPF = [0, 1, 2, ".", 3, 4, 5, ".", 6, 7, 8, "-", 9, 10]
+_MASCARA_CNPJ = [0, 1, ".", 2, 3, 4, ".", 5, 6, 7, "/", 8, 9, 10, 11, "-", 12, 13]
+
+
+# texto maior que isso não é CPF/CNPJ (formatado, o CNPJ tem 18): vira inválido
+# antes da matriz, que tem a largura do maior texto da coluna
+_MAX_CARACTERES = 32
+
+
+class DocumentosLote(NamedTuple):
+    validos: np.ndarray    # bool, um por linha
+    formatados: list       # texto formatado ou "" (inválido)
+
+
+def _matriz_digitos(valores) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Extrai os dígitos de cada texto. Retorna (matriz de dígitos 0-9 alinhada
+    à esquerda, quantidade de dígitos por linha).
+    """
+    textos = [("" if v is None else str(v)) for v in valores]
+    textos = np.asarray([t if len(t) <= _MAX_CARACTERES else "" for t in textos], dtype=str)
+    if textos.size == 0:
+        return np.zeros((0, 0), dtype=np.uint8), np.zeros(0, dtype=np.int64)
+    largura = max(textos.dtype.itemsize // 4, 1)
+    codigos = np.ascontiguousarray(textos).view(np.uint32).reshape(len(textos), largura)
+    eh_digito = (codigos >= _ZERO) & (codigos <= _NOVE)
+    # ordenação estável: dígitos primeiro, na ordem original
+    ordem = np.argsort(~eh_digito, axis=1, kind="stable")
+    digitos = np.take_along_axis(codigos, ordem, axis=1) - _ZERO
+    qtd = eh_digito.sum(axis=1)
+    digitos[np.arange(largura) >= qtd[:, None]] = 0
+    return digitos.astype(np.uint8), qtd
+
+
+def _dv(digitos: np.ndarray, pesos: np.ndarray, mod10: bool) -> np.ndarray:
+    soma = digitos[:, : len(pesos)].astype(np.int32) @ pesos
+    if mod10:                                   # regra do CPF
+        dv = (soma * 10) % 11
+        return np.where(dv == 10, 0, dv)
+    dv = 11 - soma % 11                         # regra do CNPJ
+    return np.where(dv >= 10, 0, dv)
+
+
+def _com_largura(digitos: np.ndarray, n: int) -> np.ndarray:
+    if digitos.shape[1] < n:
+        digitos = np.pad(digitos, ((0, 0), (0, n - digitos.shape[1])))
+    return digitos[:, :n]
+
+
+def _formatar(digitos: np.ndarray, validos: np.ndarray, mascara: list) -> list:
+    idx = [0 if isinstance(m, str) else m for m in mascara]
+    saida = digitos[validos][:, idx].astype(np.uint32) + _ZERO
+    for col, m in enumerate(mascara):
+        if isinstance(m, str):
+            saida[:, col] = ord(m)
+    textos = np.ascontiguousarray(saida).view(f"<U{len(mascara)}").ravel().tolist()
+    formatados = [""] * len(validos)
+    for i, t in zip(np.flatnonzero(validos).tolist(), textos):
+        formatados[i] = t
+    return formatados
+
+
+def _validos_cpf(d: np.ndarray, qtd: np.ndarray) -> np.ndarray:
+    repetidos = (d == d[:, :1]).all(axis=1)
+    return (
+        (qtd == 11) & ~repetidos
+        & (_dv(d, _PESOS_CPF_1, True) == d[:, 9])
+        & (_dv(d, _PESOS_CPF_2, True) == d[:, 10])
+    )
+
+
+def _validos_cnpj(d: np.ndarray, qtd: np.ndarray) -> np.ndarray:
+    repetidos = (d == d[:, :1]).all(axis=1)
+    return (
+        (qtd == 14) & ~repetidos
+        & (_dv(d, _PESOS_CNPJ_1, False) == d[:, 12])
+        & (_dv(d, _PESOS_CNPJ_2, False) == d[:, 13])
+    )
+
+
+def validar_cpfs(valores) -> DocumentosLote:
+    """CPF por linha: exatamente 11 dígitos (pontuação ignorada) e DVs corretos."""
+    digitos, qtd = _matriz_digitos(valores)
+    d = _com_largura(digitos, 11)
+    validos = _validos_cpf(d, qtd)
+    return DocumentosLote(validos, _formatar(d, validos, _MASCARA_CPF))
+
+
+def validar_cnpjs(valores) -> DocumentosLote:
+    """CNPJ por linha: exatamente 14 dígitos e DVs corretos."""
+    digitos, qtd = _matriz_digitos(valores)
+    d = _com_largura(digitos, 14)
+    validos = _validos_cnpj(d, qtd)
+    return DocumentosLote(validos, _formatar(d, validos, _MASCARA_CNPJ))
+
+
+def validar_cnpj_cpf_lote(valores) -> DocumentosLote:
+    """Como validacao.validar_cnpj_cpf: 11 dígitos = CPF, 14 = CNPJ."""
+    digitos, qtd = _matriz_digitos(valores)
+    d = _com_largura(digitos, 14)
+    cpf = _validos_cpf(d[:, :11], qtd)
+    cnpj = _validos_cnpj(d, qtd)
+    f_cpf = _formatar(d, cpf, _MASCARA_CPF)
+    f_cnpj = _formatar(d, cnpj, _MASCARA_CNPJ)
+    return DocumentosLote(cpf | cnpj, [a or b for a, b in zip(f_cpf, f_cnpj)])
+
+
+# --- comparação com as funções escalares ---
+
+def _amostra(n: int, tamanho: int, dv, semente: int = 42) -> list[str]:
+    # documentos aleatórios com DVs corretos, ~15% com DV trocado, metade
+    # com pontuação, mais alguns casos de borda
+    rnd = random.Random(semente)
+    saida = ["", None, "abc", "0" * tamanho, "1" * (tamanho + 1)]
+    while len(saida) < n:
+        d = "".join(rnd.choice("0123456789") for _ in range(tamanho - 2))
+        d += str(dv(d))
+        d += str(dv(d))
+        if rnd.random() < 0.15:
+            d = d[:-1] + str((int(d[-1]) + 1) % 10)
+        saida.append(f"{d[:3]}.{d[3:6]}.{d[6:]}" if rnd.random() < 0.5 else d)
+    return saida
+
+
+def _dv_cpf(d: str) -> int:
+    dv = (sum(int(c) * p for c, p in zip(d, range(len(d) + 1, 1, -1))) * 10) % 11
+    return 0 if dv == 10 else dv
+
+
+def _dv_cnpj(d: str) -> int:
+    pesos = _PESOS_CNPJ_2.tolist()[-len(d):]
+    dv = 11 - sum(int(c) * p for c, p in zip(d, pesos)) % 11
+    return 0 if dv >= 10 else dv
+
+
+def _medir(nome: str, fn, valores):
+    t0 = time.perf_counter()
+    r = fn(valores)
+    dur = time.perf_counter() - t0
+    print(f"  {nome:<10} {dur * 1000:9.1f} ms  ({len(valores) / dur:,.0f} linhas/s)")
+    return r
+
+
+def main(argv=None):
+    from validacao import _apenas_digitos, _valida_cpf, _valida_cnpj, _formata_cpf, _formata_cnpj
+
+    p = argparse.ArgumentParser(description="Compara a validação de CPF/CNPJ escalar e vetorizada.")
+    p.add_argument("--linhas", type=int, default=200_000)
+    a = p.parse_args(argv)
+
+    casos = [
+        ("CPF", _amostra(a.linhas, 11, _dv_cpf), validar_cpfs, _valida_cpf, _formata_cpf),
+        ("CNPJ", _amostra(a.linhas, 14, _dv_cnpj), validar_cnpjs, _valida_cnpj, _formata_cnpj),
+    ]
+    for nome, valores, vetorizada, valida, formata in casos:
+        def escalar(vs):
+            saida = []
+            for v in vs:
+                d = _apenas_digitos(v)
+                saida.append(formata(d) if valida(d) else "")
+            return saida
+
+        print(f"{nome}: {len(valores):,} linhas")
+        esperado = _medir("escalar", escalar, valores)
+        obtido = _medir("numpy", vetorizada, valores)
+        assert obtido.formatados == esperado, f"{nome}: resultados divergentes"
+        print(f"  válidos: {int(obtido.validos.sum()):,} (idênticos ao escalar)")
+
+
+if __name__ == "__main__":
+    main()
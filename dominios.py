@@ -0,0 +1,116 @@
+"""
+Domínios de e-mail conhecidos: atalho sem DNS e correção de digitação.
+
+A maior parte dos endereços do formulário termina em poucas dezenas de
+domínios. Para eles:
+- dominio_conhecido(): domínio da lista recebe e-mail, sem consultar o DNS;
+- sugerir_dominio(): para domínio fora da lista a uma letra de distância de
+  um conhecido ("gmial.com", "hotmial.com", "gmail.con"), o conhecido mais
+  provável. É só sugestão: há domínios de verdade a uma letra de um da lista
+  (cloud.com, sol.com.br), então quem decide se o domínio existe é o DNS.
+
+A busca usa uma BK-tree com a distância de Damerau-Levenshtein (variante OSA:
+troca de duas letras vizinhas conta 1), então só os poucos domínios dentro do
+raio são comparados.
+
+Configuração:
+- DOMINIOS_CONHECIDOS_EXTRA: domínios a acrescentar à lista, separados por
+                             vírgula (ex. os de outra instituição)
+"""
+import os
+from functools import lru_cache
+
+# do mais ao menos comum: em empate de distância, vence o primeiro
+DOMINIOS_CONHECIDOS = [
+    "gmail.com", "hotmail.com", "outlook.com", "yahoo.com.br", "yahoo.com",
+    "icloud.com", "live.com", "hotmail.com.br", "outlook.com.br", "bol.com.br",
+    "uol.com.br", "terra.com.br", "ig.com.br", "globo.com", "globomail.com",
+    "msn.com", "me.com", "live.com.br", "protonmail.com", "proton.me",
+    "ifgoiano.edu.br", "estudante.ifgoiano.edu.br",
+    # legítimos a uma letra de um dos de cima: sem eles, receberiam sugestão à toa
+    "mail.com", "email.com", "ymail.com", "googlemail.com",
+    "yahoo.com.ar", "hotmail.com.ar", "live.com.ar",
+]
+
+_TAMANHO_MIN_SUGESTAO = 8   # domínios curtos (me.com, msn.com) têm vizinhos legítimos demais
+_RAIO = 1
+
+
+def distancia(a: str, b: str) -> int:
+    """Damerau-Levenshtein (OSA): inserção, remoção, troca e transposição."""
+    if a == b:
+        return 0
+    anterior2, anterior = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        atual = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            atual[j] = min(
+                anterior[j] + 1,                    # remoção
+                atual[j - 1] + 1,                   # inserção
+                anterior[j - 1] + (ca != cb),       # troca
+            )
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                atual[j] = min(atual[j], anterior2[j - 2] + 1)  # transposição
+        anterior2, anterior = anterior, atual
+    return anterior[-1]
+
+
+class ArvoreBK:
+    """BK-tree: busca por palavras a até `raio` de distância."""
+
+    def __init__(self, palavras=()):
+        self.raiz = None   # (palavra, {distância: nó filho})
+        for p in palavras:
+            self.adicionar(p)
+
+    def adicionar(self, palavra: str):
+        if self.raiz is None:
+            self.raiz = (palavra, {})
+            return
+        no = self.raiz
+        while True:
+            d = distancia(palavra, no[0])
+            if d == 0:
+                return
+            filho = no[1].get(d)
+            if filho is None:
+                no[1][d] = (palavra, {})
+                return
+            no = filho
+
+    def buscar(self, termo: str, raio: int) -> list[tuple[int, str]]:
+        achados, pilha = [], [self.raiz] if self.raiz else []
+        while pilha:
+            palavra, filhos = pilha.pop()
+            d = distancia(termo, palavra)
+            if d <= raio:
+                achados.append((d, palavra))
+            # desigualdade triangular: só os filhos em [d - raio, d + raio]
+            pilha.extend(no for k, no in filhos.items() if d - raio <= k <= d + raio)
+        return achados
+
+
+def _carregar():
+    extras = [d.strip().lower() for d in os.getenv("DOMINIOS_CONHECIDOS_EXTRA", "").split(",")]
+    lista = list(dict.fromkeys(DOMINIOS_CONHECIDOS + [d for d in extras if d]))
+    ordem = {d: i for i, d in enumerate(lista)}
+    arvore = ArvoreBK(d for d in lista if len(d) >= _TAMANHO_MIN_SUGESTAO)
+    return ordem, arvore
+
+_ORDEM, _ARVORE = _carregar()
+
+
+def dominio_conhecido(dominio: str) -> bool:
+    return (dominio or "").lower() in _ORDEM
+
+
+@lru_cache(maxsize=2048)
+def sugerir_dominio(dominio: str) -> str | None:
+    """Domínio conhecido mais provável para um domínio digitado errado (ou None)."""
+    dominio = (dominio or "").lower()
+    if not dominio or dominio in _ORDEM:
+        return None
+    achados = _ARVORE.buscar(dominio, _RAIO)
+    if not achados:
+        return None
+    return min(achados, key=lambda a: (a[0], _ORDEM[a[1]]))[1]
@@ -0,0 +1,118 @@
+/* Scripts da página do TCE (servido por /estatico/<versão>/tce.js). */
+(function () {
+  try {
+    // Diz explicitamente que a página está em pt-BR
+    document.documentElement.setAttribute("lang", "pt-BR");
+    // Sinaliza a tradutores que não queremos tradução automática
+    document.documentElement.setAttribute("translate", "no");
+    document.documentElement.classList.add("notranslate");
+  } catch (e) {}
+
+  try {
+    history.scrollRestoration = "manual";
+    window.addEventListener("DOMContentLoaded", () => { window.scrollTo(0, 0); });
+    setTimeout(() => { window.scrollTo(0, 0); }, 0);
+  } catch (e) {}
+
+  // Ponte dos seletores de data: <input type="date" data-destino="ID"> copia
+  // o valor (AAAA-MM-DD) para o Textbox oculto do Gradio com elem_id=ID.
+  // A data é conferida aqui mesmo (formato, data futura, idade mínima,
+  // término >= início) enquanto o usuário digita, mas só vai ao servidor
+  // quando confirmada (change / saída do campo). Data inválida não é
+  // enviada: o campo oculto fica vazio e a mensagem aparece sob o seletor.
+  //   data-passado                      não aceita data futura
+  //   data-idade-min="18"               data de nascimento de quem tem 18+
+  //   data-msg-idade="..."              mensagem da idade mínima
+  //   data-apos="input-inicio"          não pode ser anterior a esse seletor
+  const ANO_MIN = 1900;
+
+  function paraIso(valor) {
+    // navegadores válidos emitem AAAA-MM-DD; se aceitarem digitação em
+    // DD/MM/AAAA, converte
+    const m = (valor || "").match(/^(\d{2})\/(\d{2})\/(\d{4})$/);
+    return m ? `${m[3]}-${m[2]}-${m[1]}` : (valor || "");
+  }
+
+  function iso(d) {
+    const p = (n) => String(n).padStart(2, "0");
+    return `${d.getFullYear()}-${p(d.getMonth() + 1)}-${p(d.getDate())}`;
+  }
+
+  function dataValida(v) {
+    const m = v.match(/^(\d{4})-(\d{2})-(\d{2})$/);
+    if (!m || +m[1] < ANO_MIN) return false;
+    const d = new Date(+m[1], +m[2] - 1, +m[3]);
+    return d.getFullYear() === +m[1] && d.getMonth() === +m[2] - 1 && d.getDate() === +m[3];
+  }
+
+  // mensagem de erro da data (ou "" se está ok / vazia)
+  function conferir(src, v) {
+    if (!v) return src.validity && src.validity.badInput ? "⚠️ Data inválida." : "";
+    if (!dataValida(v)) return "⚠️ Data inválida.";
+    const hoje = new Date();
+    if ("passado" in src.dataset && v > iso(hoje)) {
+      return "⚠️ A data de nascimento não pode ser futura.";
+    }
+    const idade = +src.dataset.idadeMin || 0;
+    if (idade) {
+      const limite = new Date(hoje.getFullYear() - idade, hoje.getMonth(), hoje.getDate());
+      if (limite.getMonth() !== hoje.getMonth()) limite.setDate(0);  // 29/02
+      if (v > iso(limite)) return src.dataset.msgIdade || `⚠️ É preciso ter pelo menos ${idade} anos.`;
+    }
+    const ref = src.dataset.apos && document.getElementById(src.dataset.apos);
+    const inicio = ref ? paraIso(ref.value) : "";
+    if (inicio && dataValida(inicio) && v < inicio) {
+      return "⚠️ A data de término não pode ser anterior à data de início.";
+    }
+    return "";
+  }
+
+  function mostrar(src, msg) {
+    src.classList.toggle("tce-data-erro", !!msg);
+    src.setAttribute("aria-invalid", msg ? "true" : "false");
+    const aviso = src.parentElement && src.parentElement.querySelector(".tce-data-msg");
+    if (aviso) aviso.textContent = msg;
+  }
+
+  function sincronizar(src) {
+    const id = src.dataset.destino;
+    const v = paraIso(src.value);
+    const msg = conferir(src, v);
+    mostrar(src, msg);
+    const dst = document.querySelector(`#${id} textarea, #${id} input`);
+    if (!dst) return;
+    const valor = msg ? "" : v;
+    if (dst.value !== valor) {
+      dst.value = valor;
+      dst.dispatchEvent(new Event("input", { bubbles: true }));
+    }
+  }
+
+  function ehPonte(el) {
+    return el instanceof HTMLInputElement && !!el.dataset.destino;
+  }
+
+  // confirmação: sincroniza este seletor e os que dependem dele (término)
+  function confirmar(ev) {
+    const src = ev.target;
+    if (!ehPonte(src)) return;
+    sincronizar(src);
+    document.querySelectorAll(`input[data-apos="${src.id}"]`).forEach((dep) => {
+      if (dep.value) sincronizar(dep);
+    });
+  }
+  document.addEventListener("change", confirmar);
+  document.addEventListener("focusout", confirmar);
+
+  // digitação: só confere e mostra a mensagem, sem falar com o servidor
+  document.addEventListener("input", (ev) => {
+    const src = ev.target;
+    if (ehPonte(src)) mostrar(src, conferir(src, paraIso(src.value)));
+  });
+
+  // seletor de nascimento não oferece datas futuras
+  document.addEventListener("focusin", (ev) => {
+    const src = ev.target;
+    if (ehPonte(src) && "passado" in src.dataset) src.max = iso(new Date());
+  });
+})();
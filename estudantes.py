@@ -0,0 +1,188 @@
+"""
+Índice do cadastro de estudantes do campus (exportação CSV do sistema acadêmico).
+
+O CSV é carregado num índice em memória por matrícula e por CPF; cada
+carga gera um snapshot imutável que é trocado de uma vez, então as consultas
+nunca veem um índice pela metade. Se o arquivo mudar no disco (mtime/tamanho),
+a próxima consulta recarrega — basta sobrescrever o CSV para atualizar.
+
+Colunas reconhecidas (cabeçalho sem acento/caixa; separador ";" ou ","):
+  matricula, nome, cpf, nascimento (AAAA-MM-DD ou DD/MM/AAAA), curso,
+  ano_periodo (ou "periodo" / "ano").
+
+Configuração: ESTUDANTES_CSV (padrão: estudantes.csv; ausente = índice vazio).
+"""
+import csv
+import os
+import re
+import threading
+import time
+import unicodedata
+from datetime import datetime
+from typing import NamedTuple
+
+from documentos import validar_cpfs
+
+
+class Estudante(NamedTuple):
+    matricula: str
+    nome: str
+    cpf: str          # 11 dígitos (só CPF válido)
+    nascimento: str   # AAAA-MM-DD (ou "")
+    curso: str
+    ano_periodo: str
+
+
+# cabeçalho normalizado -> campo
+_COLUNAS = {
+    "matricula": "matricula", "numero_matricula": "matricula", "ra": "matricula",
+    "nome": "nome", "nome_estudante": "nome", "aluno": "nome",
+    "cpf": "cpf",
+    "nascimento": "nascimento", "data_nascimento": "nascimento", "dt_nascimento": "nascimento",
+    "curso": "curso",
+    "ano_periodo": "ano_periodo", "periodo": "ano_periodo", "ano": "ano_periodo", "serie": "ano_periodo",
+}
+
+
+def _cabecalho(s: str) -> str:
+    s = unicodedata.normalize("NFKD", s or "").encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "_", s.strip().lower()).strip("_")
+
+
+def chave_matricula(s: str) -> str:
+    """Matrícula normalizada: só letras/dígitos, maiúsculas."""
+    return re.sub(r"[^0-9A-Za-z]", "", s or "").upper()
+
+
+def chave_cpf(s: str) -> str:
+    return re.sub(r"\D", "", s or "")
+
+
+def _data_iso(s: str) -> str:
+    s = (s or "").strip()
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(s, fmt).date().isoformat()
+        except ValueError:
+            pass
+    return ""
+
+
+def _periodo(s: str) -> str:
+    m = re.search(r"\d+", s or "")
+    return str(int(m.group())) if m else ""
+
+
+def importar_csv(caminho: str) -> list[Estudante]:
+    """Lê a exportação do cadastro e devolve os registros normalizados."""
+    with open(caminho, "rb") as f:
+        bruto = f.read()
+    try:
+        texto = bruto.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        texto = bruto.decode("latin-1")  # exportações antigas do sistema acadêmico
+
+    linhas = texto.splitlines()
+    if not linhas:
+        return []
+    sep = ";" if linhas[0].count(";") >= linhas[0].count(",") else ","
+    leitor = csv.reader(linhas, delimiter=sep)
+    campos = [_COLUNAS.get(_cabecalho(c)) for c in next(leitor)]
+
+    linhas = [{c: (v or "").strip() for c, v in zip(campos, linha) if c} for linha in leitor]
+    # DVs conferidos de uma vez para a coluna inteira; CPF inválido não vira chave
+    cpfs_validos = validar_cpfs([r.get("cpf", "") for r in linhas]).validos
+
+    registros = []
+    for r, cpf_ok in zip(linhas, cpfs_validos.tolist()):
+        matricula = r.get("matricula", "")
+        cpf = chave_cpf(r.get("cpf", "")) if cpf_ok else ""
+        if not matricula and not cpf:
+            continue
+        registros.append(Estudante(
+            matricula=matricula,
+            nome=" ".join(r.get("nome", "").split()),
+            cpf=cpf,
+            nascimento=_data_iso(r.get("nascimento", "")),
+            curso=r.get("curso", ""),
+            ano_periodo=_periodo(r.get("ano_periodo", "")),
+        ))
+    return registros
+
+
+class _Snapshot(NamedTuple):
+    assinatura: tuple | None     # (mtime_ns, tamanho) do CSV carregado
+    por_matricula: dict
+    por_cpf: dict
+
+
+_VAZIO = _Snapshot(None, {}, {})
+
+
+class IndiceEstudantes:
+    """Consulta por matrícula/CPF com recarga automática quando o CSV muda."""
+
+    def __init__(self, caminho: str, intervalo: float = 5.0):
+        self.caminho = caminho
+        self.intervalo = intervalo   # no máximo um os.stat a cada `intervalo` s
+        self._snap = _VAZIO
+        self._verificado_em = 0.0
+        self._lock = threading.Lock()
+        self.recarregar()
+
+    def _assinatura(self):
+        try:
+            st = os.stat(self.caminho)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def recarregar(self, forcar: bool = False) -> bool:
+        """Recarrega o CSV se ele mudou desde a última carga. True = trocou o índice."""
+        with self._lock:
+            self._verificado_em = time.monotonic()
+            assinatura = self._assinatura()
+            if assinatura == self._snap.assinatura and not forcar:
+                return False
+            if assinatura is None:
+                self._snap = _VAZIO
+                return True
+            try:
+                registros = importar_csv(self.caminho)
+            except (OSError, csv.Error, StopIteration) as e:
+                print(f"[ESTUDANTES][ERRO] {type(e).__name__}: {e}")
+                return False
+            por_matricula, por_cpf = {}, {}
+            for est in registros:
+                if est.matricula:
+                    por_matricula[chave_matricula(est.matricula)] = est
+                if est.cpf:
+                    por_cpf[est.cpf] = est
+            self._snap = _Snapshot(assinatura, por_matricula, por_cpf)
+            print(f"[ESTUDANTES] {len(registros)} registros carregados de {self.caminho}")
+            return True
+
+    def _atual(self) -> _Snapshot:
+        if time.monotonic() - self._verificado_em >= self.intervalo:
+            self.recarregar()
+        return self._snap
+
+    def por_matricula(self, matricula: str) -> Estudante | None:
+        return self._atual().por_matricula.get(chave_matricula(matricula))
+
+    def por_cpf(self, cpf: str) -> Estudante | None:
+        return self._atual().por_cpf.get(chave_cpf(cpf))
+
+    def conferir(self, matricula: str, cpf: str) -> Estudante | None:
+        """Estudante só se matrícula e CPF forem do mesmo cadastro."""
+        est = self.por_matricula(matricula)
+        if est is None or not est.cpf or est.cpf != chave_cpf(cpf):
+            return None
+        return est
+
+    def __len__(self):
+        return len(self._snap.por_matricula)
+
+
+def abrir_indice_estudantes() -> IndiceEstudantes:
+    return IndiceEstudantes(os.getenv("ESTUDANTES_CSV", "estudantes.csv"))
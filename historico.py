@@ -0,0 +1,308 @@
+"""
+Histórico local dos termos enviados (SQLite, modo WAL).
+
+Cada envio bem-sucedido grava os dados do termo; o histórico alimenta o
+aquecimento dos caches na subida (CEPs e domínios de e-mail mais usados), o
+cadastro de concedentes (último termo validado de cada CNPJ/CPF), usado para
+preencher os dados da concedente a partir do CNPJ, e a tela da coordenação
+(busca por curso, concedente, estudante, período e situação).
+
+A busca usa índices por filtro e paginação por cursor (criado_em, id), então
+o custo de uma página não cresce com o tamanho do histórico; os totais por
+curso/situação ficam numa tabela mantida por gatilhos a cada gravação.
+
+Configuração: HISTORICO_DB (padrão: historico.sqlite).
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+# campos da concedente guardados no cadastro (chaves de `dados` do formulário).
+# Só dados da empresa: o cadastro preenche o formulário para quem digitar o
+# CNPJ, sem login, então contato e representante (nome, CPF) ficam de fora.
+CAMPOS_CONCEDENTE = (
+    "razao_social", "nome_fantasia", "endereco", "bairro", "cep", "complemento",
+    "cidade", "uf",
+)
+
+
+# situações de um termo na coordenação (a primeira é a de todo envio)
+STATUS = ("enviado", "em_analise", "formalizado", "devolvido")
+
+
+def _doc(valor) -> str:
+    """CNPJ/CPF normalizado (só dígitos)."""
+    return "".join(ch for ch in str(valor or "") if ch.isdigit())
+
+
+def _busca(valor) -> str:
+    """Texto para busca por prefixo: sem acento, minúsculo, espaços únicos."""
+    s = unicodedata.normalize("NFKD", str(valor or "")).encode("ascii", "ignore").decode()
+    return " ".join(re.sub(r"[^a-z0-9 ]+", " ", s.lower()).split())
+
+
+def _prefixo(coluna: str, valor: str, params: list) -> str:
+    # "coluna LIKE 'x%'" não usa índice com o collate padrão; o intervalo usa
+    params += [valor, valor + "\uffff"]
+    return f"{coluna} >= ? AND {coluna} < ?"
+
+
+# índices da busca da coordenação e gatilhos dos totais por curso/situação
+_DDL_BUSCA = (
+    "CREATE INDEX IF NOT EXISTS termos_data ON termos (criado_em, id)",
+    "CREATE INDEX IF NOT EXISTS termos_curso ON termos (curso, criado_em, id)",
+    "CREATE INDEX IF NOT EXISTS termos_status ON termos (status, criado_em, id)",
+    "CREATE INDEX IF NOT EXISTS termos_cnpj ON termos (cnpj_doc, criado_em, id)",
+    "CREATE INDEX IF NOT EXISTS termos_concedente ON termos (concedente_busca)",
+    "CREATE INDEX IF NOT EXISTS termos_estudante ON termos (estudante_busca)",
+    """CREATE TRIGGER IF NOT EXISTS contagem_insert AFTER INSERT ON termos BEGIN
+        INSERT INTO contagem_cursos (curso, status, total)
+            VALUES (coalesce(NEW.curso, ''), NEW.status, 1)
+            ON CONFLICT (curso, status) DO UPDATE SET total = total + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS contagem_update AFTER UPDATE OF status, curso ON termos BEGIN
+        UPDATE contagem_cursos SET total = total - 1
+            WHERE curso = coalesce(OLD.curso, '') AND status = OLD.status;
+        INSERT INTO contagem_cursos (curso, status, total)
+            VALUES (coalesce(NEW.curso, ''), NEW.status, 1)
+            ON CONFLICT (curso, status) DO UPDATE SET total = total + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS contagem_delete AFTER DELETE ON termos BEGIN
+        UPDATE contagem_cursos SET total = total - 1
+            WHERE curso = coalesce(OLD.curso, '') AND status = OLD.status;
+    END""",
+)
+
+
+class Historico:
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._local = threading.local()
+        self._conn().executescript("""
+            CREATE TABLE IF NOT EXISTS termos (
+                id INTEGER PRIMARY KEY,
+                criado_em REAL NOT NULL,
+                curso TEXT,
+                cnpj TEXT,
+                nome_estudante TEXT,
+                status TEXT NOT NULL DEFAULT 'enviado',
+                dados TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS concedentes (
+                doc TEXT PRIMARY KEY,
+                atualizado_em REAL NOT NULL,
+                dados TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS contagem_cursos (
+                curso TEXT NOT NULL,
+                status TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                PRIMARY KEY (curso, status)
+            ) WITHOUT ROWID;
+        """)
+        conn = self._conn()
+        self._migrar_busca(conn)
+        # bases antigas (só com termos): monta o cadastro uma vez
+        if conn.execute("SELECT 1 FROM concedentes LIMIT 1").fetchone() is None:
+            self.reconstruir_concedentes()
+
+    def _migrar_busca(self, conn):
+        """Colunas/índices da busca da coordenação e gatilhos dos totais."""
+        with conn:
+            # tudo dentro do IMMEDIATE: com WORKERS > 1, só o primeiro a pegar
+            # o lock vê as colunas faltando (os demais já as encontram criadas)
+            conn.execute("BEGIN IMMEDIATE")
+            colunas = {r[1] for r in conn.execute("PRAGMA table_info(termos)")}
+            novas = [c for c in ("cnpj_doc", "concedente_busca", "estudante_busca") if c not in colunas]
+            for c in novas:
+                conn.execute(f"ALTER TABLE termos ADD COLUMN {c} TEXT")
+            if novas:
+                rows = conn.execute("SELECT id, cnpj, nome_estudante, dados FROM termos").fetchall()
+                for id_, cnpj, nome, dados in rows:
+                    conn.execute(
+                        "UPDATE termos SET cnpj_doc = ?, concedente_busca = ?, estudante_busca = ? WHERE id = ?",
+                        (_doc(cnpj), _busca(json.loads(dados).get("razao_social")), _busca(nome), id_),
+                    )
+            # um execute por comando: executescript faria COMMIT no meio da transação
+            for sql in _DDL_BUSCA:
+                conn.execute(sql)
+            if novas:
+                # totais de bases antigas: conta uma vez, depois só os gatilhos
+                conn.execute("DELETE FROM contagem_cursos")
+                conn.execute("""
+                    INSERT INTO contagem_cursos (curso, status, total)
+                    SELECT coalesce(curso, ''), status, COUNT(*) FROM termos GROUP BY 1, 2
+                """)
+
+    def _conn(self) -> sqlite3.Connection:
+        # uma conexão por thread (e por processo: o pid protege contra fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.caminho, timeout=5, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def registrar(self, dados: dict) -> int:
+        """Grava um termo enviado (e atualiza o cadastro da concedente); retorna o id."""
+        agora = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cur = conn.execute(
+                "INSERT INTO termos (criado_em, curso, cnpj, nome_estudante, dados,"
+                " cnpj_doc, concedente_busca, estudante_busca) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    agora,
+                    dados.get("curso_estudante"),
+                    dados.get("cnpj"),
+                    dados.get("nome_estudante"),
+                    json.dumps(dados, ensure_ascii=False),
+                    _doc(dados.get("cnpj")),
+                    _busca(dados.get("razao_social")),
+                    _busca(dados.get("nome_estudante")),
+                ),
+            )
+            self._gravar_concedente(conn, dados, agora)
+        return cur.lastrowid
+
+    def _gravar_concedente(self, conn, dados: dict, quando: float):
+        doc = _doc(dados.get("cnpj"))
+        if len(doc) not in (11, 14):
+            return
+        campos = {c: dados.get(c) or "" for c in CAMPOS_CONCEDENTE}
+        conn.execute(
+            "INSERT OR REPLACE INTO concedentes (doc, atualizado_em, dados) VALUES (?, ?, ?)",
+            (doc, quando, json.dumps(campos, ensure_ascii=False)),
+        )
+
+    def reconstruir_concedentes(self):
+        """Refaz o cadastro de concedentes a partir dos termos (o mais recente vence)."""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM concedentes")
+            termos = conn.execute("SELECT criado_em, dados FROM termos ORDER BY id").fetchall()
+            for criado_em, dados in termos:
+                self._gravar_concedente(conn, json.loads(dados), criado_em)
+
+    def concedente(self, cnpj_cpf: str) -> dict | None:
+        """Dados da concedente do último termo validado com esse CNPJ/CPF."""
+        row = self._conn().execute(
+            "SELECT dados FROM concedentes WHERE doc = ?", (_doc(cnpj_cpf),)
+        ).fetchone()
+        if not row:
+            return None
+        dados = json.loads(row[0])
+        # linhas gravadas antes da lista atual podem ter campos a mais
+        return {c: dados.get(c) or "" for c in CAMPOS_CONCEDENTE}
+
+    def buscar(self, curso=None, concedente=None, estudante=None, status=None,
+               de: float | None = None, ate: float | None = None,
+               apos: tuple | None = None, limite: int = 50) -> tuple[list[dict], tuple | None]:
+        """
+        Termos do mais recente ao mais antigo, filtrados por curso, concedente
+        (CNPJ/CPF ou início da razão social), estudante (início do nome),
+        situação e período [de, ate) em epoch. Paginação por cursor: `apos`
+        None traz a primeira página (os mais recentes); para as seguintes,
+        passe o cursor devolvido pela anterior. O cursor devolvido é None
+        quando esta já é a última página.
+        """
+        where, params = [], []
+        if curso:
+            where.append("curso = ?")
+            params.append(curso)
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if concedente:
+            doc = _doc(concedente)
+            if len(doc) in (11, 14):
+                where.append("cnpj_doc = ?")
+                params.append(doc)
+            elif _busca(concedente):
+                where.append(_prefixo("concedente_busca", _busca(concedente), params))
+        if estudante and _busca(estudante):
+            where.append(_prefixo("estudante_busca", _busca(estudante), params))
+        if de is not None:
+            where.append("criado_em >= ?")
+            params.append(de)
+        if ate is not None:
+            where.append("criado_em < ?")
+            params.append(ate)
+        if apos:
+            where.append("(criado_em, id) < (?, ?)")
+            params += list(apos)
+
+        sql = (
+            "SELECT id, criado_em, curso, status, nome_estudante, cnpj,"
+            " json_extract(dados, '$.razao_social') FROM termos"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + " ORDER BY criado_em DESC, id DESC LIMIT ?"
+        )
+        rows = self._conn().execute(sql, (*params, limite + 1)).fetchall()
+        linhas = [
+            {"id": r[0], "criado_em": r[1], "curso": r[2], "status": r[3],
+             "nome_estudante": r[4], "cnpj": r[5], "razao_social": r[6]}
+            for r in rows[:limite]
+        ]
+        proximo = (rows[limite - 1][1], rows[limite - 1][0]) if len(rows) > limite else None
+        return linhas, proximo
+
+    def termo(self, id_: int) -> dict | None:
+        row = self._conn().execute("SELECT dados FROM termos WHERE id = ?", (id_,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def atualizar_status(self, id_: int, status: str) -> bool:
+        """Muda a situação de um termo (os totais acompanham pelos gatilhos)."""
+        if status not in STATUS:
+            raise ValueError(f"situação desconhecida: {status!r}")
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cur = conn.execute("UPDATE termos SET status = ? WHERE id = ? AND status != ?",
+                               (status, id_, status))
+        return cur.rowcount == 1
+
+    def contagem_por_curso(self) -> dict:
+        """{curso: {situação: total}} a partir da tabela de totais (sem varrer termos)."""
+        saida = {}
+        for curso, status, total in self._conn().execute(
+            "SELECT curso, status, total FROM contagem_cursos WHERE total > 0 ORDER BY curso, status"
+        ):
+            saida.setdefault(curso, {})[status] = total
+        return saida
+
+    def _frequentes(self, campos: list[str], limite: int, transforma: str) -> list[str]:
+        # une os campos (ex.: cep e cep_estudante) e ordena por frequência
+        selects = []
+        for c in campos:
+            expr = transforma.format("json_extract(dados, '$.%s')" % c)
+            selects.append(f"SELECT {expr} AS v FROM termos")
+        partes = " UNION ALL ".join(selects)
+        rows = self._conn().execute(
+            f"SELECT v FROM ({partes}) WHERE v IS NOT NULL AND v != '' "
+            f"GROUP BY v ORDER BY COUNT(*) DESC LIMIT ?",
+            (limite,),
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def ceps_frequentes(self, limite: int = 200) -> list[str]:
+        """CEPs (8 dígitos) de concedentes e estudantes, do mais usado ao menos."""
+        return self._frequentes(["cep", "cep_estudante"], limite,
+                                "replace({}, '-', '')")
+
+    def dominios_frequentes(self, limite: int = 200) -> list[str]:
+        """Domínios de e-mail (concedente e estudante), do mais usado ao menos."""
+        return self._frequentes(["email", "email_estudante"], limite,
+                                "lower(substr({0}, instr({0}, '@') + 1))")
+
+
+def abrir_historico() -> Historico:
+    return Historico(os.getenv("HISTORICO_DB", "historico.sqlite"))
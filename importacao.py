@@ -0,0 +1,198 @@
+"""
+Importação em lote de termos (planilha CSV ou XLSX).
+
+Cada linha da planilha é um termo; o cabeçalho usa os nomes dos campos do
+formulário (tipo_estagio, razao_social, cnpj, ..., registro_conselho), sem
+diferenciar acentos/caixa. As atividades vêm em colunas atividade_1,
+atividade_2, ... ou numa coluna "atividades" (uma por linha ou separadas por ";").
+
+As regras de validação são as do formulário (ver lote.validar_linha); aqui
+ficam só a leitura da planilha, a distribuição das linhas num pool de
+processos e o relatório de erros por linha.
+
+Uso pela linha de comando:
+    python importacao.py termos.xlsx -o relatorio.csv [--processos N] [--enviar]
+"""
+import argparse
+import csv
+import io
+import itertools
+import os
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+
+def _cabecalho(s) -> str:
+    s = unicodedata.normalize("NFKD", str(s or "")).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "_", s.strip().lower()).strip("_")
+
+
+def _celula(v) -> str:
+    # XLSX traz datas e números tipados; o formulário trabalha com texto
+    if v is None:
+        return ""
+    if isinstance(v, datetime):
+        return v.date().isoformat()
+    if isinstance(v, date):
+        return v.isoformat()
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v).strip()
+
+
+def _linhas_csv(caminho: str):
+    with open(caminho, "rb") as f:
+        inicio = f.read(64 * 1024)
+    encoding = "utf-8-sig"
+    try:
+        inicio.decode(encoding)
+    except UnicodeDecodeError as e:
+        # o bloco pode ter cortado um caractere multibyte no final; fora isso,
+        # é exportação antiga em Latin-1
+        if e.reason != "unexpected end of data":
+            encoding = "latin-1"
+
+    with open(caminho, encoding=encoding, newline="") as f:
+        primeira = f.readline()
+        sep = ";" if primeira.count(";") >= primeira.count(",") else ","
+        f.seek(0)
+        yield from csv.reader(f, delimiter=sep)
+
+
+def _linhas_xlsx(caminho: str):
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise RuntimeError("Leitura de XLSX requer o pacote openpyxl (pip install openpyxl).") from e
+    wb = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        for linha in wb.worksheets[0].iter_rows(values_only=True):
+            yield [_celula(v) for v in linha]
+    finally:
+        wb.close()
+
+
+def ler_planilha(caminho: str):
+    """
+    Lê a planilha linha a linha. Gera (número da linha, {campo: valor}),
+    com "atividades" já como lista. Linhas totalmente vazias são puladas.
+    """
+    linhas = _linhas_xlsx(caminho) if caminho.lower().endswith((".xlsx", ".xlsm")) else _linhas_csv(caminho)
+    cabecalho = None
+    for n, linha in enumerate(linhas, start=1):
+        if cabecalho is None:
+            cabecalho = [_cabecalho(c) for c in linha]
+            continue
+        valores = [_celula(v) for v in linha]
+        if not any(valores):
+            continue
+        yield n, _montar_registro({c: v for c, v in zip(cabecalho, valores) if c})
+
+
+def _montar_registro(registro: dict) -> dict:
+    # junta as atividades (coluna "atividades" e/ou atividade_N) numa lista
+    atividades = []
+    if isinstance(registro.get("atividades"), list):
+        atividades = [a for a in (_celula(a) for a in registro.pop("atividades")) if a]
+    elif registro.get("atividades"):
+        atividades = [a.strip() for a in re.split(r"[;\n]", registro.pop("atividades")) if a.strip()]
+    numeradas = sorted(
+        (int(c.rsplit("_", 1)[1]), c) for c in registro if re.fullmatch(r"atividade_\d+", c)
+    )
+    atividades += [registro.pop(c) for _, c in numeradas if registro.get(c)]
+    registro["atividades"] = atividades
+    return registro
+
+
+def registro_de_json(doc: dict) -> dict:
+    """
+    Converte um termo em JSON (mesmas chaves do cabeçalho da planilha) no
+    registro usado por ler_planilha. "atividades" pode ser lista ou texto.
+    """
+    registro = {}
+    for c, v in doc.items():
+        c = _cabecalho(c)
+        if c:
+            registro[c] = v if c == "atividades" and isinstance(v, list) else _celula(v)
+    return _montar_registro(registro)
+
+
+def limitar_linhas(linhas, maximo: int):
+    """Repassa as linhas; passando de `maximo`, interrompe com ValueError."""
+    for i, linha in enumerate(linhas, start=1):
+        if i > maximo:
+            raise ValueError(f"a planilha passa de {maximo} termos; divida-a em partes menores.")
+        yield linha
+
+
+def _validar_bloco(validar_linha, semear, dados, linhas):
+    # roda no processo de validação: primeiro o que o bloco precisa (ex.: cache)
+    if semear is not None:
+        semear(*dados)
+    return [validar_linha(n, r) for n, r in linhas]
+
+
+def validar_em_lote(linhas, validar_linha, preparar=None, semear=None, processos=None,
+                    bloco: int = 256):
+    """
+    Valida `linhas` (iterável de (n, registro)) num pool de processos, lendo
+    `bloco` linhas por vez: a planilha nunca fica inteira na memória.
+    `validar_linha(n, registro)` roda em cada processo e devolve um dict com
+    ao menos "linha", "ok", "campos" e "mensagens"; os resultados saem na
+    ordem de entrada, bloco a bloco.
+    Opcionalmente, `preparar(linhas_do_bloco)` roda no processo principal
+    (ex.: consultas de rede do bloco) e a tupla que devolve é passada a
+    `semear(*tupla)` em cada processo, antes das linhas do bloco.
+    """
+    processos = max(1, processos or os.cpu_count() or 1)
+    linhas = iter(linhas)
+    with ProcessPoolExecutor(max_workers=processos) as ex:
+        while True:
+            atual = list(itertools.islice(linhas, bloco))
+            if not atual:
+                return
+            dados = preparar(atual) if preparar is not None else ()
+            fatia = -(-len(atual) // processos)
+            futuros = [ex.submit(_validar_bloco, validar_linha, semear, dados, atual[k:k + fatia])
+                       for k in range(0, len(atual), fatia)]
+            for f in futuros:
+                yield from f.result()
+
+
+def relatorio_csv(resultados) -> str:
+    """Relatório por linha (CSV com ";", abre direto no Excel/LibreOffice)."""
+    buf = io.StringIO()
+    w = csv.writer(buf, delimiter=";")
+    w.writerow(["linha", "situacao", "campos_com_erro", "mensagens"])
+    for r in resultados:
+        w.writerow([
+            r["linha"],
+            r.get("situacao") or ("OK" if r["ok"] else "ERRO"),
+            ", ".join(r["campos"]),
+            " | ".join(r["mensagens"]),
+        ])
+    return buf.getvalue()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Valida (e opcionalmente encaminha) termos de uma planilha.")
+    p.add_argument("planilha", help="arquivo .csv ou .xlsx")
+    p.add_argument("-o", "--saida", default="relatorio_importacao.csv", help="relatório por linha (CSV)")
+    p.add_argument("--processos", type=int, default=None, help="processos de validação (padrão: nº de CPUs)")
+    p.add_argument("--enviar", action="store_true", help="encaminha os termos válidos por e-mail")
+    a = p.parse_args(argv)
+
+    import app  # monta o app (validadores, cache, SMTP) só quando usado pela CLI
+
+    resultados = app.importar_planilha(a.planilha, enviar=a.enviar, processos=a.processos)
+    with open(a.saida, "w", encoding="utf-8-sig", newline="") as f:
+        f.write(relatorio_csv(resultados))
+    ok = sum(r["ok"] for r in resultados)
+    print(f"{ok}/{len(resultados)} linhas válidas; relatório em {a.saida}")
+    return 0 if ok == len(resultados) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
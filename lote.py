@@ -0,0 +1,145 @@
+"""
+Validação de uma linha da importação em lote (planilha ou API JSON).
+
+Roda nos processos do pool de importacao.validar_em_lote, então depende só
+das regras (validacao.py) e da tabela de municípios: nada de Gradio, SMTP ou
+cache do app, e o processo filho não precisa importar o app.
+
+As consultas de rede (CEP, DNS do domínio de e-mail) são feitas antes, no
+processo principal, uma vez por valor distinto do bloco; as respostas chegam
+aos processos por semear(). O que não foi resolvido conta como "rede fora":
+CEP sem resposta não valida cidade/UF pela API, domínio sem resposta não
+reprova o e-mail (mesmo tratamento do formulário).
+"""
+from datetime import datetime
+
+import validacao
+from municipios import abrir_indice_municipios
+from validacao import MIN_ATIVIDADES, NOMES_FIXOS, NOMES_FINAIS, nomes_do_termo
+
+# respostas do bloco atual (semear) e a tabela de municípios, por processo
+_CEPS: dict = {}
+_DOMINIOS: dict = {}
+_MUNICIPIOS = None
+
+
+def semear(ceps: dict, dominios: dict):
+    """Respostas de CEP/DNS do bloco (chamado no processo, antes das linhas)."""
+    global _CEPS, _DOMINIOS
+    _CEPS, _DOMINIOS = ceps, dominios
+
+
+def _cep_semeado(cep8: str):
+    if cep8 not in _CEPS:
+        raise LookupError(cep8)   # não resolvido no processo principal
+    return _CEPS[cep8]
+
+
+def _dominio_semeado(dominio: str):
+    return _DOMINIOS.get(dominio.lower())   # None = DNS sem resposta
+
+
+def _municipios():
+    global _MUNICIPIOS
+    if _MUNICIPIOS is None:
+        _MUNICIPIOS = abrir_indice_municipios()
+    return _MUNICIPIOS
+
+
+def _data_iso_planilha(v: str) -> str:
+    # a tela recebe ISO do seletor; planilhas costumam trazer DD/MM/AAAA
+    v = (v or "").strip()
+    try:
+        return datetime.strptime(v, "%d/%m/%Y").date().isoformat()
+    except ValueError:
+        return v
+
+
+def args_da_linha(registro: dict) -> list:
+    """Monta os args na ordem do formulário, calculando o que a tela calcula."""
+    r = dict(registro)
+    for c in ("data_inicio", "data_termino", "nascimento", "nascimento_repr"):
+        r[c] = _data_iso_planilha(r.get(c))
+    if r.get("valor_bolsa") and not r.get("valor_extenso"):
+        try:
+            r["valor_extenso"] = validacao.valor_por_extenso(r["valor_bolsa"].strip())
+        except ValueError:
+            pass
+    if not r.get("total_dias"):
+        r["total_dias"] = validacao.calcular_total_dias(
+            r["data_inicio"], r["data_termino"],
+            r.get("contar_finais_semana") or "Não", r.get("qtd_feriados"),
+        ).valor
+    for plano, origem in (("horas_diarias_plano", "horas_diarias"),
+                          ("horas_semanais_plano", "horas_semana_estagio"),
+                          ("total_horas_plano", "total_horas_estagio")):
+        if not r.get(plano):
+            r[plano] = r.get(origem, "")
+
+    atividades = list(r.get("atividades") or [])
+    atividades += [""] * (MIN_ATIVIDADES - len(atividades))
+    return (
+        [r.get(n, "") for n in NOMES_FIXOS]
+        + atividades
+        + [r.get(n, "") for n in NOMES_FINAIS]
+    )
+
+
+def _validadores(consultar_dominio) -> list:
+    """Validadores de campo do formulário (os do blur) que valem para a linha."""
+    def email(valor):
+        return validacao.validar_email(valor, consultar_dominio)
+
+    return [
+        ("cnpj", validacao.validar_cnpj_cpf),
+        ("cep", validacao.validar_cep),
+        ("email", email),
+        ("telefone", validacao.validar_telefone),
+        ("cpf_repr", validacao.validar_cpf),
+        ("cpf_estudante", validacao.validar_cpf),
+        ("cep_estudante", validacao.validar_cep),
+        ("email_estudante", email),
+        ("telefone_estudante", validacao.validar_telefone),
+    ]
+
+
+def validar_linha(n: int, registro: dict, consultar_cep, consultar_dominio, municipios=None) -> dict:
+    """
+    Valida uma linha com as regras do formulário. As consultas de rede vêm
+    como funções (ver validacao.py). Retorna {"linha", "ok", "campos",
+    "mensagens", "dados", "atividades"}.
+    """
+    campos, mensagens = set(), []
+    registro = dict(registro)
+    for nome, fn in _validadores(consultar_dominio):
+        res = fn(registro.get(nome, ""))
+        if res.erro:
+            campos.add(nome)
+            mensagens.append(res.mensagem)
+        elif res.valor:
+            registro[nome] = res.valor  # valor normalizado (máscara)
+
+    args = args_da_linha(registro)
+    nomes_completos = nomes_do_termo(len(args))
+    termo = validacao.validar_termo(dict(zip(nomes_completos, args)), consultar_cep, municipios)
+    campos.update(e.campo for e in termo.erros if e.campo)
+    for e in termo.erros:
+        if e.mensagem and e.mensagem not in mensagens:
+            mensagens.append(e.mensagem)
+
+    ok = termo.ok and not campos
+    if not ok and not mensagens:
+        mensagens.append("⚠️ Termo inválido.")
+    return {
+        "linha": n,
+        "ok": ok,
+        "campos": sorted(campos, key=lambda c: nomes_completos.index(c) if c in nomes_completos else 0),
+        "mensagens": mensagens,
+        "dados": termo.dados if ok else None,
+        "atividades": termo.atividades if ok else None,
+    }
+
+
+def validar_linha_semeada(n: int, registro: dict) -> dict:
+    """validar_linha com as respostas de semear() (roda nos processos do pool)."""
+    return validar_linha(n, registro, _cep_semeado, _dominio_semeado, _municipios())
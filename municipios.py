@@ -0,0 +1,209 @@
+"""
+Índice local dos municípios do IBGE (cidade/UF sem depender do ViaCEP).
+
+A tabela (municipios.csv: codigo_ibge;nome;uf) é carregada uma vez num
+índice por UF com:
+- chave sem acento/caixa/pontuação -> nome oficial: conferência em O(1);
+- índice de trigramas da chave: sugestões para nomes digitados com erro,
+  ordenadas pela semelhança (coeficiente de Dice dos trigramas).
+
+A tabela vai junto com o código (municipios.csv, na pasta deste módulo) e só
+é lida: importar o módulo não acessa a rede nem grava nada. Ela vem da API
+de localidades do IBGE; para gerar/atualizar (e depois versionar o arquivo):
+    python municipios.py --baixar [-o municipios.csv]
+Sem o arquivo, o índice fica vazio e cidade/UF ficam só com a conferência
+pelo ViaCEP.
+
+Configuração:
+- MUNICIPIOS_CSV: caminho da tabela (padrão: municipios.csv; caminho
+                  relativo é resolvido na pasta deste módulo)
+"""
+import argparse
+import csv
+import os
+import re
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from typing import NamedTuple
+
+IBGE_URL = "https://servicodados.ibge.gov.br/api/v1/localidades/municipios?view=nivelado"
+_PASTA = os.path.dirname(os.path.abspath(__file__))
+
+
+def _tabela_sem_acento() -> dict:
+    # letras acentuadas do Latin-1/Latin Extended-A -> letra base; pontuação
+    # comum em nomes de cidade ("Pau-d'Arco", "Sant’Ana") -> espaço
+    tabela = {}
+    for cp in range(0xC0, 0x250):
+        decomposto = unicodedata.normalize("NFD", chr(cp))
+        base = "".join(ch for ch in decomposto if unicodedata.category(ch) != "Mn")
+        if base != chr(cp) and base.isascii():
+            tabela[cp] = base
+    for ch in "-'’`´.":
+        tabela[ord(ch)] = " "
+    for cp in range(0x300, 0x370):   # acento solto que sobrar depois do NFC
+        tabela[cp] = None
+    return tabela
+
+_SEM_ACENTO = _tabela_sem_acento()
+
+
+@lru_cache(maxsize=4096)
+def chave_municipio(nome: str) -> str:
+    """Nome de cidade comparável: sem acento, minúsculo, espaços únicos."""
+    # NFC junta letra + acento combinante (texto NFD do macOS/celular) na
+    # letra acentuada que a tabela conhece
+    nome = unicodedata.normalize("NFC", nome or "")
+    return " ".join(nome.lower().translate(_SEM_ACENTO).split())
+
+
+def _trigramas(chave: str) -> set:
+    s = f"  {chave} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+class Municipio(NamedTuple):
+    codigo_ibge: str
+    nome: str
+    uf: str
+
+
+class _IndiceUF:
+    """Municípios de uma UF: chave exata + trigramas para sugestões."""
+
+    def __init__(self):
+        self.por_chave = {}        # chave -> Municipio
+        self.municipios = []       # posição -> Municipio
+        self.qtd_trigramas = []    # posição -> nº de trigramas da chave
+        self.trigramas = {}        # trigrama -> [posições]
+
+    def adicionar(self, m: Municipio):
+        chave = chave_municipio(m.nome)
+        if chave in self.por_chave:
+            return
+        pos = len(self.municipios)
+        self.por_chave[chave] = m
+        self.municipios.append(m)
+        tris = _trigramas(chave)
+        self.qtd_trigramas.append(len(tris))
+        for t in tris:
+            self.trigramas.setdefault(t, []).append(pos)
+
+    def parecidos(self, tris: set) -> list[tuple[float, Municipio]]:
+        comuns = Counter()
+        for t in tris:
+            comuns.update(self.trigramas.get(t, ()))
+        return [
+            (2 * n / (len(tris) + self.qtd_trigramas[pos]), self.municipios[pos])
+            for pos, n in comuns.items()
+        ]
+
+
+class IndiceMunicipios:
+    def __init__(self, municipios=()):
+        self._ufs = {}
+        self.carregar(municipios)
+
+    def carregar(self, municipios):
+        """Troca o conteúdo do índice de uma vez (consultas nunca veem a metade)."""
+        ufs = {}
+        for m in municipios:
+            ufs.setdefault(m.uf, _IndiceUF()).adicionar(m)
+        self._ufs = ufs
+
+    def __len__(self):
+        return sum(len(i.municipios) for i in self._ufs.values())
+
+    def buscar(self, cidade: str, uf: str) -> Municipio | None:
+        """Município com esse nome (sem diferenciar acento/caixa) na UF."""
+        idx = self._ufs.get((uf or "").strip().upper())
+        return idx.por_chave.get(chave_municipio(cidade)) if idx else None
+
+    def sugestoes(self, cidade: str, uf: str | None = None, limite: int = 5,
+                  minimo: float = 0.45) -> list[Municipio]:
+        """
+        Municípios mais parecidos com `cidade` (na UF, ou em todas se a UF
+        não for informada), do mais ao menos semelhante.
+        """
+        chave = chave_municipio(cidade)
+        if not chave:
+            return []
+        tris = _trigramas(chave)
+        uf = (uf or "").strip().upper()
+        indices = [self._ufs[uf]] if uf in self._ufs else list(self._ufs.values())
+        candidatos = [c for idx in indices for c in idx.parecidos(tris) if c[0] >= minimo]
+        candidatos.sort(key=lambda c: (-c[0], c[1].nome))
+        return [m for _, m in candidatos[:limite]]
+
+    def ufs_do_nome(self, cidade: str) -> list[str]:
+        """UFs que têm um município com esse nome."""
+        chave = chave_municipio(cidade)
+        return sorted(uf for uf, idx in self._ufs.items() if chave in idx.por_chave)
+
+
+def importar_csv(caminho: str) -> list[Municipio]:
+    with open(caminho, encoding="utf-8-sig", newline="") as f:
+        primeira = f.readline()
+        sep = ";" if primeira.count(";") >= primeira.count(",") else ","
+        f.seek(0)
+        leitor = csv.reader(f, delimiter=sep)
+        cab = [re.sub(r"[^a-z_]", "", c.strip().lower()) for c in next(leitor)]
+        col = {c: i for i, c in enumerate(cab)}
+        i_cod = col.get("codigo_ibge", col.get("codigo", 0))
+        i_nome = col.get("nome", col.get("municipio", 1))
+        i_uf = col.get("uf", 2)
+        return [
+            Municipio(linha[i_cod].strip(), linha[i_nome].strip(), linha[i_uf].strip().upper())
+            for linha in leitor if len(linha) > max(i_cod, i_nome, i_uf) and linha[i_nome].strip()
+        ]
+
+
+def caminho_tabela() -> str:
+    return os.path.join(_PASTA, os.getenv("MUNICIPIOS_CSV", "municipios.csv"))
+
+
+def abrir_indice_municipios() -> IndiceMunicipios:
+    """Carrega a tabela versionada (só leitura); sem ela, índice vazio."""
+    caminho = caminho_tabela()
+    try:
+        municipios = importar_csv(caminho)
+    except FileNotFoundError:
+        print(f"[MUNICIPIOS] {caminho} não encontrado: cidade/UF só pelo ViaCEP "
+              f"(gere com: python municipios.py --baixar)")
+        return IndiceMunicipios()
+    except (OSError, csv.Error, StopIteration) as e:
+        print(f"[MUNICIPIOS][ERRO] {type(e).__name__}: {e}")
+        return IndiceMunicipios()
+    indice = IndiceMunicipios(municipios)
+    print(f"[MUNICIPIOS] {len(indice)} municípios carregados de {caminho}")
+    return indice
+
+
+def baixar_ibge(caminho: str, timeout: float = 60) -> int:
+    """Baixa a lista de municípios da API do IBGE e grava o CSV do índice."""
+    import httpx
+
+    r = httpx.get(IBGE_URL, timeout=timeout)
+    r.raise_for_status()
+    linhas = sorted(
+        (str(m["municipio-id"]), m["municipio-nome"], m["UF-sigla"]) for m in r.json()
+    )
+    tmp = f"{caminho}.tmp"
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(["codigo_ibge", "nome", "uf"])
+        w.writerows(linhas)
+    os.replace(tmp, caminho)
+    return len(linhas)
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Tabela de municípios do IBGE usada na validação de cidade/UF.")
+    p.add_argument("--baixar", action="store_true", help="baixa a tabela da API do IBGE")
+    p.add_argument("-o", "--saida", default=caminho_tabela())
+    a = p.parse_args()
+    if a.baixar:
+        print(f"{baixar_ibge(a.saida)} municípios gravados em {a.saida}")
+    else:
+        print(f"{len(abrir_indice_municipios())} municípios no índice")
@@ -0,0 +1,235 @@
+"""
+Consulta de CEP em vários provedores, com requisições "hedged".
+
+Cada provedor (ViaCEP, BrasilAPI, OpenCEP ou um espelho interno) devolve o
+endereço já normalizado no formato do ViaCEP (cep, logradouro, complemento,
+bairro, localidade, uf), que é o que validacao.py consome; None = CEP
+inexistente.
+
+A consulta vai primeiro ao provedor preferido. Se ele não responder dentro
+do seu p95 de latência (últimas respostas), dispara-se o próximo provedor em
+paralelo e vale a primeira resposta com endereço; erro de um provedor
+dispara o próximo na hora. Cada provedor tem o seu disjuntor (ver
+disjuntores.py): provedor fora do ar nem é tentado.
+
+Configuração:
+- CEP_PROVEDORES:     ordem de preferência (padrão "viacep,brasilapi,opencep")
+- CEP_ESPELHO_URL:    espelho interno no formato do ViaCEP, ex.
+                      "http://cep.interno/ws/{cep}/json/" (entra em primeiro)
+- CEP_HEDGE_PADRAO_S: espera antes do 2º provedor enquanto não há amostras
+                      para o p95 (padrão 0.8)
+- CEP_HEDGE_MIN_S:    espera mínima antes do 2º provedor (padrão 0.15)
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import httpx
+
+from disjuntores import CircuitoAberto, abrir_disjuntor
+
+_AMOSTRAS_MIN = 20     # respostas antes de confiar no p95
+
+
+class CepIndisponivel(Exception):
+    """Nenhum provedor respondeu dentro do prazo."""
+
+
+def _de_viacep(d: dict, cep8: str) -> dict | None:
+    return None if d.get("erro") else d
+
+
+def _de_brasilapi(d: dict, cep8: str) -> dict | None:
+    return {
+        "cep": f"{cep8[:5]}-{cep8[5:]}",
+        "logradouro": d.get("street") or "",
+        "complemento": "",
+        "bairro": d.get("neighborhood") or "",
+        "localidade": d.get("city") or "",
+        "uf": d.get("state") or "",
+    }
+
+
+# nome -> (URL, normalização para o formato do ViaCEP)
+PROVEDORES = {
+    "viacep":    ("https://viacep.com.br/ws/{cep}/json/", _de_viacep),
+    "brasilapi": ("https://brasilapi.com.br/api/cep/v1/{cep}", _de_brasilapi),
+    "opencep":   ("https://opencep.com/v1/{cep}", _de_viacep),
+}
+
+
+class ProvedorCep:
+    def __init__(self, nome: str, url: str, normalizar):
+        self.nome = nome
+        self.url = url
+        self.normalizar = normalizar
+        self.disjuntor = abrir_disjuntor(f"cep:{nome}")
+        self.latencias = deque(maxlen=200)
+        self._lock = threading.Lock()
+        self._cliente = httpx.Client()  # conexões reaproveitadas entre consultas
+
+    def p95(self) -> float | None:
+        with self._lock:
+            if len(self.latencias) < _AMOSTRAS_MIN:
+                return None
+            ordenadas = sorted(self.latencias)
+        return ordenadas[int(0.95 * (len(ordenadas) - 1))]
+
+    def consultar(self, cep8: str, timeout: float) -> dict | None:
+        """Uma consulta (já liberada pelo disjuntor); levanta em falha do provedor."""
+        inicio = time.monotonic()
+        try:
+            r = self._cliente.get(self.url.format(cep=cep8), timeout=timeout)
+            if r.status_code == 404:
+                info = None  # BrasilAPI/OpenCEP: CEP inexistente
+            else:
+                r.raise_for_status()
+                info = self.normalizar(r.json(), cep8)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code >= 500:
+                self.disjuntor.falha(f"HTTP {e.response.status_code}")
+            else:
+                self.disjuntor.sucesso()  # respondeu; a consulta é que não serve
+            raise
+        except (httpx.HTTPError, ValueError, AttributeError) as e:
+            self.disjuntor.falha(f"{type(e).__name__}: {e}")
+            raise
+        self.disjuntor.sucesso()
+        with self._lock:
+            self.latencias.append(time.monotonic() - inicio)
+        return info
+
+
+class ResolvedorCep:
+    def __init__(self, provedores: list[ProvedorCep], timeout: float = 4.0,
+                 atraso_padrao: float = 0.8, atraso_min: float = 0.15):
+        self.provedores = provedores
+        self.timeout = timeout
+        self.atraso_padrao = atraso_padrao
+        self.atraso_min = atraso_min
+        self._pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="cep")
+        self._lock = threading.Lock()
+        self.consultas = self.hedges = self.vitorias_hedge = 0
+
+    def _atraso(self, p: ProvedorCep) -> float:
+        p95 = p.p95()
+        atraso = p95 if p95 is not None else self.atraso_padrao
+        return min(max(atraso, self.atraso_min), self.timeout / 2)
+
+    def consultar(self, cep8: str) -> dict | None:
+        """Endereço do CEP no formato do ViaCEP, ou None se não existe."""
+        limite = time.monotonic() + self.timeout
+        candidatos = list(self.provedores)
+        pendentes = {}       # future -> provedor
+        erros = []
+
+        def disparar() -> ProvedorCep | None:
+            while candidatos:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return None
+                p = candidatos.pop(0)
+                if p.disjuntor.permitir():
+                    pendentes[self._pool.submit(p.consultar, cep8, restante)] = p
+                    return p
+            return None
+
+        primeiro = disparar()
+        if primeiro is None:
+            raise CircuitoAberto("cep")
+        with self._lock:
+            self.consultas += 1
+        proximo = time.monotonic() + self._atraso(primeiro)
+        nao_encontrado = False
+
+        while pendentes:
+            agora = time.monotonic()
+            if agora >= limite:
+                break
+            prazo = min(limite, proximo) if candidatos else limite
+            feitos, _ = wait(pendentes, timeout=max(prazo - agora, 0), return_when=FIRST_COMPLETED)
+            falhou = False
+            for f in feitos:
+                p = pendentes.pop(f)
+                try:
+                    info = f.result()
+                except Exception as e:
+                    erros.append(f"{p.nome}: {type(e).__name__}")
+                    falhou = True
+                    continue
+                if info:
+                    if p is not primeiro:
+                        with self._lock:
+                            self.vitorias_hedge += 1
+                    return info
+                nao_encontrado = True
+
+            if nao_encontrado and not pendentes:
+                break
+            if not feitos or falhou:
+                # passou o p95 do mais recente (hedge) ou um provedor falhou (failover)
+                p = disparar()
+                if p is not None:
+                    if not feitos:
+                        with self._lock:
+                            self.hedges += 1
+                    proximo = time.monotonic() + self._atraso(p)
+
+        if nao_encontrado:
+            return None
+        raise CepIndisponivel("; ".join(erros) or "tempo esgotado")
+
+    def sondar(self, cep8: str = "01001000", timeout: float = 5.0) -> tuple[bool, str]:
+        """
+        Consulta um CEP conhecido em cada provedor (sonda de saúde); ok se ao
+        menos um devolve o endereço. O resultado alimenta os disjuntores, como
+        uma consulta normal.
+        """
+        partes, algum_ok = [], False
+        for p in self.provedores:
+            try:
+                info = p.consultar(cep8, timeout)
+            except Exception as e:
+                partes.append(f"{p.nome}: {type(e).__name__}")
+                continue
+            algum_ok = algum_ok or bool(info)
+            partes.append(f"{p.nome}: {'ok' if info else 'sem endereço'}")
+        return algum_ok, "; ".join(partes)
+
+    def estado(self) -> dict:
+        return {
+            "consultas": self.consultas,
+            "hedges": self.hedges,
+            "vitorias_hedge": self.vitorias_hedge,
+            "provedores": [
+                {
+                    "nome": p.nome,
+                    "p95_ms": round(p95 * 1000) if (p95 := p.p95()) is not None else None,
+                    "amostras": len(p.latencias),
+                    "disjuntor": p.disjuntor.estado()["estado"],
+                }
+                for p in self.provedores
+            ],
+        }
+
+
+def abrir_resolvedor_cep(timeout: float = 4.0) -> ResolvedorCep:
+    """Provedores na ordem do ambiente (ver docstring do módulo)."""
+    provedores = []
+    espelho = os.getenv("CEP_ESPELHO_URL")
+    if espelho:
+        provedores.append(ProvedorCep("espelho", espelho, _de_viacep))
+    for nome in os.getenv("CEP_PROVEDORES", "viacep,brasilapi,opencep").split(","):
+        nome = nome.strip().lower()
+        if nome in PROVEDORES:
+            provedores.append(ProvedorCep(nome, *PROVEDORES[nome]))
+        elif nome:
+            print(f"[CEP] provedor desconhecido ignorado: {nome}")
+    return ResolvedorCep(
+        provedores,
+        timeout=timeout,
+        atraso_padrao=float(os.getenv("CEP_HEDGE_PADRAO_S", 0.8)),
+        atraso_min=float(os.getenv("CEP_HEDGE_MIN_S", 0.15)),
+    )
@@ -0,0 +1,116 @@
+"""
+Rascunho do formulário: salvamento automático e retomada.
+
+O navegador grava o rascunho no localStorage a cada alteração (ver
+JS_SALVAR em app.py) e envia a mesma foto ao servidor, que guarda uma cópia
+compacta no cache (namespace "rascunho"), pela chave de sessão emitida pelo
+servidor na primeira visita (novo_token; o navegador a guarda no
+localStorage e num cookie). A cópia do servidor cobre
+o caso em que o localStorage não está disponível ou foi perdido (modo
+privado, cota cheia).
+
+A cópia compacta leva só os campos preenchidos (fora do valor inicial do
+componente) e, para cada campo que já passou pelos validadores com o valor
+atual, uma marca (hash de campo+valor). Na retomada, o campo cuja marca
+confere com o valor restaurado volta como validado, sem repetir ViaCEP/DNS;
+qualquer mudança no valor invalida a marca. Depois que o termo é
+encaminhado, as duas cópias (navegador e servidor) são descartadas.
+
+Os rascunhos têm dados pessoais em claro: no backend em memória ficam fora
+do snapshot em disco (cache.NS_SO_MEMORIA); no SQLite ficam no arquivo do
+cache, que deve ter a mesma proteção do histórico.
+
+Configuração:
+- RASCUNHO_TTL_DIAS:  validade da cópia no servidor (padrão 7)
+- RASCUNHO_MAX_KB:    tamanho máximo aceito por rascunho (padrão 64)
+"""
+import hashlib
+import json
+import os
+import re
+import secrets
+import time
+
+RASCUNHO_TTL = float(os.getenv("RASCUNHO_TTL_DIAS", 7)) * 86400
+RASCUNHO_MAX_BYTES = int(float(os.getenv("RASCUNHO_MAX_KB", 64)) * 1024)
+
+_TOKEN_OK = re.compile(r"[A-Za-z0-9_-]{16,64}")
+
+
+def token_valido(token) -> bool:
+    return isinstance(token, str) and _TOKEN_OK.fullmatch(token) is not None
+
+
+def novo_token() -> str:
+    return secrets.token_urlsafe(24)   # 32 caracteres, aceito por token_valido
+
+
+def marca(campo: str, valor) -> str:
+    """Marca de 'validado com este valor' (não sai do servidor)."""
+    bruto = json.dumps([campo, valor], ensure_ascii=False)
+    return hashlib.blake2b(bruto.encode(), digest_size=8).hexdigest()
+
+
+def _preenchido(valor) -> bool:
+    return valor not in (None, "", [])
+
+
+def compactar(valores: dict, atividades: list, validados: set, em_erro, iniciais=None) -> dict:
+    """
+    Rascunho compacto: {"v": campos preenchidos, "a": atividades (sem as
+    vazias do fim), "m": marcas dos validados, "e": campos em vermelho,
+    "t": quando foi salvo}. Campo ainda no valor de `iniciais` não conta como
+    preenchido (formulário em branco = rascunho vazio).
+    """
+    iniciais = iniciais or {}
+    v = {c: x for c, x in valores.items()
+         if _preenchido(x) and not (c in iniciais and iniciais[c] == x)}
+    a = list(atividades)
+    while a and not _preenchido(a[-1]):
+        a.pop()
+    return {
+        "v": v,
+        "a": a,
+        "m": {c: marca(c, v[c]) for c in validados if c in v},
+        "e": sorted(c for c in (em_erro or ()) if c in v),
+        "t": time.time(),
+    }
+
+
+def vazio(rascunho: dict | None) -> bool:
+    return not rascunho or not (rascunho.get("v") or rascunho.get("a"))
+
+
+def conferidos(rascunho: dict, valores: dict) -> set:
+    """Campos de `valores` cuja marca no rascunho confere com o valor atual."""
+    marcas = rascunho.get("m") or {}
+    return {c for c, m in marcas.items() if c in valores and marca(c, valores[c]) == m}
+
+
+class Rascunhos:
+    """Cópias dos rascunhos no cache do app (memória ou SQLite, ver cache.py)."""
+
+    def __init__(self, cache, ttl: float = RASCUNHO_TTL, max_bytes: int = RASCUNHO_MAX_BYTES):
+        self.cache = cache
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    def salvar(self, token: str, rascunho: dict) -> bool:
+        if not token_valido(token):
+            return False
+        if vazio(rascunho):
+            self.descartar(token)
+            return True
+        if len(json.dumps(rascunho, ensure_ascii=False).encode()) > self.max_bytes:
+            return False
+        self.cache.set("rascunho", token, rascunho, self.ttl)
+        return True
+
+    def carregar(self, token: str) -> dict | None:
+        if not token_valido(token):
+            return None
+        return self.cache.get("rascunho", token)
+
+    def descartar(self, token: str):
+        if token_valido(token):
+            self.cache.liberar("rascunho", token)
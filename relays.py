@@ -0,0 +1,267 @@
+"""
+Envio SMTP por vários relays, com failover e limite de taxa por relay.
+
+Cada relay tem:
+- peso: participação no rodízio ponderado (smooth weighted round-robin);
+- saúde (0..1): média móvel dos últimos envios; relay com falhas recebe
+  menos mensagens e, em erro temporário (421/45x, conexão), fica em espera
+  por um intervalo que dobra a cada falha seguida;
+- balde de fichas: envios por minuto e rajada, conforme o limite do provedor.
+
+Uma mensagem vai para o próximo relay do rodízio que esteja saudável e tenha
+ficha; se ele falhar por motivo do relay, tenta o seguinte. Recusa definitiva
+do destinatário/remetente (5xx) não troca de relay: seria recusada em todos.
+Erro depois que o relay aceitou a mensagem (ex.: no QUIT) também não: a
+mensagem já foi, e outro relay mandaria uma cópia.
+
+Configuração:
+- SMTP_RELAYS: JSON com a lista de relays, ex.:
+    [{"nome": "principal", "host": "smtp.a", "port": 587, "user": "...",
+      "senha": "...", "tls": true, "peso": 3, "por_minuto": 30, "rajada": 5}, ...]
+  Sem SMTP_RELAYS vale um único relay de SMTP_HOST/SMTP_PORT/SMTP_USER/
+  SMTP_PASS/SMTP_TLS (limite opcional em SMTP_POR_MINUTO).
+- SMTP_ESPERA_MAX: segundos que um envio aguarda por ficha livre (padrão 10).
+Os limites são por processo: com WORKERS > 1 cada worker usa a sua fração.
+"""
+import json
+import os
+import smtplib
+import threading
+import time
+
+from anexos import enviar_com_anexos
+
+_TEMPORARIOS = {421, 450, 451, 452, 454}
+
+
+class MensagemAceita(Exception):
+    """Erro depois que o servidor já aceitou a mensagem (ex.: resposta ao QUIT)."""
+
+
+class BaldeDeFichas:
+    """Token bucket: `taxa` fichas/s, até `capacidade` acumuladas."""
+
+    def __init__(self, taxa: float, capacidade: float):
+        self.taxa = taxa
+        self.capacidade = max(capacidade, 1.0)
+        self._fichas = self.capacidade
+        self._em = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _repor(self, agora: float):
+        self._fichas = min(self.capacidade, self._fichas + (agora - self._em) * self.taxa)
+        self._em = agora
+
+    def tentar(self) -> bool:
+        if not self.taxa:
+            return True  # sem limite
+        with self._lock:
+            self._repor(time.monotonic())
+            if self._fichas >= 1:
+                self._fichas -= 1
+                return True
+            return False
+
+    def espera(self) -> float:
+        """Segundos até haver uma ficha."""
+        if not self.taxa:
+            return 0.0
+        with self._lock:
+            self._repor(time.monotonic())
+            return max(0.0, (1 - self._fichas) / self.taxa)
+
+
+class Relay:
+    def __init__(self, nome, host, port=587, user=None, senha=None, tls=True,
+                 peso=1, por_minuto=0, rajada=None, divisor=1):
+        self.nome = nome or host or "smtp"
+        self.host, self.port = host, int(port)
+        self.user, self.senha, self.tls = user, senha, tls
+        self.peso = max(float(peso), 0.01)
+        taxa = float(por_minuto or 0) / 60 / max(divisor, 1)
+        self.balde = BaldeDeFichas(taxa, float(rajada or max(1, (por_minuto or 1) // 10)) / max(divisor, 1))
+        self.saude = 1.0
+        self.falhas_seguidas = 0
+        self.pausado_ate = 0.0
+        self.atual = 0.0            # estado do rodízio ponderado
+        self.enviados = self.falhas = 0
+        self.ultimo_erro = ""
+
+    def disponivel(self, agora: float) -> bool:
+        return agora >= self.pausado_ate
+
+    def peso_efetivo(self) -> float:
+        return self.peso * max(self.saude, 0.05)
+
+    def sucesso(self):
+        self.saude = 0.8 * self.saude + 0.2
+        self.falhas_seguidas = 0
+        self.enviados += 1
+
+    def falha(self, erro: str, temporaria: bool):
+        self.saude *= 0.5
+        self.falhas_seguidas += 1
+        self.falhas += 1
+        self.ultimo_erro = erro
+        if temporaria:
+            pausa = min(300.0, 5.0 * 2 ** (self.falhas_seguidas - 1))
+            self.pausado_ate = time.monotonic() + pausa
+
+    def sondar(self, timeout: float = 5.0):
+        """EHLO + NOOP, sem login nem envio (sonda de saúde). Levanta em falha."""
+        if not self.host:
+            raise OSError("relay sem host configurado")
+        with smtplib.SMTP(self.host, self.port, timeout=timeout) as server:
+            server.ehlo()
+            code, resp = server.noop()
+            if code != 250:
+                raise smtplib.SMTPResponseException(code, resp)
+
+    def enviar(self, msg, anexos=()):
+        aceita = False
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=30) as server:
+                if self.tls:
+                    server.starttls()
+                if self.user and self.senha:
+                    server.login(self.user, self.senha)
+                if anexos:
+                    enviar_com_anexos(server, msg, anexos)
+                else:
+                    server.send_message(msg)
+                aceita = True
+        except (smtplib.SMTPException, OSError) as e:
+            if aceita:
+                # o DATA já foi aceito: trocar de relay duplicaria o e-mail
+                raise MensagemAceita(f"{type(e).__name__}: {e}") from e
+            raise
+
+
+class PoolRelays:
+    def __init__(self, relays: list[Relay], espera_max: float = 10.0):
+        self.relays = relays
+        self.espera_max = espera_max
+        self._lock = threading.Lock()
+
+    def _ordem(self) -> list[Relay]:
+        """
+        Próximos relays a tentar: o escolhido pelo rodízio ponderado (nginx
+        smooth WRR, com o peso corrigido pela saúde) e depois os demais
+        disponíveis, do mais ao menos saudável.
+        """
+        agora = time.monotonic()
+        with self._lock:
+            ativos = [r for r in self.relays if r.disponivel(agora)]
+            if not ativos:
+                # todos em pausa: tenta primeiro o que volta mais cedo
+                return sorted(self.relays, key=lambda r: r.pausado_ate)
+            total = 0.0
+            for r in ativos:
+                r.atual += r.peso_efetivo()
+                total += r.peso_efetivo()
+            escolhido = max(ativos, key=lambda r: r.atual)
+            escolhido.atual -= total
+        resto = sorted((r for r in ativos if r is not escolhido), key=lambda r: -r.saude)
+        return [escolhido, *resto]
+
+    def _falha(self, relay: Relay, erro: str, temporaria: bool):
+        with self._lock:
+            relay.falha(erro, temporaria)
+        print(f"[EMAIL][RELAY] {relay.nome} falhou ({erro}); saúde {relay.saude:.2f}")
+
+    def enviar(self, msg, anexos=()) -> tuple[bool, str]:
+        """
+        Envia `msg` (EmailMessage), com os `anexos` do spool (ver anexos.py).
+        Retorna (ok, relay ou descrição do erro).
+        """
+        limite = time.monotonic() + self.espera_max
+        erros = []
+        while True:
+            tentou = False
+            for relay in self._ordem():
+                if not relay.balde.tentar():
+                    continue
+                tentou = True
+                try:
+                    relay.enviar(msg, anexos)
+                except MensagemAceita as e:
+                    # entregue; só o encerramento da conexão falhou
+                    print(f"[EMAIL][RELAY] {relay.nome}: mensagem aceita, erro ao encerrar ({e})")
+                    with self._lock:
+                        relay.sucesso()
+                    return True, relay.nome
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused) as e:
+                    codigo = getattr(e, "smtp_code", None) or min(
+                        (c for c, _ in getattr(e, "recipients", {}).values()), default=550)
+                    if codigo not in _TEMPORARIOS:
+                        # recusa definitiva da mensagem: outro relay não resolve
+                        return False, f"{relay.nome}: {type(e).__name__}: {e}"
+                    self._falha(relay, f"{codigo}", temporaria=True)
+                    erros.append(f"{relay.nome}: {codigo}")
+                except smtplib.SMTPResponseException as e:
+                    self._falha(relay, f"{e.smtp_code} {e.smtp_error!r}",
+                                temporaria=e.smtp_code in _TEMPORARIOS)
+                    erros.append(f"{relay.nome}: {e.smtp_code}")
+                except (smtplib.SMTPException, OSError) as e:
+                    self._falha(relay, f"{type(e).__name__}: {e}", temporaria=True)
+                    erros.append(f"{relay.nome}: {type(e).__name__}: {e}")
+                else:
+                    with self._lock:
+                        relay.sucesso()
+                    return True, relay.nome
+            if tentou:
+                return False, "todos os relays falharam (" + "; ".join(erros) + ")"
+            # nenhum relay com ficha livre: espera a próxima (até espera_max)
+            espera = min(r.balde.espera() for r in self.relays)
+            if time.monotonic() + espera > limite:
+                return False, "limite de envio dos relays atingido; tente novamente em instantes"
+            time.sleep(max(espera, 0.01))
+
+    def sondar(self, timeout: float = 5.0) -> tuple[bool, str]:
+        """Sonda cada relay; ok se ao menos um responde (não mexe na saúde do rodízio)."""
+        partes, algum_ok = [], False
+        for r in self.relays:
+            try:
+                r.sondar(timeout)
+            except (smtplib.SMTPException, OSError) as e:
+                partes.append(f"{r.nome}: {type(e).__name__}: {e}")
+            else:
+                algum_ok = True
+                partes.append(f"{r.nome}: ok")
+        return algum_ok, "; ".join(partes)
+
+    def estado(self) -> list[dict]:
+        agora = time.monotonic()
+        return [
+            {
+                "nome": r.nome,
+                "peso": r.peso,
+                "saude": round(r.saude, 3),
+                "pausado_por_s": round(max(0.0, r.pausado_ate - agora), 1),
+                "fichas_por_min": round(r.balde.taxa * 60, 2),
+                "enviados": r.enviados,
+                "falhas": r.falhas,
+                "ultimo_erro": r.ultimo_erro,
+            }
+            for r in self.relays
+        ]
+
+
+def abrir_relays() -> PoolRelays:
+    """Monta o pool a partir do ambiente (ver docstring do módulo)."""
+    divisor = int(os.getenv("WORKERS", 1))
+    bruto = os.getenv("SMTP_RELAYS")
+    if bruto:
+        config = json.loads(bruto)
+    else:
+        config = [{
+            "nome": os.getenv("SMTP_HOST"),
+            "host": os.getenv("SMTP_HOST"),
+            "port": int(os.getenv("SMTP_PORT", 587)),
+            "user": os.getenv("SMTP_USER"),
+            "senha": os.getenv("SMTP_PASS"),
+            "tls": os.getenv("SMTP_TLS", "true").lower() == "true",
+            "por_minuto": int(os.getenv("SMTP_POR_MINUTO", 0)),
+        }]
+    relays = [Relay(**c, divisor=divisor) for c in config]
+    return PoolRelays(relays, espera_max=float(os.getenv("SMTP_ESPERA_MAX", 10)))
@@ -0,0 +1,106 @@
+"""
+Sondas de saúde dos serviços externos (SMTP, CEP, DNS) em segundo plano.
+
+Uma thread roda todas as sondas a cada SAUDE_INTERVALO segundos e guarda o
+último resultado de cada uma. /readyz só lê esse resultado: a verificação de
+saúde custa microssegundos e nunca toca nos serviços externos.
+
+A instância está pronta quando todas as sondas críticas passaram na última
+rodada, e essa rodada é recente (até 3 intervalos). As demais só aparecem
+como degradadas, porque têm alternativa (CEP/DNS caem no "não foi possível
+validar agora").
+
+Configuração:
+- SAUDE_INTERVALO: segundos entre rodadas (padrão 30; 0 desliga as sondas)
+- SAUDE_TIMEOUT:   timeout de cada sonda, em segundos (padrão 5)
+- SAUDE_CRITICAS:  sondas críticas, separadas por vírgula (padrão "smtp")
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, NamedTuple
+
+SAUDE_INTERVALO = float(os.getenv("SAUDE_INTERVALO", 30))
+SAUDE_TIMEOUT = float(os.getenv("SAUDE_TIMEOUT", 5))
+SAUDE_CRITICAS = {c.strip() for c in os.getenv("SAUDE_CRITICAS", "smtp").split(",") if c.strip()}
+
+
+class ResultadoSonda(NamedTuple):
+    ok: bool
+    detalhe: str
+    em: float          # time.time() do fim da sonda
+    duracao_ms: int
+
+
+class Monitor:
+    """Roda as sondas periodicamente; `sondas`: nome -> fn() -> (ok, detalhe)."""
+
+    def __init__(self, sondas: dict[str, Callable[[], tuple[bool, str]]],
+                 intervalo: float = SAUDE_INTERVALO, criticas: set = SAUDE_CRITICAS):
+        self.sondas = sondas
+        self.intervalo = intervalo
+        self.criticas = set(criticas)
+        self.resultados: dict[str, ResultadoSonda] = {}
+        self._parar = threading.Event()
+        self._thread = None
+
+    def _rodar(self, nome: str, fn) -> ResultadoSonda:
+        inicio = time.perf_counter()
+        try:
+            ok, detalhe = fn()
+        except Exception as e:
+            ok, detalhe = False, f"{type(e).__name__}: {e}"
+        return ResultadoSonda(bool(ok), detalhe, time.time(), round((time.perf_counter() - inicio) * 1000))
+
+    def rodar_uma_vez(self):
+        with ThreadPoolExecutor(max_workers=len(self.sondas) or 1) as ex:
+            futuros = {nome: ex.submit(self._rodar, nome, fn) for nome, fn in self.sondas.items()}
+        novos = {nome: f.result() for nome, f in futuros.items()}
+        for nome, r in novos.items():
+            anterior = self.resultados.get(nome)
+            if anterior is None or anterior.ok != r.ok:
+                print(f"[SAUDE] {nome}: {'ok' if r.ok else 'falhou'} ({r.detalhe})")
+        self.resultados = novos  # troca o dicionário inteiro: leitura sem lock
+
+    def _laco(self):
+        while not self._parar.is_set():
+            self.rodar_uma_vez()
+            self._parar.wait(self.intervalo)
+
+    def iniciar(self):
+        if self.intervalo <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._laco, name="sondas", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+
+    def prontidao(self) -> tuple[bool, dict]:
+        """(pronta?, corpo da resposta do /readyz), só com o que já está guardado."""
+        if self.intervalo <= 0:
+            return True, {"situacao": "pronta", "sondas": {}}  # sondas desligadas
+        agora = time.time()
+        resultados = self.resultados
+        sondas, pronta = {}, True
+        for nome in self.sondas:
+            r = resultados.get(nome)
+            critica = nome in self.criticas
+            if r is None:
+                sondas[nome] = {"ok": None, "critica": critica, "detalhe": "aguardando a primeira sonda"}
+                pronta = pronta and not critica
+                continue
+            recente = agora - r.em <= 3 * self.intervalo
+            sondas[nome] = {
+                "ok": r.ok,
+                "critica": critica,
+                "detalhe": r.detalhe,
+                "idade_s": round(agora - r.em, 1),
+                "duracao_ms": r.duracao_ms,
+            }
+            if critica and not (r.ok and recente):
+                pronta = False
+        degradada = any(s["ok"] is False for s in sondas.values())
+        situacao = "pronta" if pronta and not degradada else ("degradada" if pronta else "indisponivel")
+        return pronta, {"situacao": situacao, "sondas": sondas}
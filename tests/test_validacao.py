@@ -0,0 +1,204 @@
+"""Regras de validacao.py, sem Gradio nem rede (consultas simuladas)."""
+from datetime import date, timedelta
+
+import pytest
+
+import validacao
+from municipios import IndiceMunicipios, Municipio
+from validacao import NOMES_FINAIS, NOMES_FIXOS, MIN_ATIVIDADES, Resultado
+
+ENDERECO_CEP = {
+    "cep": "73840-000", "logradouro": "Rua 1", "complemento": "", "bairro": "Centro",
+    "localidade": "Campos Belos", "uf": "GO",
+}
+
+
+def consultar_cep(cep8):
+    return ENDERECO_CEP if cep8 == "73840000" else None
+
+
+def sem_rede(*_):
+    raise AssertionError("não deveria consultar a rede")
+
+
+# ------------------------------ campos ------------------------------
+
+@pytest.mark.parametrize("entrada, esperado", [
+    ("73840000", Resultado("73840-000")),
+    ("73.840-000", Resultado("73840-000")),
+    ("", Resultado("")),
+])
+def test_cep_valido_sai_formatado(entrada, esperado):
+    assert validacao.validar_cep(entrada) == esperado
+
+
+@pytest.mark.parametrize("entrada, erro", [("123", "cep_formato"), ("00000-000", "cep_nulo")])
+def test_cep_invalido_limpa_o_campo(entrada, erro):
+    res = validacao.validar_cep(entrada)
+    assert (res.valor, res.erro) == ("", erro)
+
+
+def test_cnpj_e_cpf_formatados():
+    assert validacao.validar_cnpj_cpf("11222333000181").valor == "11.222.333/0001-81"
+    assert validacao.validar_cnpj_cpf("52998224725").valor == "529.982.247-25"
+    assert validacao.validar_cnpj_cpf("11222333000182").erro == "cnpj_invalido"
+    assert validacao.validar_cnpj_cpf("123").erro == "documento_invalido"
+
+
+def test_cpf_confere_digitos():
+    assert validacao.validar_cpf("529.982.247-25").ok
+    assert validacao.validar_cpf("529.982.247-24").erro == "cpf_dv"
+    assert validacao.validar_cpf("111.111.111-11").erro == "cpf_dv"
+    assert validacao.validar_cpf("5299").erro == "cpf_formato"
+
+
+def test_telefone_formatado():
+    assert validacao.validar_telefone("62912345678").valor == "(62) 91234-5678"
+    assert validacao.validar_telefone("6223456789").valor == "(62) 2345-6789"
+    assert validacao.validar_telefone("00912345678").erro == "telefone_invalido"
+
+
+@pytest.mark.parametrize("entrada, esperado", [
+    ("30", "30h"), ("22h30min", "22h30min"), ("22:30", "22h30min"), ("22,5", "22h30min"),
+])
+def test_horas_semanais(entrada, esperado):
+    assert validacao.validar_horas_semanais(entrada).valor == esperado
+
+
+def test_horas_semanais_acima_de_40():
+    assert validacao.validar_horas_semanais("41").erro == "horas_acima_limite"
+
+
+def test_representante_menor_de_idade():
+    hoje = date.today()
+    assert validacao.validar_nascimento_representante((hoje - timedelta(days=365 * 10)).isoformat()).erro \
+        == "menor_de_idade"
+    assert validacao.validar_nascimento_representante("1980-01-01").ok
+    assert validacao.validar_nascimento_estudante((hoje + timedelta(days=1)).isoformat()).erro == "data_futura"
+
+
+def test_total_dias_sem_finais_de_semana_e_com_feriados():
+    # 2024-01-01 é segunda: a semana inteira tem 5 dias úteis
+    assert validacao.calcular_total_dias("2024-01-01", "2024-01-07", "Sim", 0).valor == "5 dias"
+    assert validacao.calcular_total_dias("2024-01-01", "2024-01-07", "Não", 1).valor == "6 dias"
+    assert validacao.calcular_total_dias("2024-01-07", "2024-01-01", "Sim", 0).erro == "periodo_invertido"
+
+
+# ------------------------------ e-mail ------------------------------
+
+def test_email_de_dominio_conhecido_nao_consulta_dns():
+    assert validacao.validar_email("fulana@gmail.com", sem_rede) == Resultado("fulana@gmail.com")
+
+
+def test_email_com_erro_de_digitacao_so_sugere_se_o_dominio_existe():
+    res = validacao.validar_email("fulana@gmial.com", lambda d: True)
+    assert res.ok and res.valor == "fulana@gmial.com"
+    assert "fulana@gmail.com" in res.mensagem
+
+
+def test_email_com_erro_de_digitacao_sem_mx_reprova_com_sugestao():
+    res = validacao.validar_email("fulana@gmial.com", lambda d: False)
+    assert res.erro == "dominio_sem_mx"
+    assert res.valor == "fulana@gmial.com" and "fulana@gmail.com" in res.mensagem
+
+
+def test_email_dns_sem_resposta_nao_reprova():
+    assert validacao.validar_email("a@empresa-exemplo.com.br", lambda d: None).ok
+    assert validacao.validar_email("a@empresa-exemplo.com.br", lambda d: False).erro == "dominio_sem_mx"
+    assert validacao.validar_email("sem arroba", sem_rede).erro == "email_invalido"
+
+
+# ------------------------------ CEP / cidade ------------------------------
+
+def test_cep_com_api_preenche_endereco_vazio():
+    r = validacao.validar_cep_com_api("73840000", "", "", "", "", consultar_cep)
+    assert r.erro is None
+    assert r.campos["endereco"].valor == "Rua 1"
+    assert (r.campos["cidade"].valor, r.campos["uf"].valor) == ("Campos Belos", "GO")
+
+
+def test_cep_invalido_tem_uma_mensagem_so():
+    # a mensagem vai no ResultadoCampos; o do campo não repete (senão o aviso sai duas vezes)
+    r = validacao.validar_cep_com_api("123", "", "", "", "", sem_rede)
+    assert r.erro == "cep_formato" and r.mensagem
+    assert r.campos["cep"].mensagem is None
+
+
+def test_cidade_uf_divergente_do_cep():
+    r = validacao.validar_cidade_uf("73840000", "Goiânia", "GO", consultar_cep)
+    assert r.erro == "cidade_uf_divergente"
+    assert r.campos["cidade"].erro == "cidade_divergente"
+    assert validacao.validar_cidade_uf("73840000", "campos belos", "GO", consultar_cep).erro is None
+
+
+# a tabela do IBGE e o ViaCEP podem grafar o mesmo município de jeitos diferentes
+MUNICIPIOS_RJ = IndiceMunicipios([Municipio("3303807", "Paraty", "RJ")])
+
+
+def consultar_cep_parati(cep8):
+    return {"cep": "23970-000", "localidade": "Parati", "uf": "RJ", "ibge": "3303807"}
+
+
+@pytest.mark.parametrize("cidade", ["Paraty", "Parati"])
+def test_cidade_aceita_grafia_da_tabela_ou_do_cep(cidade):
+    r = validacao.validar_cidade_uf("23970000", cidade, "RJ", consultar_cep_parati, MUNICIPIOS_RJ)
+    assert r.erro is None
+
+
+def test_cidade_fora_da_tabela_e_do_cep():
+    r = validacao.validar_cidade_uf("23970000", "Paratu", "RJ", consultar_cep_parati, MUNICIPIOS_RJ)
+    assert r.erro == "cidade_inexistente"
+    assert "Paraty" in r.mensagem
+
+
+# ------------------------------ termo ------------------------------
+
+def _termo(**alterados) -> dict:
+    dados = {n: "x" for n in NOMES_FIXOS + NOMES_FINAIS}
+    dados.update({
+        "cnpj": "11.222.333/0001-81", "cep": "73840-000", "cidade": "Campos Belos", "uf": "GO",
+        "cep_estudante": "73840-000", "cidade_estudante": "Campos Belos", "uf_estudante": "GO",
+        "nascimento_repr": "1980-01-01", "nascimento": "2005-06-15",
+        "data_inicio": "2025-02-03", "data_termino": "2025-06-30",
+        "remunerado": "Não", "auxilio_transporte": "Não", "contraprestacao": "Não",
+    })
+    dados.update({f"atividade_{i}": f"Atividade {i}" for i in range(1, MIN_ATIVIDADES + 1)})
+    dados.update(alterados)
+    return dados
+
+
+def test_termo_completo_passa_e_normaliza_datas():
+    res = validacao.validar_termo(_termo(), consultar_cep)
+    assert res.ok, res.erros
+    assert res.dados["data_inicio"] == "03/02/2025"
+    assert res.dados["nascimento"] == "15/06/2005"
+    assert len(res.atividades) == MIN_ATIVIDADES
+
+
+def test_termo_corrige_cidade_pelo_cep():
+    res = validacao.validar_termo(_termo(cidade="Goiânia"), consultar_cep)
+    assert res.ok
+    assert res.corrigidos["cidade"] == "Campos Belos"
+
+
+def test_termo_exige_atividades_minimas():
+    res = validacao.validar_termo(_termo(atividade_5=""), consultar_cep)
+    assert not res.ok
+    assert [e.campo for e in res.erros if e.campo] == ["atividade_5"]
+
+
+def test_termo_condicional_da_bolsa():
+    res = validacao.validar_termo(_termo(remunerado="Sim", valor_bolsa=""), consultar_cep)
+    assert not res.ok
+    assert (res.erros[0].campo, res.erros[0].codigo) == ("valor_bolsa", "condicional_obrigatorio")
+
+
+def test_termo_periodo_invertido():
+    res = validacao.validar_termo(_termo(data_inicio="2025-07-01"), consultar_cep)
+    assert [e.codigo for e in res.erros] == ["periodo_invertido"]
+
+
+def test_termo_marca_obrigatorios_vazios():
+    res = validacao.validar_termo(_termo(orientador="", matricula=" "), consultar_cep)
+    assert not res.ok
+    assert {e.campo for e in res.erros if e.campo} == {"orientador", "matricula"}
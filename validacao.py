@@ -0,0 +1,1027 @@
+"""
+Regras de validação do TCE, sem dependência do Gradio.
+
+Cada validador de campo devolve um Resultado(valor, erro, mensagem):
+- valor:    valor normalizado (máscara aplicada), ou o que deve ficar no campo
+            quando rejeitado ("" limpa o campo);
+- erro:     código curto do problema (None = ok);
+- mensagem: texto para o usuário (aviso quando há erro; orientação quando não).
+
+Regras que mexem em vários campos devolvem ResultadoCampos (um Resultado por
+campo afetado). Consultas de rede (ViaCEP, DNS) são recebidas como funções,
+para que lote, API e testes possam passar versões em cache ou simuladas; a
+tabela local de municípios (municipios.py), quando houver, também.
+A tradução para gr.update/gr.Warning fica no app (adaptadores finos).
+"""
+import re
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import lru_cache
+from typing import Callable, NamedTuple
+
+from email_validator import EmailNotValidError, validate_email
+
+from dominios import dominio_conhecido, sugerir_dominio
+from municipios import IndiceMunicipios, chave_municipio
+
+
+class Resultado(NamedTuple):
+    valor: object = ""
+    erro: str | None = None
+    mensagem: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.erro is None
+
+
+class ResultadoCampos(NamedTuple):
+    campos: dict                  # nome do campo -> Resultado (só os afetados)
+    erro: str | None = None
+    mensagem: str | None = None
+
+
+class Erro(NamedTuple):
+    campo: str | None             # None = erro do termo como um todo
+    codigo: str
+    mensagem: str | None = None   # None = já coberto por outra mensagem
+
+
+class ResultadoTermo(NamedTuple):
+    ok: bool
+    erros: list                   # [Erro, ...] na ordem em que foram detectados
+    corrigidos: dict              # campo -> valor normalizado/corrigido
+    validos: set                  # campos conferidos e sem erro
+    dados: dict                   # dados normalizados (datas em DD/MM/AAAA)
+    atividades: list
+
+
+UF_OPCOES = [
+    "AC","AL","AM","AP","BA","CE","DF","ES","GO","MA",
+    "MG","MS","MT","PA","PB","PE","PI","PR","RJ","RN",
+    "RO","RR","RS","SC","SE","SP","TO"
+]
+UF_OPCOES_SET = set(UF_OPCOES)  # membership rápido
+
+CURSO_OPCOES = [
+    "Bacharelado em Administração",
+    "Bacharelado em Zootecnia",
+    "Técnico em Agropecuária",
+    "Técnico em Administração",
+    "Técnico em Informática",
+]
+
+AUTO_CORRIGIR_CIDADE_UF = True  # defina False se quiser apenas marcar erro e interromper
+PRESERVAR_PONTUACAO_RG = True   # mantém como digitado quando RG for válido
+
+MIN_ATIVIDADES = 5
+ANO_MIN = 1900
+
+
+# ------------------------------
+# Utilitários
+# ------------------------------
+def _apenas_digitos(s: str) -> str:
+    return re.sub(r"\D", "", s or "")
+
+def _cep8(raw: str) -> str:
+    return _apenas_digitos(raw)[:8]
+
+def _cep_fmt(d: str) -> str:
+    return f"{d[:5]}-{d[5:]}" if len(d) == 8 else d
+
+def _parse_iso_date(s: str):
+    try:
+        return date.fromisoformat((s or "").strip())
+    except Exception:
+        return None
+
+def _limite_18(hoje: date) -> date:
+    # trata 29/02 em anos não bissextos
+    try:
+        return hoje.replace(year=hoje.year - 18)
+    except ValueError:
+        return hoje.replace(month=2, day=28, year=hoje.year - 18)
+
+
+
+# ------------------------------
+# Datas de nascimento
+# ------------------------------
+def validar_nascimento_estudante(valor: str) -> Resultado:
+    raw = (valor or "").strip()
+    if not raw:
+        return Resultado("")
+    d = _parse_iso_date(raw)
+    if not d:
+        return Resultado(raw, "data_invalida", "⚠️ Data inválida.")
+    if d > date.today():
+        return Resultado(raw, "data_futura", "⚠️ A data de nascimento não pode ser futura.")
+    return Resultado(raw)
+
+def validar_nascimento_representante(valor: str) -> Resultado:
+    raw = (valor or "").strip()
+    if not raw:
+        return Resultado("")
+    d = _parse_iso_date(raw)
+    if not d:
+        return Resultado(raw, "data_invalida", "⚠️ Data inválida.")
+    hoje = date.today()
+    if d > hoje:
+        return Resultado(raw, "data_futura", "⚠️ A data de nascimento não pode ser futura.")
+    if d > _limite_18(hoje):
+        return Resultado(raw, "menor_de_idade", "⚠️ O Representante deve ter pelo menos 18 anos.")
+    return Resultado(raw)
+
+
+# ------------------------------
+# CEP / cidade / UF
+# ------------------------------
+def validar_cep(valor: str) -> Resultado:
+    """
+    Valida CEP brasileiro localmente (sem API).
+    - Aceita entrada com/sem hífen e outros separadores.
+    - Exige 8 dígitos numéricos.
+    - Rejeita 00000-000.
+    - Devolve formatado como 00000-000.
+    """
+    if not valor:  # campo vazio: não marca erro aqui (obrigatoriedade é na submissão)
+        return Resultado("")
+
+    cep = re.sub(r"\D", "", str(valor))
+    if len(cep) != 8:
+        return Resultado("", "cep_formato", "⚠️ CEP inválido. Use o formato 00000-000.")
+    if cep == "00000000":
+        return Resultado("", "cep_nulo", "⚠️ CEP inválido.")
+    return Resultado(f"{cep[:5]}-{cep[5:]}")
+
+def validar_cep_com_api(cep_val, end_val, bairro_val, cidade_val, uf_val,
+                        consultar_cep: Callable) -> ResultadoCampos:
+    """
+    CEP local + ViaCEP. Campos: cep, endereco, bairro, cidade, uf.
+    Endereço/bairro só são preenchidos se vazios; cidade/UF seguem a API.
+    """
+    local = validar_cep(cep_val)
+    if not local.ok or not local.valor:
+        # a mensagem vai só no ResultadoCampos (senão o aviso aparece duas vezes)
+        return ResultadoCampos({"cep": local._replace(mensagem=None)}, local.erro, local.mensagem)
+
+    cep_fmt = local.valor
+    try:
+        info = consultar_cep(_cep8(cep_fmt))
+    except Exception:
+        return ResultadoCampos({"cep": local}, "rede",
+                               "⚠️ Falha ao consultar o ViaCEP agora. Tente novamente.")
+    if not info:
+        return ResultadoCampos({"cep": Resultado(cep_fmt, "cep_nao_encontrado")}, "cep_nao_encontrado",
+                               "⚠️ CEP não encontrado na base ViaCEP.")
+
+    end_api    = (info.get("logradouro")  or "").strip()
+    bairro_api = (info.get("bairro")      or "").strip()
+    cidade_api = (info.get("localidade")  or "").strip()
+    uf_api     = (info.get("uf")          or "").strip().upper() or None
+
+    # manter o que o usuário pôs; senão, preencher com API (sem inventar se vier vazia)
+    novo_end    = end_val if (end_val or "").strip() else end_api
+    novo_bairro = bairro_val if (bairro_val or "").strip() else bairro_api
+
+    campos = {
+        "cep": Resultado(cep_fmt),
+        "endereco": Resultado(novo_end),
+        "bairro": Resultado(novo_bairro),
+        "cidade": Resultado(cidade_api),   # cidade/UF: a API é mais confiável
+        # se a API não trouxe UF válida, não force valor (mantém como está)
+        "uf": Resultado(uf_api if uf_api in UF_OPCOES_SET else uf_val),
+    }
+    if not novo_end or not novo_bairro:
+        return ResultadoCampos(campos, None, "ℹ️ CEP genérico do município: preencha manualmente Endereço e Bairro.")
+    return ResultadoCampos(campos)
+
+def conferir_municipio(cidade, uf, municipios: IndiceMunicipios | None) -> Resultado | None:
+    """
+    Confere a cidade na tabela do IBGE da UF. Resultado com o nome oficial,
+    ou erro "cidade_inexistente" com sugestões; None = não há como conferir
+    (sem tabela, cidade vazia ou UF inválida).
+    """
+    cidade = (cidade or "").strip()
+    uf = str(uf or "").strip().upper()
+    if not municipios or not cidade or uf not in UF_OPCOES_SET:
+        return None
+    m = municipios.buscar(cidade, uf)
+    if m:
+        return Resultado(m.nome)
+    msg = f"⚠️ Cidade '{cidade}' não encontrada em {uf}."
+    sugestoes = municipios.sugestoes(cidade, uf, limite=3)
+    outras_ufs = municipios.ufs_do_nome(cidade)
+    if sugestoes:
+        msg += " Você quis dizer: " + ", ".join(s.nome for s in sugestoes) + "?"
+    elif outras_ufs:
+        msg += " Há município com esse nome em: " + ", ".join(outras_ufs) + "."
+    return Resultado(cidade, "cidade_inexistente", msg)
+
+def _mesma_cidade(cidade, uf, info: dict, municipios: IndiceMunicipios | None) -> bool:
+    """
+    Cidade digitada = localidade do CEP: mesmo nome (sem acento/caixa) ou,
+    com a tabela, o mesmo código IBGE (grafias diferentes: Paraty/Parati).
+    """
+    cidade_api = (info.get("localidade") or "").strip()
+    if not cidade_api or chave_municipio(cidade) == chave_municipio(cidade_api):
+        return True
+    m = municipios.buscar(cidade, uf) if municipios else None
+    return bool(m and info.get("ibge") and m.codigo_ibge == str(info["ibge"]))
+
+def validar_cidade_uf(cep_val, cidade_val, uf_val, consultar_cep: Callable,
+                      municipios: IndiceMunicipios | None = None) -> ResultadoCampos:
+    """
+    Confere cidade/UF digitados com a tabela do IBGE e com o ViaCEP do CEP
+    (sem autocorrigir): só o que divergiu é limpo e marcado. Campos: cidade, uf.
+    Cidade fora da tabela só é recusada se também não for a do CEP (a grafia
+    do ViaCEP vale). Sem CEP válido ou sem resposta da API vale só a tabela.
+    """
+    local = conferir_municipio(cidade_val, uf_val, municipios)
+    fora_da_tabela = local is not None and not local.ok
+    recusa_local = (ResultadoCampos({"cidade": local._replace(mensagem=None)}, local.erro, local.mensagem)
+                    if fora_da_tabela else None)
+    campos_local = {"cidade": local} if local is not None and local.ok else {}
+
+    cep8 = _cep8(cep_val)
+    if len(cep8) != 8 or cep8 == "00000000":
+        return recusa_local or ResultadoCampos(campos_local)
+    try:
+        info = consultar_cep(cep8)
+    except Exception:
+        if local is not None:
+            return recusa_local or ResultadoCampos(campos_local)  # ViaCEP fora: a tabela basta
+        return ResultadoCampos({}, "rede", "⚠️ Não foi possível validar cidade/UF agora (rede).")
+    if not info:
+        if recusa_local:
+            return recusa_local
+        return ResultadoCampos({}, "cep_nao_encontrado",
+                               "⚠️ CEP não encontrado na base ViaCEP; não é possível validar cidade/UF.")
+
+    cidade_api = (info.get("localidade") or "").strip()
+    uf_api     = (info.get("uf") or "").strip().upper()
+    ok_cidade = _mesma_cidade(cidade_val, uf_val, info, municipios)
+    ok_uf     = (str(uf_val or "").upper() == uf_api) if uf_api else True
+    if fora_da_tabela and not ok_cidade:
+        return recusa_local   # nem a tabela nem o CEP conhecem o nome
+
+    campos = {"cidade": campos_local.get("cidade") or Resultado(cidade_val), "uf": Resultado(uf_val)}
+    msgs = []
+    if not ok_cidade:
+        campos["cidade"] = Resultado("", "cidade_divergente")
+        msgs.append(f"cidade = '{cidade_api}'")
+    if not ok_uf:
+        campos["uf"] = Resultado(None, "uf_divergente")
+        msgs.append(f"UF = '{uf_api}'")
+    if msgs:
+        return ResultadoCampos(campos, "cidade_uf_divergente",
+                               "⚠️ Cidade/UF não conferem com o CEP. Esperado: " + ", ".join(msgs) + ".")
+    return ResultadoCampos(campos)
+
+def conferir_cidade_uf_por_cep(dados: dict, prefixo: str, consultar_cep: Callable,
+                               municipios: IndiceMunicipios | None = None) -> ResultadoCampos:
+    """
+    Regra do envio: cidade/UF precisam bater com o CEP (prefixo "" ou
+    "estudante"). Com AUTO_CORRIGIR_CIDADE_UF, diverge -> corrige e segue
+    (erro "cidade_uf_corrigida", que não reprova o termo). Se o ViaCEP não
+    responder, a tabela do IBGE (se houver) decide.
+    """
+    def nome(c): return f"{c}_{prefixo}" if prefixo else c
+    n_cep, n_cidade, n_uf = nome("cep"), nome("cidade"), nome("uf")
+
+    cep_raw = (dados.get(n_cep) or "").strip()
+    cep8 = _cep8(cep_raw)
+    if len(cep8) != 8 or cep8 == "00000000":
+        return ResultadoCampos({n_cep: Resultado(cep_raw, "cep_formato")}, "cep_formato",
+                               f"⚠️ CEP inválido em '{n_cep}'.")
+    try:
+        info = consultar_cep(cep8)
+    except Exception:
+        local = conferir_municipio(dados.get(n_cidade), dados.get(n_uf), municipios)
+        if local is None:
+            return ResultadoCampos({n_cep: Resultado(cep_raw, "rede")}, "rede",
+                                   f"⚠️ Não foi possível validar {n_cep} agora. Tente novamente.")
+        return ResultadoCampos({n_cidade: local._replace(mensagem=None)}, local.erro, local.mensagem)
+    if not info:
+        return ResultadoCampos({n_cep: Resultado(cep_raw, "cep_nao_encontrado")}, "cep_nao_encontrado",
+                               f"⚠️ {n_cep} não encontrado (ViaCEP).")
+
+    cidade_api = (info.get("localidade") or "").strip()
+    uf_api     = (info.get("uf") or "").strip().upper()
+    cidade_user = (dados.get(n_cidade) or "").strip()
+    uf_user     = (dados.get(n_uf) or "").strip().upper()
+    ok_cidade = _mesma_cidade(cidade_user, uf_user, info, municipios)
+    ok_uf     = (uf_user == uf_api) if uf_api else True
+
+    campos = {}
+    cep_fmt = _cep_fmt(cep8)
+    if cep_fmt != cep_raw:
+        campos[n_cep] = Resultado(cep_fmt)  # padroniza a máscara
+    if ok_cidade and ok_uf:
+        return ResultadoCampos(campos)
+
+    msgs = []
+    if not ok_cidade:
+        msgs.append(f"cidade = '{cidade_api}'")
+        campos[n_cidade] = (Resultado(cidade_api) if AUTO_CORRIGIR_CIDADE_UF
+                            else Resultado(cidade_user, "cidade_divergente"))
+    if not ok_uf:
+        msgs.append(f"UF = '{uf_api}'")
+        campos[n_uf] = (Resultado(uf_api) if AUTO_CORRIGIR_CIDADE_UF and uf_api in UF_OPCOES_SET
+                        else Resultado(uf_user, "uf_divergente"))
+    erro = "cidade_uf_corrigida" if AUTO_CORRIGIR_CIDADE_UF else "cidade_uf_divergente"
+    return ResultadoCampos(campos, erro,
+                           "⚠️ Cidade/UF não conferem com o CEP. Valor esperado: " + ", ".join(msgs) + ".")
+
+def validar_uf(valor: str) -> Resultado:
+    if valor in UF_OPCOES_SET:
+        return Resultado(valor)
+    return Resultado(None, "uf_invalida", "⚠️ UF inválida. Selecione uma das opções da lista.")
+
+def validar_curso(valor: str) -> Resultado:
+    if valor in CURSO_OPCOES:
+        return Resultado(valor)
+    return Resultado(None, "curso_invalido", "⚠️ Curso inválido. Selecione uma opção da lista.")
+
+
+# ------------------------------
+# RG
+# ------------------------------
+def rg_eh_rg_simples(raw: str) -> bool:
+    """
+    RG simples (7–10), aceita só dígitos e 'X' APENAS no final (e no máximo 1).
+    Bloqueia todos zeros/todos iguais.
+    """
+    s = (raw or "").strip().upper()
+
+    # 🔴 Rejeita já aqui: 'X' fora do final ou mais de um 'X'
+    if 'X' in s and (s.count('X') > 1 or not s.endswith('X')):
+        return False
+
+    # mantém apenas dígitos e, se houver, um 'X' final
+    n = re.sub(r"[^0-9X]", "", s)
+
+    # faixa da sua versão original
+    if not (7 <= len(n) <= 10):
+        return False
+
+    # separa corpo/dv
+    if n.endswith('X'):
+        corpo = n[:-1]
+        if not corpo.isdigit():
+            return False
+    else:
+        if not n.isdigit():
+            return False
+        corpo = n
+
+    # bloqueios
+    if set(corpo) == {'0'} or len(set(corpo)) == 1:
+        return False
+
+    return True
+
+def rg_formatar(raw: str) -> str:
+    """Formata RG: pontos a cada 3 + hífen antes do último caractere."""
+    s = (raw or "").strip().upper()
+    # não mexa na regra do X aqui; só formata o que vier
+    n = re.sub(r"[^0-9X]", "", s)
+    if not n:
+        return ""
+    corpo, dv = n[:-1], n[-1]
+    grupos, rest = [], corpo
+    while rest:
+        grupos.append(rest[:3]); rest = rest[3:]
+    base = ".".join(grupos) if grupos else ""
+    return f"{base}-{dv}" if base else n
+
+def validar_rg(valor: str) -> Resultado:
+    raw = (valor or "").strip()
+    if not raw:
+        return Resultado("")
+    if rg_eh_rg_simples(raw):
+        return Resultado(raw if PRESERVAR_PONTUACAO_RG else rg_formatar(raw))
+    return Resultado("", "rg_invalido",
+                     "⚠️ RG inválido. Use 7–10 dígitos (opcional 'X' só no final). Ex.: 12.345.678-9")
+
+def validar_rg_ou_cin(valor: str, opcao_cin: str) -> Resultado:
+    if (opcao_cin or "").strip().lower() == "sim":
+        return validar_cpf(valor)   # a CIN usa o número do CPF
+    return validar_rg(valor)
+
+
+# ------------------------------
+# Telefone
+# ------------------------------
+# DDDs válidos (ANATEL): 11-19, 21-24, 27-28, 31-35, 37-38, 41-49, 51-55,
+# 61-69, 71-75, 77, 79, 81-89, 91-99
+DDD_VALIDOS = {
+    *[str(x) for x in range(11,20)],
+    *[str(x) for x in range(21,25)], 27, 28,
+    *[str(x) for x in range(31,36)], 37, 38,
+    *[str(x) for x in range(41,50)],
+    *[str(x) for x in range(51,56)],
+    *[str(x) for x in range(61,70)],
+    *[str(x) for x in range(71,76)], 77, 79,
+    *[str(x) for x in range(81,90)],
+    *[str(x) for x in range(91,100)],
+}
+DDD_VALIDOS = {str(x) for x in DDD_VALIDOS}  # garante strings
+
+def _todos_iguais(s: str) -> bool:
+    return s and all(ch == s[0] for ch in s)
+
+def telefone_valido_br(dig: str) -> bool:
+    """
+    Regras (Brasil):
+    - Aceita DDD + número: 10 dígitos (fixo) ou 11 dígitos (celular).
+    - Permite prefixo +55 (12 ou 13 dígitos; removemos antes de validar).
+    - DDD deve ser válido (ANATEL).
+    - Fixo: primeiro dígito do número (após DDD) ∈ {2,3,4,5}.
+    - Celular: primeiro dígito do número (após DDD) = 9.
+    - Rejeita sequências inválidas (número local todo zero ou todos dígitos iguais).
+    """
+    d = _apenas_digitos(dig)
+
+    # remove +55 se vier junto e o comprimento for compatível
+    if d.startswith("55") and len(d) in (12, 13):
+        d = d[2:]
+
+    # precisa ser 10 (fixo) ou 11 (celular)
+    if len(d) not in (10, 11):
+        return False
+
+    ddd = d[:2]
+    numero = d[2:]
+
+    # DDD válido
+    if ddd not in DDD_VALIDOS:
+        return False
+
+    # bloquear número local obviamente inválido
+    if set(numero) == {"0"} or _todos_iguais(numero):
+        return False
+
+    # regras de prefixo
+    if len(d) == 10:
+        # fixo começa em 2-5
+        return numero[0] in {"2", "3", "4", "5"}
+    else:
+        # celular começa em 9
+        return numero[0] == "9"
+
+def formatar_telefone_br(dig: str) -> str:
+    d = _apenas_digitos(dig)
+    if d.startswith("55") and len(d) in (12, 13):
+        d = d[2:]
+    if len(d) == 10:  # fixo
+        return f"({d[:2]}) {d[2:6]}-{d[6:]}"
+    if len(d) == 11:  # celular
+        return f"({d[:2]}) {d[2:7]}-{d[7:]}"
+    return dig  # fallback
+
+def validar_telefone(valor: str) -> Resultado:
+    raw = (valor or "").strip()
+    if not raw:
+        return Resultado("")
+    if telefone_valido_br(raw):
+        return Resultado(formatar_telefone_br(raw))
+    return Resultado("", "telefone_invalido",
+                     "⚠️ Telefone inválido. Ex.: fixo (62) 2345-6789 ou celular (62) 91234-5678.")
+
+
+# ------------------------------
+# E-mail
+# ------------------------------
+def validar_email(valor: str, consultar_dominio: Callable) -> Resultado:
+    """
+    Sintaxe estrita (sem acentos) + domínio com MX/A. `consultar_dominio`
+    devolve True/False, ou None quando o DNS não respondeu (não reprova).
+    Domínios conhecidos (dominios.py) dispensam o DNS. Domínio a uma letra
+    de um conhecido ainda passa pelo DNS (pode ser de verdade, ex. de uma
+    concedente): se existir, a sugestão vai só como orientação; se não, entra
+    na mensagem do erro, e o endereço fica no campo para a correção.
+    """
+    if not (valor and valor.strip()):
+        return Resultado("")
+    try:
+        info = validate_email(
+            valor,
+            allow_smtputf8=False,      # sem acentos no local-part
+            check_deliverability=False # DNS é feito abaixo
+        )
+        addr = info.normalized
+        local, domain = addr.rsplit("@", 1)
+
+        # Bloqueia Unicode também no domínio (versão estrita)
+        if any(ord(c) > 127 for c in domain):
+            raise EmailNotValidError("Domínio com caracteres inválidos.")
+    except EmailNotValidError:
+        return Resultado("", "email_invalido",
+                         "⚠️ O endereço de e-mail informado não é válido. Verifique se está escrito "
+                         "corretamente (sem acentos) e tente novamente.")
+
+    if dominio_conhecido(domain):
+        return Resultado(addr)
+    sugestao = sugerir_dominio(domain)
+    quis_dizer = f"você quis dizer {local}@{sugestao}?" if sugestao else ""
+
+    if consultar_dominio(domain) is False:
+        # Domínio realmente sem MX/A (nem no pai)
+        if sugestao:
+            return Resultado(addr, "dominio_sem_mx",
+                             f"⚠️ O domínio \"{domain}\" não aceita mensagens: {quis_dizer}")
+        return Resultado("", "dominio_sem_mx",
+                         "⚠️ O domínio do e-mail informado não aceita mensagens. Confira se está correto.")
+    # True, ou None (timeout: aceita a sintaxe ok)
+    if sugestao:
+        return Resultado(addr, None, f"ℹ️ Confira o e-mail: {quis_dizer}")
+    return Resultado(addr)
+
+
+# ------------------------------
+# CPF / CNPJ
+# ------------------------------
+def _valida_cpf(d: str) -> bool:
+    if len(d) != 11 or d == d[0] * 11:
+        return False
+    soma = sum(int(d[i]) * (10 - i) for i in range(9))
+    dv1 = (soma * 10) % 11
+    dv1 = 0 if dv1 == 10 else dv1
+    if dv1 != int(d[9]):
+        return False
+    soma = sum(int(d[i]) * (11 - i) for i in range(10))
+    dv2 = (soma * 10) % 11
+    dv2 = 0 if dv2 == 10 else dv2
+    return dv2 == int(d[10])
+
+def _valida_cnpj(d: str) -> bool:
+    if len(d) != 14 or d == d[0] * 14:
+        return False
+    pesos1 = [5,4,3,2,9,8,7,6,5,4,3,2]
+    pes2   = [6] + pesos1
+    s1 = sum(int(d[i])*pesos1[i] for i in range(12))
+    r1 = 11 - (s1 % 11); r1 = 0 if r1 >= 10 else r1
+    if r1 != int(d[12]): return False
+    s2 = sum(int(d[i])*pes2[i] for i in range(13))
+    r2 = 11 - (s2 % 11); r2 = 0 if r2 >= 10 else r2
+    return r2 == int(d[13])
+
+def _formata_cpf(d: str) -> str:
+    return f"{d[0:3]}.{d[3:6]}.{d[6:9]}-{d[9:11]}"
+
+def _formata_cnpj(d: str) -> str:
+    return f"{d[0:2]}.{d[2:5]}.{d[5:8]}/{d[8:12]}-{d[12:14]}"
+
+def validar_cnpj_cpf(valor: str) -> Resultado:
+    d = _apenas_digitos(valor)
+    # vazio → não mexe (deixa o usuário digitar)
+    if not d:
+        return Resultado("")
+
+    if len(d) == 11:
+        if _valida_cpf(d):
+            return Resultado(_formata_cpf(d))
+        return Resultado("", "cpf_invalido", "⚠️ CPF inválido. Preencha no formato 000.000.000-00")
+
+    if len(d) == 14:
+        if _valida_cnpj(d):
+            return Resultado(_formata_cnpj(d))
+        return Resultado("", "cnpj_invalido", "⚠️ CNPJ inválido. Preencha no formato 00.000.000/0000-00")
+
+    return Resultado("", "documento_invalido",
+                     "⚠️ Número inválido. Informe um CPF (11 dígitos) ou CNPJ (14 dígitos).")
+
+def validar_cpf(valor: str) -> Resultado:
+    raw = (valor or "").strip()
+    # em branco não é erro aqui (a obrigatoriedade é conferida no envio)
+    if not raw:
+        return Resultado("")
+    d = _apenas_digitos(raw)
+    if len(d) != 11:
+        return Resultado("", "cpf_formato", "⚠️ CPF inválido. Informe 11 dígitos no formato 000.000.000-00.")
+    if not _valida_cpf(d):
+        return Resultado("", "cpf_dv", "⚠️ CPF inválido. Verifique os dígitos verificadores.")
+    return Resultado(_formata_cpf(d))
+
+
+# ------------------------------
+# Carga horária / período
+# ------------------------------
+def validar_horas_semanais(valor: str) -> Resultado:
+    if not valor or not str(valor).strip():
+        return Resultado("")
+    try:
+        # Normaliza separadores
+        txt = valor.lower().replace("h", ":").replace("min", "").replace(" ", "")
+        txt = txt.replace(",", ".")  # aceita vírgula decimal
+
+        horas, minutos = 0, 0
+        if ":" in txt:  # formato hh:mm
+            partes = txt.split(":")
+            horas = int(partes[0])
+            minutos = int(partes[1]) if len(partes) > 1 and partes[1] else 0
+        elif "." in txt:  # formato decimal, ex: 22.5
+            horas_float = float(txt)
+            horas = int(horas_float)
+            minutos = round((horas_float - horas) * 60)
+        else:  # só horas inteiras
+            horas = int(txt)
+
+        total_horas = horas + minutos / 60.0
+    except Exception:
+        return Resultado("", "horas_formato",
+                         "⚠️ Informe o valor em formato válido (ex: 30h, 22h30min, 22:30 ou 22,5).")
+
+    if total_horas > 40:
+        return Resultado("", "horas_acima_limite", "⚠️ Horas semanais não pode ultrapassar 40.")
+
+    # Formata saída sempre como hh:mm
+    return Resultado(f"{int(horas)}h{minutos:02d}min" if minutos else f"{int(horas)}h")
+
+def calcular_total_dias(data_inicio, data_termino, contar_finais_semana, qtd_feriados) -> Resultado:
+    """Total de dias do período (rótulo "N dias"); "" se as datas não fecham."""
+    if not data_inicio or not data_termino:
+        return Resultado("")
+    try:
+        dt_inicio = datetime.strptime(data_inicio, "%Y-%m-%d")
+        dt_termino = datetime.strptime(data_termino, "%Y-%m-%d")
+    except ValueError:
+        return Resultado("")
+    if dt_termino < dt_inicio:
+        return Resultado("", "periodo_invertido", "⚠️ A data de término não pode ser anterior à data de início.")
+
+    # feriados (inteiro ≥ 0)
+    try:
+        feriados = max(0, int(qtd_feriados or 0))
+    except Exception:
+        feriados = 0
+
+    # "Sim"  -> NÃO contar finais de semana (excluir sábados e domingos)
+    # "Não"  -> CONTAR finais de semana (incluir sábados e domingos)
+    conta = {0, 1, 2, 3, 4}  # seg a sex
+    if contar_finais_semana == "Não":
+        conta.update({5, 6})
+
+    # conta dias [início, término] inclusivo
+    dias = 0
+    atual = dt_inicio
+    while atual <= dt_termino:
+        if atual.weekday() in conta:
+            dias += 1
+        atual += timedelta(days=1)
+
+    return Resultado(f"{max(0, dias - feriados)} dias")
+
+
+# ------------------------------
+# Valor por extenso (pt-BR)
+# ------------------------------
+# Motor próprio em Decimal: exato nos centavos e sem depender do num2words.
+
+_UNIDADES = [
+    "zero", "um", "dois", "três", "quatro", "cinco", "seis", "sete", "oito", "nove",
+    "dez", "onze", "doze", "treze", "catorze", "quinze", "dezesseis", "dezessete",
+    "dezoito", "dezenove",
+]
+_DEZENAS = ["", "", "vinte", "trinta", "quarenta", "cinquenta",
+            "sessenta", "setenta", "oitenta", "noventa"]
+_CENTENAS = ["", "cento", "duzentos", "trezentos", "quatrocentos", "quinhentos",
+             "seiscentos", "setecentos", "oitocentos", "novecentos"]
+# (singular, plural) por grupo de milhar; o grupo 1 ("mil") não leva "um"
+_ESCALAS = [("", ""), ("mil", "mil"), ("milhão", "milhões"), ("bilhão", "bilhões"),
+            ("trilhão", "trilhões"), ("quatrilhão", "quatrilhões")]
+
+def _extenso_centena(n: int) -> str:
+    """1..999 por extenso."""
+    if n == 100:
+        return "cem"
+    c, r = divmod(n, 100)
+    partes = [_CENTENAS[c]] if c else []
+    if r:
+        if r < 20:
+            partes.append(_UNIDADES[r])
+        else:
+            d, u = divmod(r, 10)
+            partes.append(_DEZENAS[d] + (f" e {_UNIDADES[u]}" if u else ""))
+    return " e ".join(partes)
+
+def numero_por_extenso(n: int) -> str:
+    """
+    Inteiro ≥ 0 por extenso em pt-BR (mesma redação do num2words lang='pt_BR'):
+    1234 -> 'mil, duzentos e trinta e quatro' ; 2500000 -> 'dois milhões e quinhentos mil'
+    """
+    if n == 0:
+        return _UNIDADES[0]
+    grupos = []
+    while n:
+        n, g = divmod(n, 1000)
+        grupos.append(g)
+    if len(grupos) > len(_ESCALAS):
+        raise ValueError("valor grande demais")
+
+    # (valor do grupo, texto) do mais alto para o mais baixo, só grupos não-nulos
+    itens = []
+    for i in range(len(grupos) - 1, -1, -1):
+        g = grupos[i]
+        if not g:
+            continue
+        sing, plur = _ESCALAS[i]
+        if i == 0:
+            txt = _extenso_centena(g)
+        elif i == 1:
+            txt = "mil" if g == 1 else f"{_extenso_centena(g)} mil"
+        else:
+            txt = f"{_extenso_centena(g)} {sing if g == 1 else plur}"
+        itens.append((g, txt))
+
+    # "e" antes de grupo < 100, ou de centena redonda quando é o último grupo
+    saida = itens[0][1]
+    for pos, (g, txt) in enumerate(itens[1:], start=1):
+        ultimo = pos == len(itens) - 1
+        sep = " e " if g < 100 or (ultimo and g % 100 == 0) else ", "
+        saida += sep + txt
+    return saida
+
+def _parse_valor_brl(s: str) -> Decimal | None:
+    """
+    Converte texto monetário em Decimal com 2 casas (None se inválido).
+    Aceita 'R$ 1.234,56' | '1234,56' | '1234.56' | '1,234.56' | '759'.
+    O último separador é o decimal, exceto quando só há pontos em grupos de
+    milhar ('1.234' -> 1234, como em _fmt_brl).
+    """
+    s = re.sub(r"[^\d,\.]", "", s or "")
+    if not re.search(r"\d", s):
+        return None
+    ultimo = max(s.rfind(","), s.rfind("."))
+    inteiro, frac = s, ""
+    if ultimo >= 0:
+        sep = s[ultimo]
+        so_milhar = sep == "." and "," not in s and re.fullmatch(r"\d{1,3}(\.\d{3})+", s)
+        if s.count(sep) == 1 and not so_milhar:
+            inteiro, frac = s[:ultimo], s[ultimo + 1:]
+    inteiro = re.sub(r"[,.]", "", inteiro)
+    try:
+        return Decimal(f"{inteiro or 0}.{frac or 0}").quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        return None
+
+@lru_cache(maxsize=4096)
+def valor_por_extenso(valor_str: str) -> str:
+    """'1.234,56' -> 'Mil, duzentos e trinta e quatro reais e cinquenta e seis centavos'."""
+    valor = _parse_valor_brl(valor_str)
+    if valor is None:
+        return ""
+    reais, centavos = divmod(int(valor * 100), 100)
+
+    partes = []
+    if reais > 0:
+        # milhões/bilhões redondos levam "de": "um milhão de reais"
+        de = " de" if reais >= 1_000_000 and reais % 1_000_000 == 0 else ""
+        partes.append(numero_por_extenso(reais) + de + (" real" if reais == 1 else " reais"))
+    if centavos > 0:
+        partes.append(numero_por_extenso(centavos) + (" centavo" if centavos == 1 else " centavos"))
+
+    if not partes:
+        return "Zero real"
+
+    return " e ".join(partes).capitalize()
+
+
+# ------------------------------
+# Termo completo (regras do envio)
+# ------------------------------
+# 1) Campos FIXOS (até "horario_atividades")
+#    -> Deixe essa lista exatamente nessa ordem,
+#       pois é a ordem em que os inputs vêm antes das atividades
+NOMES_FIXOS = [
+    "tipo_estagio", "razao_social", "cnpj", "nome_fantasia", "endereco", "bairro",
+    "cep", "complemento", "cidade", "uf", "email", "telefone",
+    "representante",
+    "nascimento_repr",
+    "cpf_repr",
+    "nome_estudante",
+    "nascimento", "cpf_estudante", "rg",
+    "endereco_estudante", "bairro_estudante", "cep_estudante", "complemento_estudante",
+    "cidade_estudante", "uf_estudante", "email_estudante", "telefone_estudante", "curso_estudante",
+    "ano_periodo", "matricula", "orientador", "data_inicio", "data_termino", "total_dias",
+    "horas_diarias", "horas_semana_estagio", "total_horas_estagio",
+    "seguradora", "apolice",
+    "modalidade_estagio", "remunerado", "valor_bolsa", "valor_extenso",
+    "auxilio_transporte", "especificacao_auxilio",
+    "contraprestacao", "especificacao_contraprestacao",
+    "horas_diarias_plano", "horas_semanais_plano", "total_horas_plano",
+    "horario_atividades",   # <- último fixo antes das atividades
+]
+
+# 2) Campos do "rodapé" (após TODAS as atividades)
+NOMES_FINAIS = ["nome_supervisor", "formacao_supervisor", "cargo_supervisor", "registro_conselho"]
+
+CAMPOS_OBRIGATORIOS = {
+    "tipo_estagio": "Tipo de Estágio",
+    "razao_social": "Razão Social",
+    "cnpj": "CNPJ",
+    "nome_fantasia": "Nome Fantasia",
+    "endereco": "Endereço",
+    "bairro": "Bairro",
+    "cep": "CEP",
+    "cidade": "Cidade",
+    "uf": "UF",
+    "email": "E-mail",
+    "telefone": "Telefone",
+    "representante": "Representante Legal",
+    "nascimento_repr": "Data de Nascimento do Representante",
+    "cpf_repr": "CPF do Representante Legal",
+    "nome_estudante": "Nome do(a) Estudante",
+    "nascimento": "Data de Nascimento do Estudante",
+    "cpf_estudante": "CPF do(a) Estudante",
+    "rg": "RG",
+    "endereco_estudante": "Endereço do(a) Estudante",
+    "bairro_estudante": "Bairro do(a) Estudante",
+    "cep_estudante": "CEP do(a) Estudante",
+    "cidade_estudante": "Cidade do(a) Estudante",
+    "uf_estudante": "UF do(a) Estudante",
+    "email_estudante": "E-mail do(a) Estudante",
+    "telefone_estudante": "Telefone do(a) Estudante",
+    "curso_estudante": "Curso do(a) Estudante",
+    "ano_periodo": "Ano/Período Letivo",
+    "matricula": "Matrícula",
+    "orientador": "Professor(a) Orientador(a)",
+    "data_inicio": "Data de Início",
+    "data_termino": "Data de Término",
+    "total_dias": "Total de Dias de Estágio",
+    "horas_diarias": "Horas Diárias",
+    "horas_semana_estagio": "Horas Semanais de Estágio",
+    "total_horas_estagio": "Total de Horas de Estágio",
+    "seguradora": "Nome da Seguradora",
+    "apolice": "Nº da Apólice de Seguro",
+    "modalidade_estagio": "Modalidade do Estágio",
+    "remunerado": "Remunerado",
+    "auxilio_transporte": "Auxílio Transporte",
+    "contraprestacao": "Contraprestação de Serviços",
+    "horas_diarias_plano": "Horas Diárias no Plano",
+    "horas_semanais_plano": "Horas Semanais no Plano",
+    "total_horas_plano": "Total de Horas no Plano",
+    "horario_atividades": "Horário das Atividades",
+    "nome_supervisor": "Nome do(a) Supervisor(a)",
+    "cargo_supervisor": "Cargo/Função do(a) Supervisor(a) no(a) concedente",
+    "formacao_supervisor": "Formação do(a) Supervisor(a)"
+}
+
+def nomes_do_termo(n_valores: int) -> list[str]:
+    """Nomes dos campos na ordem dos inputs, para um termo com `n_valores` valores."""
+    n_atividades = max(0, n_valores - (len(NOMES_FIXOS) + len(NOMES_FINAIS)))
+    return NOMES_FIXOS + [f"atividade_{i}" for i in range(1, n_atividades + 1)] + NOMES_FINAIS
+
+def _vazio(valor) -> bool:
+    return (valor is None) or (str(valor).strip().lower() in ["", "none"])
+
+def validar_termo(dados: dict, consultar_cep: Callable,
+                  municipios: IndiceMunicipios | None = None) -> ResultadoTermo:
+    """
+    Regras do envio do termo. `dados` traz os campos por nome (ver
+    nomes_do_termo), com as atividades em atividade_1..N e as datas em ISO.
+    Para no primeiro bloco de regras que falhar, como o formulário.
+    """
+    dados = dict(dados)
+    nomes = NOMES_FIXOS + sorted(
+        (n for n in dados if n.startswith("atividade_")), key=lambda n: int(n.rsplit("_", 1)[1])
+    ) + NOMES_FINAIS
+    atividades = [dados[n] for n in nomes if n.startswith("atividade_")]
+    erros, corrigidos, validos = [], {}, set()
+
+    def resultado(ok=False):
+        return ResultadoTermo(ok, erros, corrigidos, validos, dados, atividades)
+
+    # 1) Regras condicionais primeiro
+    condicionais = [
+        ("remunerado", "valor_bolsa",
+         "⚠️ O campo 'Valor da Bolsa' é obrigatório para a opção remunerado 'Sim'."),
+        ("remunerado", "valor_extenso",
+         "⚠️ O campo 'Valor por Extenso' é obrigatório para a opção remunerado 'Sim'."),
+        ("auxilio_transporte", "especificacao_auxilio",
+         "⚠️ O campo 'Especificação do Auxílio Transporte' é obrigatório para a opção Sim."),
+        ("contraprestacao", "especificacao_contraprestacao",
+         "⚠️ O campo 'Especificação da Contraprestação' é obrigatório para a opção Sim."),
+    ]
+    for gatilho, campo, msg in condicionais:
+        if dados.get(gatilho) == "Sim" and not str(dados.get(campo) or "").strip():
+            erros.append(Erro(campo, "condicional_obrigatorio", msg))
+            return resultado()
+        validos.add(campo)
+
+    # 2) Coerência cidade/UF com CEP — concedente e estudante
+    for prefixo in ("", "estudante"):
+        r = conferir_cidade_uf_por_cep(dados, prefixo, consultar_cep, municipios)
+        for campo, res in r.campos.items():
+            if res.ok:
+                corrigidos[campo] = res.valor
+                dados[campo] = res.valor
+                validos.add(campo)
+            else:
+                erros.append(Erro(campo, res.erro))
+        if r.erro:
+            erros.append(Erro(None, r.erro, r.mensagem))
+            if r.erro != "cidade_uf_corrigida":
+                return resultado()
+
+    # 3) Datas de nascimento (não interrompem: acumulam com os obrigatórios)
+    hoje = date.today()
+    com_erro = set()
+
+    def falha_especifica(campo, codigo, msg):
+        erros.append(Erro(campo, codigo, msg))
+        com_erro.add(campo)
+
+    nasc_raw = (dados.get("nascimento") or "").strip()
+    if nasc_raw:
+        d = _parse_iso_date(nasc_raw)
+        if not d or not (ANO_MIN <= d.year <= hoje.year):
+            falha_especifica("nascimento", "data_invalida",
+                             f"⚠️ Data de nascimento inválida (ano deve ser ≥ {ANO_MIN}).")
+        elif d > hoje:
+            falha_especifica("nascimento", "data_futura",
+                             "⚠️ A data de nascimento do(a) estudante não pode ser futura.")
+
+    nasc_repr_raw = (dados.get("nascimento_repr") or "").strip()
+    if nasc_repr_raw:
+        d = _parse_iso_date(nasc_repr_raw)
+        if not d or not (ANO_MIN <= d.year <= hoje.year):
+            falha_especifica("nascimento_repr", "data_invalida",
+                             f"⚠️ Data de nascimento do(a) representante inválida (ano deve ser ≥ {ANO_MIN}).")
+        elif d > hoje:
+            falha_especifica("nascimento_repr", "data_futura",
+                             "⚠️ A data de nascimento do(a) representante não pode ser futura.")
+        elif d > _limite_18(hoje):
+            falha_especifica("nascimento_repr", "menor_de_idade",
+                             "⚠️ O(A) representante deve ter pelo menos 18 anos.")
+
+    # 4) Período (obrigatório e em ordem)
+    try:
+        dt_inicio  = datetime.strptime(dados.get("data_inicio") or "",  "%Y-%m-%d")
+        dt_termino = datetime.strptime(dados.get("data_termino") or "", "%Y-%m-%d")
+    except ValueError:
+        erros.append(Erro(None, "periodo_formato",
+                          "⚠️ Formato inválido de data (início/término). Use o seletor de calendário."))
+        return resultado()
+
+    dt_nascimento = dt_nascimento_repr = None
+    if dados.get("nascimento"):
+        try:
+            dt_nascimento = datetime.strptime(dados["nascimento"], "%Y-%m-%d")
+        except ValueError:
+            if "nascimento" not in com_erro:
+                falha_especifica("nascimento", "data_invalida", "⚠️ Data de nascimento inválida.")
+            return resultado()
+    if dados.get("nascimento_repr"):
+        try:
+            dt_nascimento_repr = datetime.strptime(dados["nascimento_repr"], "%Y-%m-%d")
+        except ValueError:
+            if "nascimento_repr" not in com_erro:
+                falha_especifica("nascimento_repr", "data_invalida",
+                                 "⚠️ Data de nascimento do(a) representante inválida.")
+            return resultado()
+
+    if dt_termino < dt_inicio:
+        erros.append(Erro(None, "periodo_invertido", "⚠️ A data de término não pode ser anterior à data de início."))
+        return resultado()
+
+    dados["data_inicio"]  = dt_inicio.strftime("%d/%m/%Y")
+    dados["data_termino"] = dt_termino.strftime("%d/%m/%Y")
+    if dt_nascimento:
+        dados["nascimento"] = dt_nascimento.strftime("%d/%m/%Y")
+    if dt_nascimento_repr:
+        dados["nascimento_repr"] = dt_nascimento_repr.strftime("%d/%m/%Y")
+
+    # 5) Atividades (mínimo MIN_ATIVIDADES)
+    nomes_ativ = [n for n in nomes if n.startswith("atividade_")]
+    vazias = [n for n in nomes_ativ if not str(dados.get(n) or "").strip()]
+    preenchidas = len(nomes_ativ) - len(vazias)
+    validos.update(nomes_ativ)
+    if preenchidas < MIN_ATIVIDADES:
+        faltam = MIN_ATIVIDADES - preenchidas
+        for n in vazias[:faltam]:
+            validos.discard(n)
+            erros.append(Erro(n, "atividades_minimo"))
+        erros.append(Erro(None, "atividades_minimo",
+                          f"⚠️ Informe pelo menos {MIN_ATIVIDADES} atividades (faltam {faltam})."))
+        return resultado()
+
+    # 6) Obrigatórios gerais
+    faltando = []
+    for nome in nomes:
+        if nome in com_erro:
+            continue  # já tem erro específico (e mensagem)
+        if nome in CAMPOS_OBRIGATORIOS and _vazio(dados.get(nome)):
+            erros.append(Erro(nome, "obrigatorio"))
+            faltando.append(CAMPOS_OBRIGATORIOS[nome])
+        else:
+            validos.add(nome)
+    if faltando:
+        lista = ", ".join(faltando[:4]) + ("..." if len(faltando) > 4 else "")
+        erros.append(Erro(None, "obrigatorio", f"⚠️ Preencha os campos obrigatórios destacados em vermelho: {lista}."))
+    if com_erro or faltando:
+        return resultado()
+
+    return resultado(ok=True)